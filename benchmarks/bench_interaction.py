@@ -0,0 +1,384 @@
+# SPDX-FileCopyrightText: 2025-present Frédéric Collonval <frederic.collonval@webscit.com>
+#
+# SPDX-License-Identifier: MIT
+"""Benchmark of the interaction loop of Curious Frame.
+
+The real ``curious_frame.main`` runs against the local stand-ins of Ollama
+and Piper. The camera is replaced by a replay of recorded frames and the
+audio device by a null sink, so it runs on any Linux box::
+
+    python benchmarks/bench_interaction.py --frames ~/curious_frame_captures -- --stream
+
+The arguments after ``--`` are passed to ``curious_frame``. Each interaction
+is traced; the report gives the time to first audio, the end-to-end latency
+and the latency of each stage, as well as the requests and bytes per
+interaction.
+"""
+import argparse
+import json
+import logging
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable
+from unittest.mock import patch
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from stand_ins import start_ollama, start_piper  # noqa: E402
+
+import curious_frame.session  # noqa: E402
+from curious_frame.camera import Snapshot  # noqa: E402
+from curious_frame.main import main, prewarm  # noqa: E402
+from curious_frame.playback import PcmFormat  # noqa: E402
+
+
+class ReplayCamera:
+    """Serves recorded frames in turn, then the last one forever."""
+
+    def __init__(
+        self, frames: list[bytes], on_first: Callable[[], None] | None = None
+    ) -> None:
+        """Initializes the camera.
+
+        Args:
+            frames: The JPEG images.
+            on_first: The function called before serving the first frame,
+                i.e. once the startup is over.
+        """
+        self.frames = frames
+        self.served = 0
+        self.on_first = on_first
+        self._lock = threading.Lock()
+
+    def start(self, timeout: float = 5.0) -> bool:
+        return True
+
+    def stop(self) -> None:
+        pass
+
+    def get_snapshot(self, timeout: float = 5.0) -> Snapshot:
+        with self._lock:
+            if self.served == 0 and self.on_first is not None:
+                self.on_first()
+            index = min(self.served, len(self.frames) - 1)
+            self.served += 1
+        return Snapshot(jpeg=self.frames[index])
+
+    def get_frame(self, timeout: float = 5.0) -> np.ndarray:
+        return self.get_snapshot(timeout).to_array()
+
+
+class NullOutput:
+    """An audio output discarding the audio, optionally in real time."""
+
+    def __init__(self, device: str = "null", realtime: bool = False) -> None:
+        self.device = device
+        self.realtime = realtime
+        self.last_error = None
+        self.bytes_played = 0
+
+    def write(self, data: bytes | memoryview, fmt: PcmFormat) -> None:
+        self.bytes_played += len(data)
+        if self.realtime:
+            time.sleep(len(data) / (fmt.frame_size * fmt.rate))
+
+    def mark(self) -> threading.Event:
+        reached = threading.Event()
+        reached.set()
+        return reached
+
+    def play_pcm(
+        self, data: bytes | memoryview, fmt: PcmFormat, block: bool = True
+    ) -> None:
+        self.write(data, fmt)
+
+    def drain(self) -> None:
+        pass
+
+    def check(self, timeout: float = 5.0) -> bool:
+        return True
+
+    def close(self) -> None:
+        pass
+
+
+def load_frames(directory: str | None, count: int) -> list[bytes]:
+    """Loads the JPEG images of a directory or generates distinct frames.
+
+    Args:
+        directory: The directory of the images, e.g. a capture directory; if
+            None random frames are generated.
+        count: The maximal number of frames.
+
+    Returns:
+        The JPEG images.
+    """
+    if directory:
+        paths = sorted(Path(directory).expanduser().glob("*.jpg"))[:count]
+        if not paths:
+            raise SystemExit(f"No JPEG image found in {directory}.")
+        return [path.read_bytes() for path in paths]
+
+    rng = np.random.default_rng(0)
+    frames = []
+    for _ in range(count):
+        # Blocks of random colors so the fingerprints of the frames differ
+        small = rng.integers(0, 255, (9, 16, 3), dtype=np.uint8)
+        frame = cv2.resize(small, (1280, 720), interpolation=cv2.INTER_NEAREST)
+        _, jpeg = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, 90])
+        frames.append(jpeg.tobytes())
+    return frames
+
+
+def percentiles(values: list[float]) -> dict[str, float]:
+    """Computes the 50th, 90th and 99th percentiles by nearest rank."""
+    if not values:
+        return {}
+    ordered = sorted(values)
+    last = len(ordered) - 1
+    return {
+        f"p{rank}": round(ordered[min(last, int(len(ordered) * rank / 100))], 4)
+        for rank in (50, 90, 99)
+    } | {"max": round(ordered[-1], 4)}
+
+
+def first_audio(trace: dict[str, Any]) -> float | None:
+    """Gets the time from the snapshot to the first audio sent to the device."""
+    starts = []
+    for span in trace["spans"]:
+        if span["name"] == "play":
+            starts.append(span["start"])
+        elif span["name"] == "piper.stream" and "first_chunk" in span:
+            starts.append(span["start"] + span["first_chunk"])
+    return min(starts) if starts else None
+
+
+def report(
+    traces: list[dict[str, Any]], counters: dict[str, dict[str, Any]], elapsed: float
+) -> dict[str, Any]:
+    """Summarizes the traces of the described interactions and the server counters."""
+    described = [trace for trace in traces if not trace.get("identical")]
+    interactions = max(len(described), 1)
+    stages: dict[str, list[float]] = {}
+    for trace in described:
+        for span in trace["spans"]:
+            stages.setdefault(span["name"], []).append(span["duration"])
+
+    requests: dict[str, float] = {}
+    bytes_sent = bytes_received = 0
+    for server in counters.values():
+        for kind, count in server["requests"].items():
+            requests[kind] = round(count / interactions, 2)
+        # The server receives what the device sends
+        bytes_sent += server["bytes_received"]
+        bytes_received += server["bytes_sent"]
+
+    return {
+        "interactions": len(described),
+        "elapsed": round(elapsed, 2),
+        "time_to_first_audio": percentiles(
+            [t for t in map(first_audio, described) if t is not None]
+        ),
+        "end_to_end": percentiles([trace["duration"] for trace in described]),
+        "stages": {
+            name: percentiles(durations) for name, durations in sorted(stages.items())
+        },
+        "requests_per_interaction": requests,
+        "bytes_sent_per_interaction": bytes_sent // interactions,
+        "bytes_received_per_interaction": bytes_received // interactions,
+    }
+
+
+def print_report(result: dict[str, Any]) -> None:
+    print(f"{result['interactions']} interactions in {result['elapsed']}s")
+    rows = [
+        ("time to first audio", result["time_to_first_audio"]),
+        ("end to end", result["end_to_end"]),
+    ]
+    rows += [(f"  {name}", values) for name, values in result["stages"].items()]
+    keys = ("p50", "p90", "p99", "max")
+    print(f"{'latency (s)':<24}" + "".join(f"{key:>9}" for key in keys))
+    for name, values in rows:
+        print(
+            f"{name:<24}"
+            + "".join(f"{values.get(key, float('nan')):>9.3f}" for key in keys)
+        )
+    requests = sorted(result["requests_per_interaction"].items())
+    print("requests per interaction: " + ", ".join(f"{k}={v}" for k, v in requests))
+    print(f"bytes sent per interaction: {result['bytes_sent_per_interaction']}")
+    print(f"bytes received per interaction: {result['bytes_received_per_interaction']}")
+
+
+def run(argv: list[str] | None = None) -> dict[str, Any]:
+    """Runs the benchmark.
+
+    Args:
+        argv: The command line arguments.
+
+    Returns:
+        The report.
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    extra = []
+    if "--" in argv:
+        index = argv.index("--")
+        argv, extra = argv[:index], argv[index + 1 :]
+
+    parser = argparse.ArgumentParser(
+        description="Benchmark the interaction loop against stand-in servers."
+    )
+    parser.add_argument(
+        "--frames",
+        type=str,
+        default=None,
+        help="The directory of recorded JPEG frames (default: random frames).",
+    )
+    parser.add_argument(
+        "--count",
+        type=int,
+        default=10,
+        help="The maximal number of frames (default: 10).",
+    )
+    parser.add_argument(
+        "--ollama-latency",
+        type=float,
+        default=0.2,
+        help="The time to first token in seconds (default: 0.2).",
+    )
+    parser.add_argument(
+        "--token-rate",
+        type=float,
+        default=20.0,
+        help="The tokens generated per second (default: 20).",
+    )
+    parser.add_argument(
+        "--description-tokens",
+        type=int,
+        default=60,
+        help="The number of tokens per description (default: 60).",
+    )
+    parser.add_argument(
+        "--piper-latency",
+        type=float,
+        default=0.05,
+        help="The time to first audio of Piper in seconds (default: 0.05).",
+    )
+    parser.add_argument(
+        "--piper-realtime-factor",
+        type=float,
+        default=0.1,
+        help="The synthesis time relative to the audio duration (default: 0.1).",
+    )
+    parser.add_argument(
+        "--realtime-audio",
+        action="store_true",
+        help="Play the audio in real time on the null sink.",
+    )
+    parser.add_argument(
+        "--follow-up-pause",
+        type=float,
+        default=0,
+        help="The pause before the follow-up question in seconds (default: 0).",
+    )
+    parser.add_argument(
+        "--json",
+        type=str,
+        default=None,
+        help="The file to write the report to as JSON.",
+    )
+    parser.add_argument(
+        "--verbose",
+        "-v",
+        action="store_true",
+        help="Display the logs of Curious Frame.",
+    )
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+
+    frames = load_frames(args.frames, args.count)
+    ollama = start_ollama(args.ollama_latency, args.token_rate, args.description_tokens)
+    piper = start_piper(args.piper_latency, args.piper_realtime_factor)
+    # Zero until the first frame, in case the session stops before it
+    before: dict[str, dict[str, Any]] = {
+        name: {"requests": {}, "bytes_received": 0, "bytes_sent": 0}
+        for name in ("ollama", "piper")
+    }
+
+    def on_first() -> None:
+        # The requests of the startup are not counted
+        before.update(
+            ollama=ollama.counters.snapshot(), piper=piper.counters.snapshot()
+        )
+
+    def output(device: str) -> NullOutput:
+        return NullOutput(device, args.realtime_audio)
+
+    def camera(**kwargs: Any) -> ReplayCamera:
+        return ReplayCamera(frames, on_first)
+
+    try:
+        with tempfile.TemporaryDirectory() as directory, patch(
+            "curious_frame.audio.AudioOutput", output
+        ), patch("curious_frame.main.Camera", camera), patch.object(
+            curious_frame.session, "FOLLOW_UP_PAUSE", args.follow_up_pause
+        ):
+            audio_cache = str(Path(directory) / "audio_cache")
+            trace_file = Path(directory) / "traces.jsonl"
+            # The fixed phrases are cached beforehand like on a deployed device
+            prewarm(["--piper-url", piper.url, "--audio-cache-dir", audio_cache])
+
+            start = time.monotonic()
+            main(
+                [
+                    "--ollama-url", f"{ollama.url}/api/chat",
+                    "--piper-url", piper.url,
+                    "--capture-dir", str(Path(directory) / "captures"),
+                    "--audio-cache-dir", audio_cache,
+                    "--trace-file", str(trace_file),
+                    "--shutdown-timeout", "0",
+                    *extra,
+                ]
+            )
+            elapsed = time.monotonic() - start
+
+            traces = (
+                [json.loads(line) for line in trace_file.read_text().splitlines()]
+                if trace_file.exists()
+                else []
+            )
+            counters = {
+                name: _difference(server.counters.snapshot(), before[name])
+                for name, server in (("ollama", ollama), ("piper", piper))
+            }
+    finally:
+        ollama.close()
+        piper.close()
+
+    result = report(traces, counters, elapsed)
+    print_report(result)
+    if args.json:
+        Path(args.json).write_text(json.dumps(result, indent=2))
+    return result
+
+
+def _difference(after: dict[str, Any], before: dict[str, Any]) -> dict[str, Any]:
+    return {
+        "requests": {
+            kind: count - before["requests"].get(kind, 0)
+            for kind, count in after["requests"].items()
+            if count - before["requests"].get(kind, 0)
+        },
+        "bytes_received": after["bytes_received"] - before["bytes_received"],
+        "bytes_sent": after["bytes_sent"] - before["bytes_sent"],
+    }
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,304 @@
+# SPDX-FileCopyrightText: 2025-present Frédéric Collonval <frederic.collonval@webscit.com>
+#
+# SPDX-License-Identifier: MIT
+"""Local stand-ins for the Ollama and Piper servers.
+
+They answer like the real servers with a configurable latency so the hot
+path of Curious Frame can be measured on any Linux box:
+
+- ``POST /api/chat`` of Ollama, streamed or not; the answer is generated at
+  a given token rate after a given time to first token. The objects "seen"
+  in an image are derived from its hash so different frames give different
+  objects.
+- ``POST /`` and ``POST /stream`` of the Piper server; the audio is silence
+  whose duration is proportional to the text length.
+
+Each server counts the requests and the bytes received and sent.
+"""
+import base64
+import hashlib
+import io
+import json
+import struct
+import threading
+import time
+import wave
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+# Same header as the streaming endpoint of the Piper server
+PCM_STREAM_HEADER = struct.Struct("<4sIHH")
+
+OBJECTS = [
+    "ball",
+    "banana",
+    "book",
+    "car",
+    "cat",
+    "cup",
+    "dinosaur",
+    "duck",
+    "key",
+    "spoon",
+    "teddy bear",
+    "train",
+]
+
+_WORDS = (
+    "the small toy is used by children to play and learn about the world around them"
+).split()
+
+
+class Counters:
+    """The requests and bytes handled by a stand-in server."""
+
+    def __init__(self) -> None:
+        self.requests: dict[str, int] = {}
+        self.bytes_received = 0
+        self.bytes_sent = 0
+        self._lock = threading.Lock()
+
+    def add(self, kind: str, received: int, sent: int) -> None:
+        with self._lock:
+            self.requests[kind] = self.requests.get(kind, 0) + 1
+            self.bytes_received += received
+            self.bytes_sent += sent
+
+    def snapshot(self) -> dict[str, Any]:
+        """Gets a copy of the counters."""
+        with self._lock:
+            return {
+                "requests": dict(self.requests),
+                "bytes_received": self.bytes_received,
+                "bytes_sent": self.bytes_sent,
+            }
+
+
+class StandIn:
+    """A stand-in server running in a background thread."""
+
+    def __init__(self, handler: type[BaseHTTPRequestHandler], **settings: Any) -> None:
+        """Starts the server on a free local port.
+
+        Args:
+            handler: The request handler class.
+            **settings: The settings read by the handler through ``self.server``.
+        """
+        self.counters = Counters()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.server.daemon_threads = True
+        self.server.counters = self.counters
+        for name, value in settings.items():
+            setattr(self.server, name, value)
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def close(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def _read_json(self) -> tuple[dict[str, Any], int]:
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length)
+        return json.loads(body or b"{}"), length
+
+    def _send(self, body: bytes, content_type: str) -> int:
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        return len(body)
+
+    def _start_chunked(self, content_type: str) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+    def _send_chunk(self, data: bytes) -> int:
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+        return len(data)
+
+    def _end_chunked(self) -> None:
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+
+class OllamaHandler(_Handler):
+    """Answers ``POST /api/chat`` like Ollama.
+
+    Server settings: ``latency`` the time to first token in seconds,
+    ``token_rate`` the tokens generated per second and ``description_tokens``
+    the length of a description.
+    """
+
+    def do_POST(self) -> None:
+        if self.path != "/api/chat":
+            self.send_error(404)
+            return
+        data, received = self._read_json()
+        kind, tokens = self._answer(data)
+        settings = self.server
+
+        time.sleep(settings.latency)
+        stats = {
+            "done": True,
+            "eval_count": len(tokens),
+            "eval_duration": int(len(tokens) / settings.token_rate * 1e9),
+            "prompt_eval_count": len(json.dumps(data)) // 4,
+            "prompt_eval_duration": int(settings.latency * 1e9),
+        }
+        if data.get("stream", True) and kind == "chat":
+            self._start_chunked("application/x-ndjson")
+            sent = 0
+            for token in tokens:
+                time.sleep(1 / settings.token_rate)
+                chunk = {
+                    "message": {"role": "assistant", "content": token},
+                    "done": False,
+                }
+                sent += self._send_chunk(json.dumps(chunk).encode() + b"\n")
+            final = {"message": {"role": "assistant", "content": ""}, **stats}
+            sent += self._send_chunk(json.dumps(final).encode() + b"\n")
+            self._end_chunked()
+        else:
+            time.sleep(len(tokens) / settings.token_rate)
+            content = "".join(tokens)
+            body = {"message": {"role": "assistant", "content": content}, **stats}
+            sent = self._send(json.dumps(body).encode(), "application/json")
+        settings.counters.add(f"ollama.{kind}", received, sent)
+
+    def _answer(self, data: dict[str, Any]) -> tuple[str, list[str]]:
+        """Gets the kind of request and the tokens of its answer."""
+        messages = data.get("messages") or []
+        if not messages:
+            return "warmup", []
+        last = messages[-1]
+        schema = data.get("format")
+        images = last.get("images") or []
+        if isinstance(schema, dict) and "translations" in schema.get("properties", {}):
+            texts = json.loads(last["content"].split(": ", 1)[1])
+            translations = [f"[fr] {text}" for text in texts]
+            return "translate", [json.dumps({"translations": translations})]
+        if images:
+            objects = _objects_of(images[0])
+            if isinstance(schema, dict):
+                answer = {
+                    "objects": objects,
+                    "french_flag": False,
+                    "frame_present": True,
+                }
+                return "vision", [json.dumps(answer)]
+            if "French flag" in last.get("content", ""):
+                return "vision", ["No"]
+            return "vision", [", ".join(objects)]
+        if "translates" in messages[0].get("content", ""):
+            return "translate", ["[fr] ", last["content"]]
+        count = self.server.description_tokens
+        words = [_WORDS[index % len(_WORDS)] for index in range(count)]
+        # One sentence every twelve words
+        return "chat", [
+            (word.capitalize() if index % 12 == 0 else word)
+            + ("." if index % 12 == 11 else "")
+            + " "
+            for index, word in enumerate(words)
+        ]
+
+
+class PiperHandler(_Handler):
+    """Answers ``POST /`` and ``POST /stream`` like the Piper server.
+
+    Server settings: ``latency`` the time before the first audio in seconds
+    and ``realtime_factor`` the synthesis speed relative to the audio duration.
+    """
+
+    sample_rate = 22050
+
+    def do_POST(self) -> None:
+        if self.path not in ("/", "/stream"):
+            self.send_error(404)
+            return
+        data, received = self._read_json()
+        settings = self.server
+        # About 60 ms of speech per character
+        frames = int(len(data.get("text", "")) * 0.06 * self.sample_rate)
+        synthesis_time = frames / self.sample_rate * settings.realtime_factor
+
+        time.sleep(settings.latency)
+        if self.path == "/stream":
+            self._start_chunked("application/octet-stream")
+            header = PCM_STREAM_HEADER.pack(b"PCM1", self.sample_rate, 2, 1)
+            sent = self._send_chunk(header)
+            chunk_frames = self.sample_rate // 4
+            for start in range(0, frames, chunk_frames):
+                count = min(chunk_frames, frames - start)
+                time.sleep(count / self.sample_rate * settings.realtime_factor)
+                sent += self._send_chunk(bytes(2 * count))
+            self._end_chunked()
+            settings.counters.add("piper.stream", received, sent)
+        else:
+            time.sleep(synthesis_time)
+            buffer = io.BytesIO()
+            with wave.open(buffer, "wb") as wav_file:
+                wav_file.setframerate(self.sample_rate)
+                wav_file.setsampwidth(2)
+                wav_file.setnchannels(1)
+                wav_file.writeframes(bytes(2 * frames))
+            sent = self._send(buffer.getvalue(), "audio/wav")
+            settings.counters.add("piper.synthesize", received, sent)
+
+
+def _objects_of(image_b64: str) -> list[str]:
+    """Picks two objects from the hash of an image."""
+    digest = hashlib.sha1(base64.b64decode(image_b64)).digest()
+    first = digest[0] % len(OBJECTS)
+    second = (first + 1 + digest[1] % (len(OBJECTS) - 1)) % len(OBJECTS)
+    return [OBJECTS[first], OBJECTS[second]]
+
+
+def start_ollama(
+    latency: float = 0.2, token_rate: float = 20.0, description_tokens: int = 60
+) -> StandIn:
+    """Starts a stand-in Ollama server.
+
+    Args:
+        latency: The time to first token in seconds.
+        token_rate: The number of tokens generated per second.
+        description_tokens: The number of tokens of a description.
+
+    Returns:
+        The running server.
+    """
+    return StandIn(
+        OllamaHandler,
+        latency=latency,
+        token_rate=token_rate,
+        description_tokens=description_tokens,
+    )
+
+
+def start_piper(latency: float = 0.05, realtime_factor: float = 0.1) -> StandIn:
+    """Starts a stand-in Piper server.
+
+    Args:
+        latency: The time before the first audio in seconds.
+        realtime_factor: The synthesis time relative to the audio duration.
+
+    Returns:
+        The running server.
+    """
+    return StandIn(PiperHandler, latency=latency, realtime_factor=realtime_factor)
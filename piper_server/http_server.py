@@ -3,141 +3,346 @@
 # This is a modified version of the original piper_server.py script: https://github.com/rhasspy/piper/blob/master/src/python_run/piper/http_server.py
 # It switches to using a POST request accepting JSON data instead of a GET request with query parameters
 # The provided JSON data should contain the text to synthesize and optional parameters like voice, speaker_id, length_scale, noise_scale, and noise_w
+# The same JSON data can be posted to /stream to receive raw PCM audio chunked
+# sentence by sentence
+#
+# Voices are served from pools of ONNX sessions so simultaneous requests run in
+# parallel; voices listed with --preload-voice are loaded at startup and at most
+# --max-voices voices are kept in memory (least recently used are unloaded).
+#
+# Synthesized audio is cached in memory and in --cache-dir, keyed on the voice,
+# the synthesis parameters and the text; the key is sent as ETag so clients can
+# revalidate with If-None-Match. GET /stats returns the cache counters.
 #
 # SPDX-FileCopyrightText: 2025-present Frédéric Collonval <frederic.collonval@webscit.com>
 #
 # SPDX-License-Identifier: MIT
 
 import argparse
+import hashlib
 import io
 import json
 import logging
+import os
+import queue
+import struct
+import threading
 import wave
+from collections import OrderedDict
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
-from flask import Flask, request
-
-from piper import PiperVoice
-from piper.download import ensure_voice_exists, find_voice, get_voices
+from flask import Flask, Response, jsonify, request
 
 _LOGGER = logging.getLogger()
 
+# Header of the /stream responses: magic, sample rate, sample width in bytes
+# and number of channels
+PCM_STREAM_HEADER = struct.Struct("<4sIHH")
+PCM_STREAM_MAGIC = b"PCM1"
 
-def main() -> None:
-    parser = argparse.ArgumentParser()
-    parser.add_argument("--host", default="0.0.0.0", help="HTTP server host")
-    parser.add_argument("--port", type=int, default=5000, help="HTTP server port")
-    #
-    parser.add_argument("-m", "--model", required=True, help="Path to Onnx model file")
-    parser.add_argument("-c", "--config", help="Path to model config file")
-    #
-    parser.add_argument("-s", "--speaker", type=int, help="Id of speaker (default: 0)")
-    parser.add_argument(
-        "--length-scale", "--length_scale", type=float, help="Phoneme length"
-    )
-    parser.add_argument(
-        "--noise-scale", "--noise_scale", type=float, help="Generator noise"
-    )
-    parser.add_argument(
-        "--noise-w", "--noise_w", type=float, help="Phoneme width noise"
-    )
-    #
-    parser.add_argument("--cuda", action="store_true", help="Use GPU")
-    #
-    parser.add_argument(
-        "--sentence-silence",
-        "--sentence_silence",
-        type=float,
-        default=0.0,
-        help="Seconds of silence after each sentence",
-    )
-    #
-    parser.add_argument(
-        "--data-dir",
-        "--data_dir",
-        action="append",
-        default=[str(Path.cwd())],
-        help="Data directory to check for downloaded models (default: current directory)",
-    )
-    parser.add_argument(
-        "--download-dir",
-        "--download_dir",
-        help="Directory to download voices into (default: first data dir)",
-    )
-    #
-    parser.add_argument(
-        "--update-voices",
-        action="store_true",
-        help="Download latest voices.json during startup",
+
+def load_voice(
+    model_path: Path,
+    config_path: Optional[Path] = None,
+    use_cuda: bool = False,
+    intra_op_threads: int = 0,
+) -> Any:
+    """Loads a voice with its own ONNX session.
+
+    Args:
+        model_path: Path to the Onnx model file.
+        config_path: Path to the model config file (default: model path + .json).
+        use_cuda: Whether to run the model on the GPU.
+        intra_op_threads: Number of threads of the session (0: onnxruntime default).
+
+    Returns:
+        The voice.
+    """
+    import onnxruntime
+    from piper import PiperVoice
+    from piper.config import PiperConfig
+
+    if config_path is None:
+        config_path = Path(f"{model_path}.json")
+
+    with open(config_path, "r", encoding="utf-8") as config_file:
+        config = PiperConfig.from_dict(json.load(config_file))
+
+    options = onnxruntime.SessionOptions()
+    options.intra_op_num_threads = intra_op_threads
+    # Requests are parallelized across sessions, not within a session
+    options.inter_op_num_threads = 1
+    providers = (
+        [("CUDAExecutionProvider", {"cudnn_conv_algo_search": "HEURISTIC"})]
+        if use_cuda
+        else ["CPUExecutionProvider"]
     )
-    #
-    parser.add_argument(
-        "--debug", action="store_true", help="Print DEBUG messages to console"
+    session = onnxruntime.InferenceSession(
+        str(model_path), sess_options=options, providers=providers
     )
-    args = parser.parse_args()
-    logging.basicConfig(level=logging.DEBUG if args.debug else logging.INFO)
-    _LOGGER.debug(args)
+    return PiperVoice(config=config, session=session)
 
-    if not args.download_dir:
-        # Download to first data directory by default
-        args.download_dir = args.data_dir[0]
 
-    # Download voice if file doesn't exist
-    model_path = Path(args.model)
-    if not model_path.exists():
-        # Load voice info
-        voices_info = get_voices(args.download_dir, update_voices=args.update_voices)
+class VoicePool:
+    """Sessions of the same voice; each session serves one request at a time."""
 
-        # Resolve aliases for backwards compatibility with old voice names
-        aliases_info: Dict[str, Any] = {}
-        for voice_info in voices_info.values():
-            for voice_alias in voice_info.get("aliases", []):
-                aliases_info[voice_alias] = {"_is_alias": True, **voice_info}
+    def __init__(self, model_id: str, voices: List[Any]) -> None:
+        self.model_id = model_id
+        self.config = voices[0].config
+        self.size = len(voices)
+        self._idle: "queue.Queue[Any]" = queue.Queue()
+        for voice in voices:
+            self._idle.put(voice)
 
-        voices_info.update(aliases_info)
-        ensure_voice_exists(args.model, args.data_dir, args.download_dir, voices_info)
-        args.model, args.config = find_voice(args.model, args.data_dir)
+    @contextmanager
+    def acquire(self) -> Iterator[Any]:
+        """Borrows an idle session, waiting for one if all are busy."""
+        voice = self._idle.get()
+        try:
+            yield voice
+        finally:
+            self._idle.put(voice)
 
-    # Load voice
-    synthesize_args = {
-        "speaker_id": args.speaker,
-        "length_scale": args.length_scale,
-        "noise_scale": args.noise_scale,
-        "noise_w": args.noise_w,
-        "sentence_silence": args.sentence_silence,
-    }
 
-    default_model_id = model_path.name.rstrip(".onnx")
+class VoiceRegistry:
+    """Loads voices on demand and keeps the most recently used in memory."""
 
-    default_voice = PiperVoice.load(model_path, use_cuda=args.cuda)
-    loaded_voices = {default_model_id: default_voice}
+    def __init__(
+        self,
+        data_dirs: List[str],
+        sessions: int = 1,
+        intra_op_threads: int = 0,
+        max_voices: int = 4,
+        use_cuda: bool = False,
+    ) -> None:
+        self.data_dirs = data_dirs
+        self.sessions = sessions
+        self.intra_op_threads = intra_op_threads
+        self.max_voices = max_voices
+        self.use_cuda = use_cuda
+        self.default_id: Optional[str] = None
+        self._pools: "OrderedDict[str, VoicePool]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._loading: Dict[str, threading.Lock] = {}
+
+    @property
+    def loaded(self) -> List[str]:
+        """Ids of the voices in memory, least recently used first."""
+        with self._lock:
+            return list(self._pools)
+
+    def load(
+        self, model_id: str, model_path: Path, config_path: Optional[Path] = None
+    ) -> VoicePool:
+        """Loads a voice from a model file, replacing any loaded version."""
+        _LOGGER.debug("Loading voice %s with %d session(s)", model_id, self.sessions)
+        voices = [
+            load_voice(
+                model_path,
+                config_path,
+                use_cuda=self.use_cuda,
+                intra_op_threads=self.intra_op_threads,
+            )
+            for _ in range(self.sessions)
+        ]
+        pool = VoicePool(model_id, voices)
+        with self._lock:
+            self._pools[model_id] = pool
+            self._pools.move_to_end(model_id)
+            self._evict()
+        return pool
+
+    def get(self, model_id: str) -> Optional[VoicePool]:
+        """Gets a voice, loading it from the data directories if needed.
+
+        Concurrent requests for a voice being loaded wait for that load instead
+        of loading the voice again.
+        """
+        with self._lock:
+            pool = self._touch(model_id)
+            if pool is not None:
+                return pool
+            loading = self._loading.setdefault(model_id, threading.Lock())
+
+        with loading:
+            with self._lock:
+                pool = self._touch(model_id)
+            if pool is not None:
+                return pool
+
+            for data_dir in self.data_dirs:
+                maybe_model_path = Path(data_dir) / f"{model_id}.onnx"
+                if maybe_model_path.exists():
+                    return self.load(model_id, maybe_model_path)
+
+        return None
+
+    def _touch(self, model_id: str) -> Optional[VoicePool]:
+        pool = self._pools.get(model_id)
+        if pool is not None:
+            self._pools.move_to_end(model_id)
+        return pool
+
+    def _evict(self) -> None:
+        # Requests holding an evicted pool finish with it before it is freed
+        for model_id in list(self._pools):
+            if len(self._pools) <= self.max_voices:
+                break
+            if model_id != self.default_id:
+                _LOGGER.info("Unloading voice %s", model_id)
+                del self._pools[model_id]
+
+
+class SynthesisCache:
+    """Content-addressed cache of WAV files with a memory and a disk tier.
+
+    Both tiers evict the least recently used entries once their size limit
+    is reached. Entries are keyed on the voice, the synthesis parameters and
+    the text.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Optional[str] = None,
+        max_memory_bytes: int = 64 * 1024 * 1024,
+        max_disk_bytes: int = 512 * 1024 * 1024,
+    ) -> None:
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_bytes = 0
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+        if self.cache_dir is not None:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            self._disk_bytes = sum(
+                f.stat().st_size for f in self.cache_dir.glob("*.wav")
+            )
+
+    @staticmethod
+    def key(model_id: str, text: str, syn_config: Dict[str, Any]) -> str:
+        """Computes the key of a synthesis."""
+        data = [
+            model_id,
+            syn_config.get("speaker_id"),
+            syn_config.get("length_scale"),
+            syn_config.get("noise_scale"),
+            syn_config.get("noise_w_scale"),
+            syn_config.get("sentence_silence"),
+            text,
+        ]
+        return hashlib.sha256(json.dumps(data).encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Gets a cached WAV file, promoting disk entries to memory."""
+        with self._lock:
+            wav = self._memory.get(key)
+            if wav is not None:
+                self._memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return wav
+
+        path = self._path(key)
+        if path is not None:
+            try:
+                wav = path.read_bytes()
+                # Record the access for the least recently used eviction
+                os.utime(path)
+            except FileNotFoundError:
+                wav = None
+
+        with self._lock:
+            if wav is None:
+                self.stats["misses"] += 1
+                return None
+            self.stats["disk_hits"] += 1
+            self._remember(key, wav)
+        return wav
+
+    def put(self, key: str, wav: bytes) -> None:
+        """Caches a WAV file in both tiers."""
+        with self._lock:
+            self._remember(key, wav)
+
+        path = self._path(key)
+        if path is None or path.exists():
+            return
+        tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+        tmp_path.write_bytes(wav)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._disk_bytes += len(wav)
+            if self._disk_bytes > self.max_disk_bytes:
+                self._evict_disk()
+
+    def _path(self, key: str) -> Optional[Path]:
+        return None if self.cache_dir is None else self.cache_dir / f"{key}.wav"
+
+    def _remember(self, key: str, wav: bytes) -> None:
+        if len(wav) > self.max_memory_bytes or key in self._memory:
+            return
+        self._memory[key] = wav
+        self._memory_bytes += len(wav)
+        while self._memory_bytes > self.max_memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+
+    def _evict_disk(self) -> None:
+        files = sorted(
+            ((f.stat(), f) for f in self.cache_dir.glob("*.wav")),
+            key=lambda item: item[0].st_mtime_ns,
+        )
+        for stat, path in files:
+            if self._disk_bytes <= self.max_disk_bytes:
+                break
+            path.unlink(missing_ok=True)
+            self._disk_bytes -= stat.st_size
+            self.stats["evictions"] += 1
+
+
+def create_app(
+    registry: VoiceRegistry,
+    args: argparse.Namespace,
+    cache: Optional[SynthesisCache] = None,
+) -> Flask:
+    """Creates the web server.
+
+    Args:
+        registry: The voices; its default voice must be loaded.
+        args: The command line arguments with the default synthesis parameters.
+        cache: The cache of synthesized audio; None to disable caching.
+
+    Returns:
+        The Flask application.
+    """
+    def synthesize_args(syn_config: Dict[str, Any]) -> Dict[str, Any]:
+        """Maps the parameters of a request to the arguments of the voice."""
+        return {
+            "speaker_id": syn_config["speaker_id"],
+            "length_scale": syn_config["length_scale"],
+            "noise_scale": syn_config["noise_scale"],
+            "noise_w": syn_config["noise_w_scale"],
+            "sentence_silence": syn_config["sentence_silence"],
+        }
 
-    # Create web server
     app = Flask(__name__)
 
-    @app.route("/", methods=["POST"])
-    def app_synthesize() -> bytes:
-        data = json.loads(request.data)
+    def resolve_voice(data: Dict[str, Any]) -> Tuple[str, VoicePool, Dict[str, Any]]:
         text = data.get("text", "").strip()
         if not text:
             raise ValueError("No text provided")
 
         _LOGGER.debug(data)
-        model_id = data.get("voice", default_model_id)
-        voice = loaded_voices.get(model_id)
-        if voice is None:
-            for data_dir in args.data_dir:
-                maybe_model_path = Path(data_dir) / f"{model_id}.onnx"
-                if maybe_model_path.exists():
-                    _LOGGER.debug("Loading voice %s", model_id)
-                    voice = PiperVoice.load(maybe_model_path, use_cuda=args.cuda)
-                    loaded_voices[model_id] = voice
-                    break
+        model_id = data.get("voice", registry.default_id)
+        voice = registry.get(model_id)
 
         if voice is None:
             _LOGGER.warning("Voice not found: %s. Using default voice.", model_id)
-            voice = default_voice
+            voice = registry.get(registry.default_id)
 
         speaker_id = data.get("speaker_id")
         if (voice.config.num_speakers > 1) and (speaker_id is None):
@@ -188,17 +393,277 @@ def main() -> None:
                     ),
                 )
             ),
+            sentence_silence=args.sentence_silence,
         )
 
         _LOGGER.debug("Synthesizing text: '%s' with config=%s", text, syn_config)
+        return text, voice, syn_config
+
+    def wav_response(wav: bytes, etag: Optional[str], hit: bool) -> Response:
+        response = Response(wav, mimetype="audio/wav")
+        response.headers["X-Cache"] = "HIT" if hit else "MISS"
+        if etag is not None:
+            response.set_etag(etag)
+        return response
+
+    @app.route("/", methods=["POST"])
+    def app_synthesize() -> Response:
+        data = json.loads(request.data)
+        text, pool, syn_config = resolve_voice(data)
+
+        key = None
+        if cache is not None:
+            key = SynthesisCache.key(pool.model_id, text, syn_config)
+            if key in request.if_none_match:
+                return Response(status=304, headers={"ETag": f'"{key}"'})
+            wav = cache.get(key)
+            if wav is not None:
+                return wav_response(wav, key, hit=True)
 
         with io.BytesIO() as wav_io:
-            with wave.open(wav_io, "wb") as wav_file:
-                voice.synthesize(text, wav_file, **synthesize_args)
+            with wave.open(wav_io, "wb") as wav_file, pool.acquire() as voice:
+                voice.synthesize(text, wav_file, **synthesize_args(syn_config))
 
-            return wav_io.getvalue()
+            wav = wav_io.getvalue()
+
+        if cache is not None:
+            cache.put(key, wav)
+        return wav_response(wav, key, hit=False)
+
+    @app.route("/stream", methods=["POST"])
+    def app_synthesize_stream() -> Response:
+        """Streams raw PCM audio sentence by sentence.
+
+        The response starts with a header describing the audio (see
+        PCM_STREAM_HEADER), followed by chunks of 16-bit mono PCM sent as
+        soon as each sentence is synthesized. Cached audio is sent at once.
+        """
+        data = json.loads(request.data)
+        text, pool, syn_config = resolve_voice(data)
+
+        key = None
+        wav = None
+        if cache is not None:
+            key = SynthesisCache.key(pool.model_id, text, syn_config)
+            wav = cache.get(key)
+
+        def generate() -> Iterator[bytes]:
+            if wav is not None:
+                with wave.open(io.BytesIO(wav), "rb") as wav_file:
+                    yield PCM_STREAM_HEADER.pack(
+                        PCM_STREAM_MAGIC,
+                        wav_file.getframerate(),
+                        wav_file.getsampwidth(),
+                        wav_file.getnchannels(),
+                    )
+                    yield wav_file.readframes(wav_file.getnframes())
+                return
+
+            yield PCM_STREAM_HEADER.pack(
+                PCM_STREAM_MAGIC, pool.config.sample_rate, 2, 1
+            )
+            chunks = []
+            with pool.acquire() as voice:
+                stream = voice.synthesize_stream_raw(
+                    text, **synthesize_args(syn_config)
+                )
+                for chunk in stream:
+                    chunks.append(chunk)
+                    yield chunk
+
+            # Only complete syntheses are cached
+            if cache is not None:
+                with io.BytesIO() as wav_io:
+                    with wave.open(wav_io, "wb") as wav_file:
+                        wav_file.setframerate(pool.config.sample_rate)
+                        wav_file.setsampwidth(2)
+                        wav_file.setnchannels(1)
+                        wav_file.writeframes(b"".join(chunks))
+                    cache.put(key, wav_io.getvalue())
+
+        response = Response(generate(), mimetype="application/octet-stream")
+        response.headers["X-Cache"] = "HIT" if wav is not None else "MISS"
+        return response
+
+    @app.route("/stats", methods=["GET"])
+    def app_stats() -> Response:
+        return jsonify(
+            {
+                "voices": registry.loaded,
+                "cache": dict(cache.stats) if cache is not None else None,
+            }
+        )
+
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="0.0.0.0", help="HTTP server host")
+    parser.add_argument("--port", type=int, default=5000, help="HTTP server port")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=4,
+        help="Number of requests served simultaneously (default: 4)",
+    )
+    #
+    parser.add_argument("-m", "--model", required=True, help="Path to Onnx model file")
+    parser.add_argument("-c", "--config", help="Path to model config file")
+    parser.add_argument(
+        "--preload-voice",
+        "--preload_voice",
+        action="append",
+        default=[],
+        help="Id of a voice of the data directories to load at startup (repeatable)",
+    )
+    parser.add_argument(
+        "--max-voices",
+        "--max_voices",
+        type=int,
+        default=4,
+        help="Maximal number of voices kept in memory (default: 4)",
+    )
+    parser.add_argument(
+        "--sessions-per-voice",
+        "--sessions_per_voice",
+        type=int,
+        default=2,
+        help="Number of ONNX sessions per voice, i.e. simultaneous syntheses "
+        "(default: 2)",
+    )
+    parser.add_argument(
+        "--intra-op-threads",
+        "--intra_op_threads",
+        type=int,
+        default=2,
+        help="Number of threads of each ONNX session; 0 for onnxruntime default "
+        "(default: 2)",
+    )
+    #
+    parser.add_argument(
+        "--cache-dir",
+        "--cache_dir",
+        help="Directory of the cache of synthesized audio (default: memory only)",
+    )
+    parser.add_argument(
+        "--cache-memory-mb",
+        "--cache_memory_mb",
+        type=float,
+        default=64,
+        help="Maximal size in MB of the cache in memory; 0 to disable (default: 64)",
+    )
+    parser.add_argument(
+        "--cache-disk-mb",
+        "--cache_disk_mb",
+        type=float,
+        default=512,
+        help="Maximal size in MB of the cache on disk (default: 512)",
+    )
+    #
+    parser.add_argument("-s", "--speaker", type=int, help="Id of speaker (default: 0)")
+    parser.add_argument(
+        "--length-scale", "--length_scale", type=float, help="Phoneme length"
+    )
+    parser.add_argument(
+        "--noise-scale", "--noise_scale", type=float, help="Generator noise"
+    )
+    parser.add_argument(
+        "--noise-w", "--noise_w", type=float, help="Phoneme width noise"
+    )
+    #
+    parser.add_argument("--cuda", action="store_true", help="Use GPU")
+    #
+    parser.add_argument(
+        "--sentence-silence",
+        "--sentence_silence",
+        type=float,
+        default=0.0,
+        help="Seconds of silence after each sentence",
+    )
+    #
+    parser.add_argument(
+        "--data-dir",
+        "--data_dir",
+        action="append",
+        default=[str(Path.cwd())],
+        help="Data directory to check for downloaded models "
+        "(default: current directory)",
+    )
+    parser.add_argument(
+        "--download-dir",
+        "--download_dir",
+        help="Directory to download voices into (default: first data dir)",
+    )
+    #
+    parser.add_argument(
+        "--update-voices",
+        action="store_true",
+        help="Download latest voices.json during startup",
+    )
+    #
+    parser.add_argument(
+        "--debug", action="store_true", help="Print DEBUG messages to console"
+    )
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.DEBUG if args.debug else logging.INFO)
+    _LOGGER.debug(args)
+
+    if not args.download_dir:
+        # Download to first data directory by default
+        args.download_dir = args.data_dir[0]
+
+    # Download voice if file doesn't exist
+    model_path = Path(args.model)
+    if not model_path.exists():
+        from piper.download import ensure_voice_exists, find_voice, get_voices
+
+        # Load voice info
+        voices_info = get_voices(args.download_dir, update_voices=args.update_voices)
+
+        # Resolve aliases for backwards compatibility with old voice names
+        aliases_info: Dict[str, Any] = {}
+        for voice_info in voices_info.values():
+            for voice_alias in voice_info.get("aliases", []):
+                aliases_info[voice_alias] = {"_is_alias": True, **voice_info}
+
+        voices_info.update(aliases_info)
+        ensure_voice_exists(args.model, args.data_dir, args.download_dir, voices_info)
+        args.model, args.config = find_voice(args.model, args.data_dir)
+
+    # Load voices
+    registry = VoiceRegistry(
+        args.data_dir,
+        sessions=max(1, args.sessions_per_voice),
+        intra_op_threads=args.intra_op_threads,
+        max_voices=max(1, args.max_voices),
+        use_cuda=args.cuda,
+    )
+    registry.default_id = model_path.name.rstrip(".onnx")
+    registry.load(
+        registry.default_id,
+        Path(args.model),
+        Path(args.config) if args.config else None,
+    )
+    for model_id in args.preload_voice:
+        if registry.get(model_id) is None:
+            _LOGGER.warning("Voice to preload not found: %s", model_id)
+
+    # Create web server
+    cache = SynthesisCache(
+        args.cache_dir,
+        max_memory_bytes=int(args.cache_memory_mb * 1024 * 1024),
+        max_disk_bytes=int(args.cache_disk_mb * 1024 * 1024),
+    )
+    app = create_app(registry, args, cache)
 
-    app.run(host=args.host, port=args.port)
+    try:
+        from waitress import serve
+    except ImportError:
+        _LOGGER.warning("waitress is not installed; using Flask development server")
+        app.run(host=args.host, port=args.port, threaded=True)
+    else:
+        serve(app, host=args.host, port=args.port, threads=args.workers)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,229 @@
+# SPDX-FileCopyrightText: 2025-present Frédéric Collonval <frederic.collonval@webscit.com>
+#
+# SPDX-License-Identifier: MIT
+"""Capture archive module for the Curious Frame project.
+
+Snapshots and the session log are written by a background thread so the
+capture loop never waits for the disk. The log is a JSON Lines file written
+in batches; each batch is synced to disk so a crash loses at most the last
+batch. Old snapshots are deleted to keep the archive within a size and an
+age limit.
+"""
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+import cv2
+
+from curious_frame.camera import Snapshot
+
+logger = logging.getLogger(__name__)
+
+# Period in seconds at which the retention policy is applied
+_RETENTION_INTERVAL = 60.0
+
+
+class Archive:
+    """Stores the snapshots and the interactions log in the capture directory."""
+
+    def __init__(
+        self,
+        directory: str | Path,
+        image_reduction: int = 1,
+        thumbnail_width: int = 0,
+        max_bytes: int = 0,
+        max_age: float = 0,
+        batch_size: int = 16,
+        flush_interval: float = 2.0,
+        max_queue: int = 64,
+    ) -> None:
+        """Initializes the archive and starts its writer thread.
+
+        Args:
+            directory: The directory of the archive.
+            image_reduction: The factor by which the resolution of the stored
+                snapshots is divided; one of 1, 2, 4 or 8. At 1 the camera JPEG
+                image is stored as is.
+            thumbnail_width: The width in pixels of the thumbnails stored in the
+                ``thumbnails`` subdirectory; 0 disables them.
+            max_bytes: The maximal size in bytes of the stored images; 0 for no limit.
+            max_age: The maximal age in seconds of the stored images; 0 for no limit.
+            batch_size: The number of log records written at once.
+            flush_interval: The maximal time in seconds a log record waits to be
+                written.
+            max_queue: The maximal number of items waiting for the writer; the
+                items queued beyond it are dropped.
+        """
+        self.directory = Path(directory)
+        self.log_path = self.directory / "captures.jsonl"
+        self.thumbnail_dir = self.directory / "thumbnails"
+        self.image_reduction = image_reduction
+        self.thumbnail_width = thumbnail_width
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self.directory.mkdir(parents=True, exist_ok=True)
+        if thumbnail_width:
+            self.thumbnail_dir.mkdir(exist_ok=True)
+
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._closed = False
+        self._thread = threading.Thread(
+            target=self._run, name="archive-writer", daemon=True
+        )
+        self._thread.start()
+
+    def save_snapshot(self, snapshot: Snapshot, name: str) -> Path:
+        """Queues a snapshot to be stored.
+
+        Args:
+            snapshot: The snapshot.
+            name: The file name of the image, without extension.
+
+        Returns:
+            The path the image will be stored at, unless it is dropped because
+            the writer is behind.
+        """
+        path = self.directory / f"{name}.jpg"
+        self._enqueue(("image", (snapshot, path)))
+        return path
+
+    def log(self, record: dict[str, Any]) -> None:
+        """Queues a record to be appended to the log.
+
+        Args:
+            record: The JSON serializable record.
+        """
+        self._enqueue(("record", record))
+
+    def close(self) -> None:
+        """Writes the queued items and stops the writer thread."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+
+    def _enqueue(self, item: tuple[str, Any]) -> None:
+        """Queues an item without ever blocking the caller."""
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            self.dropped += 1
+            logger.warning(
+                f"The archive writer is behind, {item[0]} dropped "
+                f"({self.dropped} items dropped)."
+            )
+
+    def _run(self) -> None:
+        records: list[dict[str, Any]] = []
+        deadline = None
+        retention = bool(self.max_bytes or self.max_age)
+        next_retention = time.monotonic()
+        while True:
+            if retention and time.monotonic() >= next_retention:
+                self._apply_retention()
+                next_retention = time.monotonic() + _RETENTION_INTERVAL
+
+            wake_up = deadline
+            if retention:
+                wake_up = min(deadline or next_retention, next_retention)
+            timeout = None if wake_up is None else max(wake_up - time.monotonic(), 0)
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = ()
+            if item is None:
+                break
+
+            if item:
+                kind, data = item
+                try:
+                    if kind == "image":
+                        self._write_image(*data)
+                    else:
+                        records.append(data)
+                        deadline = deadline or time.monotonic() + self.flush_interval
+                except Exception as e:
+                    logger.exception("Unable to archive a snapshot.", exc_info=e)
+
+            full = len(records) >= self.batch_size
+            if records and (full or time.monotonic() >= deadline):
+                self._flush(records)
+                records, deadline = [], None
+
+        self._flush(records)
+
+    def _write_image(self, snapshot: Snapshot, path: Path) -> None:
+        if self.image_reduction == 1:
+            data = snapshot.to_jpeg()
+        else:
+            _, buffer = cv2.imencode(
+                ".jpg",
+                snapshot.to_array(self.image_reduction),
+                [cv2.IMWRITE_JPEG_QUALITY, snapshot.quality],
+            )
+            data = buffer.tobytes()
+        _write_atomic(path, data)
+
+        if self.thumbnail_width:
+            small = snapshot.to_array(8)
+            factor = self.thumbnail_width / small.shape[1]
+            if factor < 1:
+                small = cv2.resize(
+                    small, None, fx=factor, fy=factor, interpolation=cv2.INTER_AREA
+                )
+            _, buffer = cv2.imencode(".jpg", small, [cv2.IMWRITE_JPEG_QUALITY, 80])
+            _write_atomic(self.thumbnail_dir / path.name, buffer.tobytes())
+
+    def _flush(self, records: list[dict[str, Any]]) -> None:
+        if not records:
+            return
+        try:
+            with open(self.log_path, "a", encoding="utf-8") as f:
+                f.writelines(
+                    json.dumps(record, ensure_ascii=False) + "\n" for record in records
+                )
+                f.flush()
+                os.fsync(f.fileno())
+        except Exception as e:
+            logger.exception(
+                f"Unable to write {len(records)} records to {self.log_path!s}.",
+                exc_info=e,
+            )
+
+    def _apply_retention(self) -> None:
+        """Deletes the oldest images beyond the age and size limits."""
+        images = sorted(
+            ((path.stat(), path) for path in self.directory.glob("*.jpg")),
+            key=lambda item: item[0].st_mtime,
+        )
+        total = sum(stat.st_size for stat, _ in images)
+        now = time.time()
+        removed = 0
+        for stat, path in images:
+            too_old = self.max_age and now - stat.st_mtime > self.max_age
+            too_big = self.max_bytes and total > self.max_bytes
+            if not (too_old or too_big):
+                break
+            path.unlink(missing_ok=True)
+            (self.thumbnail_dir / path.name).unlink(missing_ok=True)
+            total -= stat.st_size
+            removed += 1
+        if removed:
+            logger.info(f"Removed {removed} old snapshots from the archive.")
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    """Writes a file so readers never see it partially written."""
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
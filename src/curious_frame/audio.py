@@ -2,17 +2,28 @@
 #
 # SPDX-License-Identifier: MIT
 """Audio module for the Curious Frame project."""
-import hashlib
+import io
 import logging
-import os
-import subprocess
-
-import requests
+import queue
+import struct
+import threading
+import time
+import wave
+from typing import Iterable
 
+from curious_frame import tracing
+from curious_frame.audio_cache import AudioCache
+from curious_frame.client import HttpClient, default_client
 from curious_frame.language import Language
+from curious_frame.playback import AudioOutput, PcmFormat
 
 logger = logging.getLogger(__name__)
 
+# Header of the streaming responses of the Piper server: magic, sample rate,
+# sample width in bytes and number of channels
+PCM_STREAM_HEADER = struct.Struct("<4sIHH")
+PCM_STREAM_MAGIC = b"PCM1"
+
 
 class Audio:
     """A class to handle audio input and output."""
@@ -24,6 +35,11 @@ class Audio:
         language: str = "en",
         language_model: Language | None = None,
         cache_dir: str = "audio_cache",
+        output: AudioOutput | None = None,
+        stream_synthesis: bool = False,
+        client: HttpClient | None = None,
+        cache: AudioCache | None = None,
+        cache_max_bytes: int = 256 * 1024 * 1024,
     ) -> None:
         """Initializes the Audio class.
 
@@ -32,15 +48,27 @@ class Audio:
             aplay_device: The aplay device to use for audio output.
             language: The language to use for audio output.
             language_model: The language model to use for translation.
-            cache_dir: The directory to store cached audio files.
+            cache_dir: The directory of the audio cache.
+            output: The audio output; by default one is opened on the aplay
+                device on the first playback.
+            stream_synthesis: Whether to start playing the audio missing from
+                the cache while it is synthesized.
+            client: The HTTP client calling Piper; the shared one by default.
+            cache: The audio cache, e.g. shared with other instances; by
+                default one is opened in ``cache_dir`` and closed with this one.
+            cache_max_bytes: The size budget in bytes of the audio cache
+                opened by default.
         """
         self.piper_url = piper_url
         self.aplay_device = aplay_device
         self.language = language
         self.language_model = language_model
         self.cache_dir = cache_dir
-        if not os.path.exists(self.cache_dir):
-            os.makedirs(self.cache_dir)
+        self.output = output
+        self.stream_synthesis = stream_synthesis
+        self.client = client or default_client()
+        self._owns_cache = cache is None
+        self.cache = cache or AudioCache(cache_dir, cache_max_bytes)
 
     def set_language(self, language: str) -> None:
         """Set the language for audio output.
@@ -57,43 +85,301 @@ class Audio:
             text: The text to speak.
             language: The language to use for the audio output.
                 If None, the default language is used.
+            skip_translation: Whether the text is already in the output language.
+        """
+        if self.stream_synthesis and not self.is_cached(text, language):
+            self.synthesize_stream(text, language, skip_translation)
+        else:
+            self.play(self.synthesize(text, language, skip_translation))
+
+    def is_cached(self, text: str, language: str | None = None) -> bool:
+        """Whether the audio of a text is in the cache.
+
+        Args:
+            text: The text to speak.
+            language: The language to use for the audio output.
+                If None, the default language is used.
+
+        Returns:
+            Whether the audio is cached.
+        """
+        return self._cache_key(text, language or self.language) in self.cache
+
+    def prewarm(self, phrases: Iterable[tuple[str, str]]) -> int:
+        """Synthesizes the phrases missing from the cache.
+
+        Args:
+            phrases: The text and the language of each phrase; the texts are
+                already in their language.
+
+        Returns:
+            The number of phrases synthesized.
+        """
+        synthesized = 0
+        for text, language in phrases:
+            if self.is_cached(text, language):
+                continue
+            try:
+                self.synthesize(text, language, skip_translation=True)
+                synthesized += 1
+            except Exception as e:
+                logger.warning(f"Unable to pre-warm '{text}': {e}")
+        logger.info(f"Pre-warmed {synthesized} phrases in the audio cache.")
+        return synthesized
+
+    def prepare(self, texts: Iterable[str], language: str | None = None) -> None:
+        """Translates in a single request the texts whose audio is not cached.
+
+        The translations are stored by the language model and reused when the
+        texts are synthesized.
+
+        Args:
+            texts: The texts to speak, in English.
+            language: The language to use for the audio output.
+                If None, the default language is used.
         """
         lang = language or self.language
-        is_french = lang == "fr"
-        # Generate a unique filename from the hash of the text
-        text_hash = hashlib.md5(text.encode()).hexdigest()
-        if is_french:
-            text_hash += "_fr"
-        cached_audio_path = os.path.join(self.cache_dir, f"{text_hash}.wav")
-
-        if not os.path.exists(cached_audio_path):
-            to_speak = text
-            if is_french and not skip_translation:
-                if self.language_model is None:
-                    raise ValueError(
-                        "Language model is required for French translation."
+        if lang != "fr" or self.language_model is None:
+            return
+        missing = [
+            text for text in dict.fromkeys(texts) if not self.is_cached(text, lang)
+        ]
+        if len(missing) > 1:
+            self.language_model.translate_many(missing, "french")
+
+    def speak_stream(
+        self,
+        sentences: Iterable[str],
+        language: str | None = None,
+        skip_translation: bool = False,
+    ) -> str:
+        """Speaks sentences as soon as they are available.
+
+        The sentences are consumed and synthesized in a background thread
+        while the previous ones are being played.
+
+        Args:
+            sentences: The sentences to speak; typically a generator fed by
+                a streaming language model response.
+            language: The language to use for the audio output.
+                If None, the default language is used.
+            skip_translation: Whether the sentences are already in the output language.
+
+        Returns:
+            The text spoken.
+        """
+        spoken = []
+        synthesized: queue.Queue = queue.Queue()
+
+        def produce() -> None:
+            try:
+                for sentence in sentences:
+                    spoken.append(sentence)
+                    synthesized.put(
+                        self.synthesize(sentence, language, skip_translation)
                     )
-                to_speak = self.language_model.translate(text, "french")
+            except Exception as e:
+                synthesized.put(e)
+            finally:
+                synthesized.put(None)
+
+        producer = threading.Thread(
+            target=produce, name="audio-synthesizer", daemon=True
+        )
+        producer.start()
+        try:
+            while (item := synthesized.get()) is not None:
+                if isinstance(item, Exception):
+                    raise item
+                self.play(item)
+        finally:
+            producer.join()
+
+        return " ".join(spoken)
+
+    def synthesize(
+        self, text: str, language: str | None = None, skip_translation: bool = False
+    ) -> str:
+        """Synthesizes the given text if it is not in the cache.
+
+        Args:
+            text: The text to synthesize.
+            language: The language to use for the audio output.
+                If None, the default language is used.
+            skip_translation: Whether the text is already in the output language.
+
+        Returns:
+            The key of the audio in the cache.
+        """
+        lang = language or self.language
+        key = self._cache_key(text, lang)
+
+        if key not in self.cache:
+            data = self._piper_request(text, lang, skip_translation)
+            with tracing.span("piper") as span:
+                response = self.client.post(
+                    "piper.synthesize", self.piper_url, json=data
+                )
+                response.raise_for_status()
+                if span is not None:
+                    span.set(bytes=len(response.content))
+            # Only the PCM frames are cached; the WAV header is replaced by the index
+            with wave.open(io.BytesIO(response.content), "rb") as wav_file:
+                fmt = PcmFormat(
+                    wav_file.getframerate(),
+                    wav_file.getsampwidth(),
+                    wav_file.getnchannels(),
+                )
+                pcm = wav_file.readframes(wav_file.getnframes())
+            self.cache.put(key, pcm, fmt)
+
+        return key
 
-            data = {"text": to_speak}
-            if is_french:
-                data["voice"] = "fr_FR-upmc-medium"
-                data["speaker_id"] = 0
+    def synthesize_stream(
+        self, text: str, language: str | None = None, skip_translation: bool = False
+    ) -> str:
+        """Plays the audio of a text while it is synthesized and caches it.
 
-            response = requests.post(self.piper_url, json=data, timeout=60)
+        The audio is requested from the streaming endpoint of the Piper server;
+        each chunk is queued on the audio output as soon as it is received.
+
+        Args:
+            text: The text to speak.
+            language: The language to use for the audio output.
+                If None, the default language is used.
+            skip_translation: Whether the text is already in the output language.
+
+        Returns:
+            The key of the audio in the cache.
+        """
+        lang = language or self.language
+        key = self._cache_key(text, lang)
+        data = self._piper_request(text, lang, skip_translation)
+        if self.output is None:
+            self.output = AudioOutput(self.aplay_device)
+
+        chunks = []
+        buffer = b""
+        fmt = None
+        with tracing.span("piper.stream") as span, self.client.post(
+            "piper.stream",
+            f"{self.piper_url.rstrip('/')}/stream",
+            json=data,
+            stream=True,
+        ) as response:
             response.raise_for_status()
-            with open(cached_audio_path, "wb") as f:
-                f.write(response.content)
+            for chunk in response.iter_content(chunk_size=None):
+                if fmt is None:
+                    buffer += chunk
+                    if len(buffer) < PCM_STREAM_HEADER.size:
+                        continue
+                    magic, rate, width, channels = PCM_STREAM_HEADER.unpack_from(buffer)
+                    if magic != PCM_STREAM_MAGIC:
+                        raise ValueError(
+                            "Unexpected audio stream from the Piper server."
+                        )
+                    fmt = PcmFormat(rate, width, channels)
+                    chunk = buffer[PCM_STREAM_HEADER.size :]
+                if chunk:
+                    if not chunks and span is not None:
+                        span.set(first_chunk=round(time.monotonic() - span.start, 4))
+                    self.output.write(chunk, fmt)
+                    chunks.append(chunk)
+        with tracing.span("play"):
+            self.output.mark().wait()
 
-        try:
-            subprocess.run(
-                ["aplay", "-D", self.aplay_device, cached_audio_path],
-                check=True,
-                capture_output=True,
-                text=True,
-            )
-        except subprocess.CalledProcessError as e:
-            logger.exception(f"Error playing audio: {e.stderr}", exc_info=e)
-            # Clean up the cached file if playback fails
-            if os.path.exists(cached_audio_path):
-                os.remove(cached_audio_path)
+        if fmt is not None and chunks:
+            self.cache.put(key, b"".join(chunks), fmt)
+
+        return key
+
+    def _piper_request(self, text: str, language: str, skip_translation: bool) -> dict:
+        """Builds the synthesis request, translating the text if needed.
+
+        Args:
+            text: The text to speak.
+            language: The language of the audio output.
+            skip_translation: Whether the text is already in the output language.
+
+        Returns:
+            The request payload for the Piper server.
+        """
+        is_french = language == "fr"
+        to_speak = text
+        if is_french and not skip_translation:
+            if self.language_model is None:
+                raise ValueError(
+                    "Language model is required for French translation."
+                )
+            to_speak = self.language_model.translate(text, "french")
+
+        return {"text": to_speak, **self._voice(language)}
+
+    @staticmethod
+    def _voice(language: str) -> dict:
+        """Gets the Piper voice parameters of a language.
+
+        Args:
+            language: The language of the audio output.
+
+        Returns:
+            The voice parameters; empty for the default voice.
+        """
+        if language == "fr":
+            return {"voice": "fr_FR-upmc-medium", "speaker_id": 0}
+        return {}
+
+    def _cache_key(self, text: str, language: str) -> str:
+        """Gets the key of the cached audio of a text.
+
+        Args:
+            text: The text to speak.
+            language: The language of the audio output.
+
+        Returns:
+            The key in the audio cache.
+        """
+        return AudioCache.key(text, language, **self._voice(language))
+
+    def play(self, key: str) -> None:
+        """Plays a cached audio.
+
+        The audio is queued on the audio output kept open straight from the
+        memory-mapped cache; this returns once the audio is sent to the device
+        so the next one follows without gap.
+
+        Args:
+            key: The key of the audio in the cache.
+        """
+        cached = self.cache.get(key)
+        if cached is None:
+            logger.warning(f"The audio {key} is not in the cache anymore.")
+            return
+        if self.output is None:
+            self.output = AudioOutput(self.aplay_device)
+        pcm, fmt = cached
+        with tracing.span("play"):
+            self.output.play_pcm(pcm, fmt)
+
+    def drain(self) -> None:
+        """Waits until the audio played so far is heard, not only sent to the device."""
+        if self.output is not None:
+            self.output.drain()
+
+    def check_output(self) -> bool:
+        """Checks that the audio device can be opened.
+
+        Returns:
+            Whether the device played a short silence.
+        """
+        if self.output is None:
+            self.output = AudioOutput(self.aplay_device)
+        return self.output.check()
+
+    def close(self) -> None:
+        """Plays the remaining audio and closes the audio device."""
+        if self.output is not None:
+            self.output.close()
+            self.output = None
+        if self._owns_cache:
+            self.cache.close()
@@ -0,0 +1,304 @@
+# SPDX-FileCopyrightText: 2025-present Frédéric Collonval <frederic.collonval@webscit.com>
+#
+# SPDX-License-Identifier: MIT
+"""Audio cache module for the Curious Frame project.
+
+The synthesized utterances are stored as raw PCM, one after the other, in a
+single append-only data file read through a memory map, so a cached
+utterance is sent to the audio device without being copied. The index of
+the utterances is kept in memory; it is loaded at startup from an
+append-only JSON Lines log next to the data file.
+
+The least recently played utterances are evicted beyond a size budget, and
+the data file is rewritten without them once they take as much space as the
+cached ones. The plays are logged in the index too, in batches, so the
+recency survives a restart; the index is rewritten without them on close.
+
+A cache directory must only be used by one process at a time.
+"""
+import hashlib
+import json
+import logging
+import mmap
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+
+from curious_frame.playback import PcmFormat
+
+logger = logging.getLogger(__name__)
+
+DATA_FILE = "audio.pack"
+INDEX_FILE = "audio.index"
+
+# Evicted bytes below which the data file is not compacted
+_MIN_COMPACTION_BYTES = 1024 * 1024
+# Number of plays logged at once in the index
+_TOUCH_BATCH = 16
+
+
+@dataclass
+class _Entry:
+    offset: int
+    length: int
+    format: PcmFormat
+
+
+class AudioCache:
+    """A size-bounded LRU cache of PCM audio packed in a single file."""
+
+    def __init__(
+        self, directory: str | Path, max_bytes: int = 256 * 1024 * 1024
+    ) -> None:
+        """Opens the cache, loading its index.
+
+        Args:
+            directory: The directory of the cache.
+            max_bytes: The maximal size in bytes of the cached audio.
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.data_path = self.directory / DATA_FILE
+        self.index_path = self.directory / INDEX_FILE
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        """The cached utterances, the least recently used first."""
+        self._live_bytes = 0
+        self._touched: list[str] = []
+        """The utterances played since the last write to the index."""
+        self._lock = threading.Lock()
+        self._load()
+        self._open()
+        with self._lock:
+            self._evict()
+
+    @staticmethod
+    def key(text: str, language: str, **params: object) -> str:
+        """Builds the key of an utterance.
+
+        Args:
+            text: The text to speak, before translation.
+            language: The language of the audio.
+            **params: The voice and the synthesis parameters.
+
+        Returns:
+            The key.
+        """
+        payload = json.dumps(
+            [language, sorted(params.items()), text], ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()[:32]
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def size(self) -> int:
+        """The size in bytes of the cached audio."""
+        return self._live_bytes
+
+    @property
+    def hit_rate(self) -> float:
+        """The ratio of lookups served from the cache."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def get(self, key: str) -> tuple[memoryview, PcmFormat] | None:
+        """Gets the audio of an utterance and marks it as recently used.
+
+        Args:
+            key: The key of the utterance.
+
+        Returns:
+            A read-only view on the PCM audio and its format, or None if the
+            utterance is not cached.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self._touched.append(key)
+            if len(self._touched) >= _TOUCH_BATCH:
+                self._flush_touched()
+            end = entry.offset + entry.length
+            if self._mapped_size < end:
+                # The previous map stays valid as long as views on it are used
+                self._map = mmap.mmap(self._reader.fileno(), 0, access=mmap.ACCESS_READ)
+                self._mapped_size = len(self._map)
+            return memoryview(self._map)[entry.offset : end], entry.format
+
+    def put(self, key: str, pcm: bytes, fmt: PcmFormat) -> None:
+        """Adds the audio of an utterance, evicting the least recently used ones.
+
+        Args:
+            key: The key of the utterance.
+            pcm: The raw PCM audio.
+            fmt: The format of the audio.
+        """
+        if not pcm:
+            return
+        with self._lock:
+            if key in self._entries:
+                return
+            self._flush_touched()
+            entry = _Entry(self._data_size, len(pcm), fmt)
+            self._data.write(pcm)
+            self._data.flush()
+            self._data_size += len(pcm)
+            self._write_index(key, entry)
+            self._entries[key] = entry
+            self._live_bytes += entry.length
+            self._evict()
+
+    def compact(self) -> None:
+        """Rewrites the data file with the cached audio only."""
+        with self._lock:
+            self._compact()
+
+    def close(self) -> None:
+        """Closes the files of the cache, rewriting the index in the recency order."""
+        with self._lock:
+            self._data.close()
+            self._index.close()
+            self._reader.close()
+            self._map = None
+            index_tmp = self.directory / f"{INDEX_FILE}.tmp"
+            self._write_index_file(index_tmp, self._entries)
+            os.replace(index_tmp, self.index_path)
+
+    def _load(self) -> None:
+        """Loads the index, ignoring the entries whose audio was not fully written."""
+        data_size = self.data_path.stat().st_size if self.data_path.exists() else 0
+        if not self.index_path.exists():
+            return
+        with open(self.index_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                    if record.get("deleted"):
+                        self._entries.pop(record["key"], None)
+                    elif record.get("touched"):
+                        if record["key"] in self._entries:
+                            self._entries.move_to_end(record["key"])
+                    else:
+                        entry = _Entry(
+                            record["offset"],
+                            record["length"],
+                            PcmFormat(
+                                record["rate"], record["width"], record["channels"]
+                            ),
+                        )
+                        if entry.offset + entry.length <= data_size:
+                            self._entries[record["key"]] = entry
+                except (KeyError, TypeError, json.JSONDecodeError):
+                    logger.warning(
+                        f"Skipping a malformed record of {self.index_path!s}."
+                    )
+        self._live_bytes = sum(entry.length for entry in self._entries.values())
+        logger.info(
+            f"Audio cache: {len(self._entries)} utterances, "
+            f"{self._live_bytes / 1e6:.1f} MB."
+        )
+
+    def _open(self) -> None:
+        self._data = open(self.data_path, "ab")
+        self._data_size = self._data.seek(0, os.SEEK_END)
+        self._index = open(self.index_path, "a", encoding="utf-8")
+        self._reader = open(self.data_path, "rb")
+        self._map: mmap.mmap | None = None
+        self._mapped_size = 0
+
+    def _write_index(self, key: str, entry: _Entry | None) -> None:
+        if entry is None:
+            record = {"key": key, "deleted": True}
+        else:
+            record = _record(key, entry)
+        self._index.write(json.dumps(record) + "\n")
+        self._index.flush()
+
+    def _flush_touched(self) -> None:
+        """Logs the recent plays in the index."""
+        if not self._touched:
+            return
+        records = (json.dumps({"key": key, "touched": True}) for key in self._touched)
+        self._index.write("".join(record + "\n" for record in records))
+        self._index.flush()
+        self._touched.clear()
+
+    @staticmethod
+    def _write_index_file(path: Path, entries: OrderedDict[str, _Entry]) -> None:
+        """Writes an index listing the entries in the LRU order."""
+        with open(path, "w", encoding="utf-8") as f:
+            for key, entry in entries.items():
+                f.write(json.dumps(_record(key, entry)) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _evict(self) -> None:
+        """Evicts the least recently used utterances beyond the size budget."""
+        evicted = 0
+        # The newest utterance is kept even if it is larger than the budget
+        while self._live_bytes > self.max_bytes and len(self._entries) > 1:
+            key, entry = self._entries.popitem(last=False)
+            self._write_index(key, None)
+            self._live_bytes -= entry.length
+            evicted += 1
+        if evicted:
+            logger.debug(f"Evicted {evicted} utterances from the audio cache.")
+        dead_bytes = self._data_size - self._live_bytes
+        if dead_bytes > max(self._live_bytes, _MIN_COMPACTION_BYTES):
+            self._compact()
+
+    def _compact(self) -> None:
+        data_tmp = self.directory / f"{DATA_FILE}.tmp"
+        index_tmp = self.directory / f"{INDEX_FILE}.tmp"
+        self._data.flush()
+        entries: OrderedDict[str, _Entry] = OrderedDict()
+        offset = 0
+        with open(data_tmp, "wb") as data:
+            for key, entry in self._entries.items():
+                self._reader.seek(entry.offset)
+                data.write(self._reader.read(entry.length))
+                entries[key] = _Entry(offset, entry.length, entry.format)
+                offset += entry.length
+            data.flush()
+            os.fsync(data.fileno())
+        # The plays not logged yet are kept by the LRU order of the new index
+        self._touched.clear()
+        self._write_index_file(index_tmp, entries)
+
+        self._data.close()
+        self._index.close()
+        self._reader.close()
+        # Without index after a crash the cache is empty rather than wrong
+        self.index_path.unlink()
+        os.replace(data_tmp, self.data_path)
+        os.replace(index_tmp, self.index_path)
+        logger.info(
+            f"Compacted the audio cache from {self._data_size / 1e6:.1f} MB "
+            f"to {offset / 1e6:.1f} MB."
+        )
+        self._entries = entries
+        self._open()
+
+
+def _record(key: str, entry: _Entry) -> dict:
+    """Builds the index record of an utterance."""
+    return {
+        "key": key,
+        "offset": entry.offset,
+        "length": entry.length,
+        "rate": entry.format.rate,
+        "width": entry.format.width,
+        "channels": entry.format.channels,
+    }
@@ -2,37 +2,270 @@
 #
 # SPDX-License-Identifier: MIT
 """Camera module for the Curious Frame project."""
+import logging
+import threading
+
 import cv2
 import numpy as np
 
+logger = logging.getLogger(__name__)
+
+# Flags to decode a JPEG image at a reduced resolution
+_REDUCED_DECODING = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+
+class Snapshot:
+    """A camera snapshot encoded as JPEG at most once and decoded on demand.
+
+    A snapshot is built either from the JPEG bytes delivered by the camera
+    or from decoded pixels. The other representation is computed lazily and
+    memoized, so the same JPEG buffer is written to disk and sent to the VLM.
+    """
+
+    def __init__(
+        self,
+        jpeg: bytes | None = None,
+        frame: np.ndarray | None = None,
+        quality: int = 90,
+    ) -> None:
+        """Initializes the snapshot.
+
+        Args:
+            jpeg: The JPEG encoded image.
+            frame: The BGR pixels of the image.
+            quality: The JPEG quality used if the pixels need to be encoded.
+        """
+        if jpeg is None and frame is None:
+            raise ValueError("A snapshot requires an image.")
+        self._jpeg = jpeg
+        # Encodes the JPEG image once when the snapshot is shared across threads
+        self._jpeg_lock = threading.Lock()
+        self._frames: dict[int, np.ndarray] = {} if frame is None else {1: frame}
+        self.quality = quality
+
+    def to_jpeg(self) -> bytes:
+        """Gets the JPEG encoded image.
+
+        Returns:
+            The JPEG bytes.
+        """
+        if self._jpeg is None:
+            with self._jpeg_lock:
+                if self._jpeg is None:
+                    _, buffer = cv2.imencode(
+                        ".jpg",
+                        self._frames[1],
+                        [cv2.IMWRITE_JPEG_QUALITY, self.quality],
+                    )
+                    self._jpeg = buffer.tobytes()
+        return self._jpeg
+
+    def to_array(self, reduction: int = 1) -> np.ndarray:
+        """Gets the decoded pixels.
+
+        Args:
+            reduction: The factor by which the resolution is divided; one of 1, 2,
+                4 or 8. JPEG images are directly decoded at that resolution.
+
+        Returns:
+            The BGR pixels.
+        """
+        frame = self._frames.get(reduction)
+        if frame is None:
+            if 1 in self._frames:
+                full = self._frames[1]
+                frame = cv2.resize(
+                    full,
+                    (full.shape[1] // reduction, full.shape[0] // reduction),
+                    interpolation=cv2.INTER_AREA,
+                )
+            else:
+                frame = cv2.imdecode(
+                    np.frombuffer(self._jpeg, dtype=np.uint8),
+                    _REDUCED_DECODING[reduction],
+                )
+            self._frames[reduction] = frame
+        return frame
+
+    def save(self, path: str) -> None:
+        """Saves the JPEG image to a file.
+
+        Args:
+            path: The path to save the image to.
+        """
+        with open(path, "wb") as f:
+            f.write(self.to_jpeg())
+
 
 class Camera:
-    """A class to interact with the camera."""
+    """A class to interact with the camera.
+
+    The camera can be used in two ways:
+
+    - one-shot: each call to :meth:`get_frame` opens the capture pipeline,
+      reads a single frame and releases it.
+    - persistent: :meth:`start` opens the pipeline once and a background
+      thread keeps grabbing frames into a small ring buffer of preallocated
+      arrays. :meth:`get_frame` then returns the newest frame right away.
+      :meth:`stop` closes the pipeline.
 
-    def __init__(self, camera_id: int = 0, width: int = 1280, height: int = 720, fps=15) -> None:
+    In JPEG passthrough mode, the MJPEG frames of the camera are not decoded
+    by the pipeline; :meth:`get_snapshot` hands them over as is.
+    """
+
+    def __init__(
+        self,
+        camera_id: int = 0,
+        width: int = 1280,
+        height: int = 720,
+        fps=15,
+        buffer_size: int = 3,
+        passthrough: bool = False,
+    ) -> None:
         """Initializes the camera.
 
         Args:
             camera_id: The ID of the camera to use.
             width: The width of the camera frame.
             height: The height of the camera frame.
+            fps: The framerate of the camera.
+            buffer_size: The number of frames kept in the ring buffer
+                when the camera is started.
+            passthrough: Whether to keep the JPEG images of the camera
+                instead of decoding them in the capture pipeline.
         """
         self.camera_id = camera_id
         self.width = width
         self.height = height
         self.fps = fps
+        self.buffer_size = max(2, buffer_size)
+        self.passthrough = passthrough
         self.cap = None
 
-    def get_frame(self) -> np.ndarray | None:
+        self._buffers: list[np.ndarray | None] = []
+        self._latest = -1
+        self._lock = threading.Lock()
+        self._frame_ready = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def __enter__(self) -> "Camera":
+        self.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    @property
+    def is_running(self) -> bool:
+        """Whether the background frame grabber is running."""
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, timeout: float = 5.0) -> bool:
+        """Opens the capture pipeline and starts grabbing frames in the background.
+
+        Args:
+            timeout: The time in seconds to wait for the first frame.
+
+        Returns:
+            Whether a first frame was received within the timeout.
+        """
+        if self.is_running:
+            return True
+
+        self.cap = self._open()
+        if not self.cap.isOpened():
+            logger.error(f"Unable to open camera {self.camera_id}.")
+            self.release()
+            return False
+
+        self._buffers = [
+            # JPEG images have a variable size
+            None
+            if self.passthrough
+            else np.empty((self.height, self.width, 3), dtype=np.uint8)
+            for _ in range(self.buffer_size)
+        ]
+        self._latest = -1
+        self._frame_ready.clear()
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._grab_frames, name="camera-grabber", daemon=True
+        )
+        self._thread.start()
+        # The event is also set when the grabber stops without any frame
+        if not self._frame_ready.wait(timeout) or self._latest < 0:
+            logger.error(f"No frame received from camera {self.camera_id}.")
+            self.stop()
+            return False
+        return True
+
+    def stop(self) -> None:
+        """Stops the background frame grabber and releases the camera."""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.release()
+        self._buffers = []
+        self._latest = -1
+        self._frame_ready.clear()
+
+    def get_frame(self, timeout: float = 5.0) -> np.ndarray | None:
         """Gets a frame from the camera.
 
+        When the camera is started, the newest frame of the ring buffer is
+        returned; otherwise the capture pipeline is opened for a single frame.
+
+        Args:
+            timeout: The time in seconds to wait for a frame when the camera
+                is started but no frame has been received yet.
+
         Returns:
             The frame from the camera, or None if the frame could not be read.
         """
-        self.cap = cv2.VideoCapture(
-            self._gstreamer_pipeline(self.camera_id, self.width, self.height, self.fps),
-            cv2.CAP_GSTREAMER,
-        )
+        snapshot = self.get_snapshot(timeout)
+        return None if snapshot is None else snapshot.to_array()
+
+    def get_snapshot(self, timeout: float = 5.0) -> Snapshot | None:
+        """Gets a snapshot from the camera.
+
+        Args:
+            timeout: The time in seconds to wait for a frame when the camera
+                is started but no frame has been received yet.
+
+        Returns:
+            The snapshot, or None if the frame could not be read.
+        """
+        data = self._read(timeout)
+        if data is None:
+            return None
+        if self.passthrough:
+            return Snapshot(jpeg=data.tobytes())
+        return Snapshot(frame=data)
+
+    def _read(self, timeout: float) -> np.ndarray | None:
+        """Reads the newest frame of the ring buffer or a single frame.
+
+        Args:
+            timeout: The time in seconds to wait for a frame when the camera
+                is started but no frame has been received yet.
+
+        Returns:
+            The BGR pixels or, in passthrough mode, the JPEG bytes.
+        """
+        if self._thread is not None:
+            if not self._frame_ready.wait(timeout) or not self.is_running:
+                return None
+            with self._lock:
+                return self._buffers[self._latest].copy()
+
+        self.cap = self._open()
         if not self.cap.isOpened():
             return None
 
@@ -60,6 +293,40 @@ class Camera:
         """
         cv2.imwrite(path, frame)
 
+    def _open(self) -> cv2.VideoCapture:
+        """Opens the capture pipeline.
+
+        Returns:
+            The video capture.
+        """
+        return cv2.VideoCapture(
+            self._gstreamer_pipeline(self.camera_id, self.width, self.height, self.fps),
+            cv2.CAP_GSTREAMER,
+        )
+
+    def _grab_frames(self) -> None:
+        """Reads frames into the ring buffer until the camera is stopped.
+
+        The slot being written is never the one published as the latest
+        frame, so readers only need the lock to copy the latest frame.
+        """
+        while not self._stop_event.is_set():
+            index = (self._latest + 1) % self.buffer_size
+            ret, frame = self.cap.read(self._buffers[index])
+            if not ret or frame is None:
+                logger.error(
+                    f"Lost camera {self.camera_id}, stopping the frame grabber."
+                )
+                break
+            if frame is not self._buffers[index]:
+                # JPEG image or frame with an unexpected shape
+                self._buffers[index] = frame
+            with self._lock:
+                self._latest = index
+            self._frame_ready.set()
+        # Unblock readers waiting for a frame
+        self._frame_ready.set()
+
     def _gstreamer_pipeline(
         self,
         camera_id: int = 0,
@@ -69,6 +336,8 @@ class Camera:
     ) -> str:
         """Create a GStreamer pipeline for the camera.
 
+        In passthrough mode the pipeline delivers the JPEG images of the camera.
+
         Args:
             camera_id: The ID of the camera to use.
             capture_width: The width of the camera frame.
@@ -78,9 +347,13 @@ class Camera:
         Returns:
             The GStreamer pipeline string.
         """
-        return (
+        source = (
             f"v4l2src device=/dev/video{camera_id} ! "
             f"image/jpeg, width=(int){capture_width}, height=(int){capture_height}, framerate=(fraction){framerate}/1 ! "
+        )
+        if self.passthrough:
+            return source + "appsink"
+        return source + (
             "nvjpegdec ! "
             "video/x-raw ! "
             "videoconvert ! "
@@ -0,0 +1,262 @@
+# SPDX-FileCopyrightText: 2025-present Frédéric Collonval <frederic.collonval@webscit.com>
+#
+# SPDX-License-Identifier: MIT
+"""Action card module for the Curious Frame project.
+
+Action cards are recognized locally with OpenCV instead of the VLM. The
+cards are declared in a JSON registry; each card uses one of the detectors:
+
+- ``aruco``: a fiducial marker printed on the card (``marker_id`` and
+  optional ``dictionary``, default ``DICT_4X4_50``).
+- ``stripes``: vertical bands of colors like a flag (``colors`` as hex
+  strings from left to right and optional ``tolerance`` in Lab units).
+- ``template``: a picture of the card (``template`` path relative to the
+  registry file and optional ``threshold`` of the normalized correlation).
+
+Each card has an ``action`` mapping, for example ``{"language": "fr"}``; the
+supported actions are listed in ``ACTIONS``.
+"""
+import json
+import logging
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Iterable
+
+import cv2
+import numpy as np
+
+from curious_frame.phrases import LANGUAGES
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REGISTRY = Path(__file__).parent / "cards.json"
+
+# Width in pixels of the frame analyzed by the detectors
+_ANALYSIS_WIDTH = 480
+
+# The actions a card can trigger and their accepted values
+ACTIONS: dict[str, tuple[str, ...]] = {
+    "language": LANGUAGES,
+}
+
+
+@dataclass
+class ActionCard:
+    """An action card declared in the registry."""
+
+    name: str
+    detector: str
+    label: str = ""
+    action: dict[str, Any] = field(default_factory=dict)
+    params: dict[str, Any] = field(default_factory=dict)
+
+    def __post_init__(self) -> None:
+        self.label = self.label or self.name.replace("_", " ")
+
+
+class ActionCardDetector:
+    """Detects the action cards of a registry in camera frames."""
+
+    def __init__(self, registry: str | Path = DEFAULT_REGISTRY) -> None:
+        """Initializes the detector.
+
+        Args:
+            registry: The path to the JSON registry of action cards.
+        """
+        self.registry = Path(registry)
+        with self.registry.open() as f:
+            entries = json.load(f).get("cards", [])
+
+        self.cards: list[ActionCard] = []
+        self._templates: dict[str, np.ndarray] = {}
+        self._aruco: dict[str, cv2.aruco.ArucoDetector] = {}
+        for entry in entries:
+            entry = dict(entry)
+            name = entry.pop("name")
+            card = ActionCard(
+                name=name,
+                detector=entry.pop("detector"),
+                label=entry.pop("label", ""),
+                action=_check_action(name, entry.pop("action", {})),
+                params=entry,
+            )
+            if card.detector == "template":
+                path = self.registry.parent / card.params["template"]
+                template = cv2.imread(str(path), cv2.IMREAD_GRAYSCALE)
+                if template is None:
+                    logger.warning(
+                        f"Unable to read the template of card {card.name}: {path!s}"
+                    )
+                    continue
+                self._templates[card.name] = template
+            elif card.detector == "aruco":
+                dictionary = card.params.setdefault("dictionary", "DICT_4X4_50")
+                if dictionary not in self._aruco:
+                    self._aruco[dictionary] = cv2.aruco.ArucoDetector(
+                        cv2.aruco.getPredefinedDictionary(
+                            getattr(cv2.aruco, dictionary)
+                        )
+                    )
+            elif card.detector != "stripes":
+                logger.warning(
+                    f"Unknown detector {card.detector} for card {card.name}."
+                )
+                continue
+            self.cards.append(card)
+
+        logger.info(f"Loaded action cards: {[card.name for card in self.cards]}")
+
+    def detect(self, frame: np.ndarray) -> list[ActionCard]:
+        """Detects the action cards displayed in a frame.
+
+        Args:
+            frame: The BGR frame.
+
+        Returns:
+            The action cards found.
+        """
+        scale = _ANALYSIS_WIDTH / frame.shape[1]
+        if scale < 1:
+            frame = cv2.resize(
+                frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA
+            )
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        lab = None
+
+        markers: dict[str, set[int]] = {}
+        for dictionary, detector in self._aruco.items():
+            _, ids, _ = detector.detectMarkers(gray)
+            markers[dictionary] = set() if ids is None else set(ids.flatten().tolist())
+
+        found = []
+        for card in self.cards:
+            if card.detector == "aruco":
+                present = card.params["marker_id"] in markers[card.params["dictionary"]]
+            elif card.detector == "stripes":
+                if lab is None:
+                    lab = cv2.cvtColor(frame, cv2.COLOR_BGR2LAB).astype(np.int16)
+                present = _find_stripes(
+                    lab, card.params["colors"], card.params.get("tolerance", 40)
+                )
+            else:
+                present = _find_template(
+                    gray, self._templates[card.name], card.params.get("threshold", 0.8)
+                )
+            if present:
+                found.append(card)
+
+        if found:
+            logger.info(f"Found action cards: {[card.name for card in found]}")
+        return found
+
+
+def combine_actions(cards: Iterable[ActionCard]) -> dict[str, Any]:
+    """Combines the actions of the cards found in a frame.
+
+    Args:
+        cards: The action cards found, the first one taking precedence.
+
+    Returns:
+        The value of each action triggered.
+    """
+    actions: dict[str, Any] = {}
+    for card in cards:
+        for key, value in card.action.items():
+            actions.setdefault(key, value)
+    return actions
+
+
+def _check_action(card: str, action: dict[str, Any]) -> dict[str, Any]:
+    """Keeps the supported actions of a card, logging the others.
+
+    Args:
+        card: The name of the card.
+        action: The action mapping declared in the registry.
+
+    Returns:
+        The supported actions.
+    """
+    checked = {}
+    for key, value in action.items():
+        if key not in ACTIONS:
+            logger.warning(f"Ignoring the unknown action {key} of card {card}.")
+        elif value not in ACTIONS[key]:
+            logger.warning(
+                f"Ignoring the action {key} of card {card}: "
+                f"{value!r} is not one of {ACTIONS[key]}."
+            )
+        else:
+            checked[key] = value
+    return checked
+
+
+def _hex_to_lab(color: str) -> np.ndarray:
+    """Converts a hex RGB color to OpenCV 8-bit Lab."""
+    rgb = bytes.fromhex(color.lstrip("#"))
+    pixel = np.array([[[rgb[2], rgb[1], rgb[0]]]], dtype=np.uint8)
+    return cv2.cvtColor(pixel, cv2.COLOR_BGR2LAB)[0, 0].astype(np.int16)
+
+
+def _find_stripes(
+    lab: np.ndarray,
+    colors: list[str],
+    tolerance: float,
+    min_area: int = 50,
+    fill: float = 0.6,
+) -> bool:
+    """Looks for vertical bands of colors of equal width.
+
+    Args:
+        lab: The frame in 8-bit Lab.
+        colors: The hex colors of the bands from left to right.
+        tolerance: The maximal Lab distance to a band color.
+        min_area: The minimal area in pixels of a band.
+        fill: The minimal ratio of pixels matching the color in a band.
+
+    Returns:
+        Whether the bands were found.
+    """
+    masks = [
+        np.linalg.norm(lab - _hex_to_lab(color), axis=2) < tolerance for color in colors
+    ]
+    contours, _ = cv2.findContours(
+        masks[0].astype(np.uint8), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE
+    )
+    for contour in contours:
+        x, y, w, h = cv2.boundingRect(contour)
+        if w * h < min_area or masks[0][y : y + h, x : x + w].mean() < fill:
+            continue
+        for index, mask in enumerate(masks[1:], start=1):
+            band = mask[y : y + h, x + index * w : x + (index + 1) * w]
+            if band.shape[1] < w or band.mean() < fill:
+                break
+        else:
+            return True
+    return False
+
+
+def _find_template(
+    gray: np.ndarray, template: np.ndarray, threshold: float, scales=(0.25, 0.5, 0.75)
+) -> bool:
+    """Looks for a picture of a card at a few scales.
+
+    Args:
+        gray: The grayscale frame.
+        template: The grayscale picture of the card.
+        threshold: The minimal normalized correlation.
+        scales: The sizes of the card relative to the frame height.
+
+    Returns:
+        Whether the card was found.
+    """
+    for scale in scales:
+        factor = scale * gray.shape[0] / template.shape[0]
+        resized = cv2.resize(
+            template, None, fx=factor, fy=factor, interpolation=cv2.INTER_AREA
+        )
+        if resized.shape[0] > gray.shape[0] or resized.shape[1] > gray.shape[1]:
+            continue
+        result = cv2.matchTemplate(gray, resized, cv2.TM_CCOEFF_NORMED)
+        if result.max() >= threshold:
+            return True
+    return False
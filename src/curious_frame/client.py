@@ -0,0 +1,220 @@
+# SPDX-FileCopyrightText: 2025-present Frédéric Collonval <frederic.collonval@webscit.com>
+#
+# SPDX-License-Identifier: MIT
+"""HTTP client module for the Curious Frame project.
+
+The Ollama and Piper servers are called through a single client keeping
+connections alive. Each endpoint has its own connect and read timeouts so a
+stalled model does not hang the device; connection failures and gateway
+errors are retried with an exponential backoff. The latency and the size of
+the last responses are recorded for inspection.
+"""
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# Connect and read timeouts in seconds per endpoint; the read timeout bounds
+# the wait for each chunk of a streamed response
+DEFAULT_TIMEOUTS: dict[str, tuple[float, float]] = {
+    "ollama.chat": (3.0, 60.0),
+    "ollama.stream": (3.0, 30.0),
+    "ollama.translate": (3.0, 60.0),
+    "ollama.vision": (3.0, 120.0),
+    "ollama.warmup": (3.0, 300.0),
+    "piper.synthesize": (3.0, 60.0),
+    "piper.stream": (3.0, 60.0),
+}
+
+# HTTP statuses of a server not ready yet
+_RETRY_STATUSES = {502, 503, 504}
+
+
+@dataclass
+class CallRecord:
+    """The measures of an HTTP call."""
+
+    endpoint: str
+    url: str
+    status: int | None
+    """The HTTP status; None if no response was received."""
+    latency: float
+    """The time in seconds until the response headers were received."""
+    size: int | None
+    """The size in bytes of the response body; None for streamed responses
+    without Content-Length."""
+    attempts: int
+    timestamp: float
+
+
+class HttpClient:
+    """A pooled HTTP client shared by the models."""
+
+    def __init__(
+        self,
+        timeouts: dict[str, tuple[float, float]] | None = None,
+        retries: int = 2,
+        backoff: float = 0.5,
+        pool_size: int = 4,
+        history: int = 256,
+    ) -> None:
+        """Initializes the client.
+
+        Args:
+            timeouts: The connect and read timeouts in seconds per endpoint;
+                they override the default ones.
+            retries: The maximal number of retries of a failed call.
+            backoff: The delay in seconds before the first retry; it doubles
+                for each retry.
+            pool_size: The number of connections kept alive per server.
+            history: The number of calls kept in the records.
+        """
+        self.timeouts = {**DEFAULT_TIMEOUTS, **(timeouts or {})}
+        self.retries = retries
+        self.backoff = backoff
+        self.records: deque[CallRecord] = deque(maxlen=history)
+        self._records_lock = threading.Lock()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def post(
+        self, endpoint: str, url: str, stream: bool = False, **kwargs
+    ) -> requests.Response:
+        """Sends a POST request.
+
+        Args:
+            endpoint: The name of the endpoint selecting the timeouts,
+                e.g. ``ollama.chat``.
+            url: The URL.
+            stream: Whether to stream the response body.
+            **kwargs: The other arguments of ``requests.Session.post``.
+
+        Returns:
+            The response.
+
+        Raises:
+            requests.RequestException: If the call still fails after the retries.
+        """
+        kwargs.setdefault(
+            "timeout", self.timeouts.get(endpoint, DEFAULT_TIMEOUTS["ollama.chat"])
+        )
+        attempt = 0
+        while True:
+            attempt += 1
+            start = time.monotonic()
+            response = None
+            try:
+                response = self.session.post(url, stream=stream, **kwargs)
+                retry = response.status_code in _RETRY_STATUSES
+                if not retry or attempt > self.retries:
+                    return response
+                response.close()
+                logger.warning(
+                    f"{endpoint} answered {response.status_code}, retrying..."
+                )
+            except (requests.ConnectionError, requests.Timeout) as e:
+                # Only the connection is retried; a model too slow to answer is not
+                if isinstance(e, requests.ReadTimeout) or attempt > self.retries:
+                    self._record(endpoint, url, None, stream, start, attempt)
+                    raise
+                logger.warning(f"{endpoint} is unreachable, retrying: {e}")
+            finally:
+                if response is not None:
+                    self._record(endpoint, url, response, stream, start, attempt)
+            time.sleep(self.backoff * 2 ** (attempt - 1))
+
+    async def apost(
+        self, endpoint: str, url: str, stream: bool = False, **kwargs
+    ) -> requests.Response:
+        """Sends a POST request from a coroutine without blocking the event loop.
+
+        See ``post`` for the arguments.
+        """
+        return await asyncio.to_thread(self.post, endpoint, url, stream, **kwargs)
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        """Summarizes the recorded calls per endpoint.
+
+        Returns:
+            The number of calls, the number of failures, the mean and maximal
+            latency in seconds and the total size in bytes per endpoint.
+        """
+        with self._records_lock:
+            records = list(self.records)
+        summary: dict[str, dict[str, float]] = {}
+        for record in records:
+            entry = summary.setdefault(
+                record.endpoint,
+                {
+                    "calls": 0,
+                    "failures": 0,
+                    "mean_latency": 0.0,
+                    "max_latency": 0.0,
+                    "bytes": 0,
+                },
+            )
+            entry["calls"] += 1
+            entry["failures"] += record.status is None or record.status >= 400
+            deviation = record.latency - entry["mean_latency"]
+            entry["mean_latency"] += deviation / entry["calls"]
+            entry["max_latency"] = max(entry["max_latency"], record.latency)
+            entry["bytes"] += record.size or 0
+        return summary
+
+    def close(self) -> None:
+        """Closes the connections."""
+        self.session.close()
+
+    def _record(
+        self,
+        endpoint: str,
+        url: str,
+        response: requests.Response | None,
+        stream: bool,
+        start: float,
+        attempts: int,
+    ) -> None:
+        size = None
+        if response is not None:
+            if response.headers.get("Content-Length"):
+                size = int(response.headers["Content-Length"])
+            elif not stream:
+                size = len(response.content)
+        record = CallRecord(
+            endpoint,
+            url,
+            None if response is None else response.status_code,
+            time.monotonic() - start,
+            size,
+            attempts,
+            time.time(),
+        )
+        logger.debug(f"HTTP call: {record}")
+        with self._records_lock:
+            self.records.append(record)
+
+
+_default_client: HttpClient | None = None
+_default_lock = threading.Lock()
+
+
+def default_client() -> HttpClient:
+    """Gets the client shared by default by the models.
+
+    Returns:
+        The shared client.
+    """
+    global _default_client
+    with _default_lock:
+        if _default_client is None:
+            _default_client = HttpClient()
+        return _default_client
@@ -0,0 +1,41 @@
+# SPDX-FileCopyrightText: 2025-present Frédéric Collonval <frederic.collonval@webscit.com>
+#
+# SPDX-License-Identifier: MIT
+"""Perceptual fingerprints of camera frames."""
+import cv2
+import numpy as np
+
+
+def dhash(frame: np.ndarray, hash_size: int = 16) -> int:
+    """Computes the difference hash of a frame.
+
+    The frame is converted to grayscale and downscaled to
+    ``hash_size x (hash_size + 1)`` pixels; each bit tells whether a pixel
+    is brighter than its right neighbour. Small changes in exposure or
+    sensor noise leave most bits untouched while moving an object flips many.
+
+    Args:
+        frame: The BGR or grayscale frame.
+        hash_size: The number of rows of the hash; the hash has
+            ``hash_size ** 2`` bits.
+
+    Returns:
+        The fingerprint as an integer.
+    """
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    small = cv2.resize(gray, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    bits = small[:, 1:] > small[:, :-1]
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def hamming_distance(first: int, second: int) -> int:
+    """Counts the bits that differ between two fingerprints.
+
+    Args:
+        first: The first fingerprint.
+        second: The second fingerprint.
+
+    Returns:
+        The number of differing bits.
+    """
+    return (first ^ second).bit_count()
@@ -3,9 +3,15 @@
 # SPDX-License-Identifier: MIT
 """Language module for the Curious Frame project."""
 
+import json
 import logging
+import re
+import time
+from typing import Iterator
 
-import requests
+from curious_frame import tracing
+from curious_frame.client import HttpClient, default_client
+from curious_frame.store import TranslationCache
 
 logger = logging.getLogger(__name__)
 
@@ -15,6 +21,36 @@ GENERATION_OPTIONS = {
     "top_p": 0.9         # Response diversity
 }
 
+# JSON schema of the batched translation response
+TRANSLATIONS_SCHEMA = {
+    "type": "object",
+    "properties": {"translations": {"type": "array", "items": {"type": "string"}}},
+    "required": ["translations"],
+}
+
+# End of a sentence: punctuation, optional closing quotes or brackets, then a space
+_SENTENCE_END = re.compile(r"[.!?…]+[\"'»)\]]*\s+")
+
+
+def split_sentences(text: str) -> tuple[list[str], str]:
+    """Splits the complete sentences from a text being generated.
+
+    Args:
+        text: The text generated so far.
+
+    Returns:
+        The complete sentences and the remaining unfinished text.
+    """
+    sentences = []
+    start = 0
+    for match in _SENTENCE_END.finditer(text):
+        sentence = text[start : match.end()].strip()
+        if sentence:
+            sentences.append(sentence)
+        start = match.end()
+    return sentences, text[start:]
+
+
 class Language:
     """A class to interact with the language model."""
 
@@ -22,15 +58,33 @@ class Language:
         self,
         model: str = "hf.co/unsloth/gemma-3n-E2B-it-GGUF:Q4_K_M",
         url: str = "http://127.0.0.1:11434/api/chat",
+        translations: TranslationCache | None = None,
+        client: HttpClient | None = None,
     ):
         """Initializes the language model.
 
         Args:
             model: The name of the model to use.
             url: The URL of the Ollama API.
+            translations: The store of known translations; by default they
+                are kept in memory.
+            client: The HTTP client calling Ollama; the shared one by default.
         """
         self.model = model
         self.url = url
+        self.translations = (
+            translations if translations is not None else TranslationCache()
+        )
+        self.client = client or default_client()
+
+    def warm_up(self) -> None:
+        """Loads the model into Ollama and keeps it loaded."""
+        response = self.client.post(
+            "ollama.warmup",
+            self.url,
+            json={"model": self.model, "messages": [], "keep_alive": -1},
+        )
+        response.raise_for_status()
 
     def chat(self, query: str) -> str:
         """Generates a description of the objects from the language model.
@@ -41,7 +95,64 @@ class Language:
         Returns:
             The description of the objects.
         """
-        data = {
+        data = self._chat_data(query, stream=False)
+
+        logger.debug(f"Prompt sent: {data}")
+        with tracing.span("llm") as span:
+            response = self.client.post("ollama.chat", self.url, json=data)
+            response.raise_for_status()
+            body = response.json()
+            tracing.record_ollama(span, body)
+        return body.get("message", {}).get("content").strip()
+
+    def chat_stream(self, query: str) -> Iterator[str]:
+        """Generates a description of the objects sentence by sentence.
+
+        The response is streamed by Ollama as newline-delimited JSON chunks;
+        each sentence is yielded as soon as it is complete.
+
+        Args:
+            query: The query to send asking for the objects to describe.
+
+        Yields:
+            The sentences of the description.
+        """
+        data = self._chat_data(query, stream=True)
+
+        logger.debug(f"Streaming prompt sent: {data}")
+        with tracing.span("llm.stream") as span, self.client.post(
+            "ollama.stream", self.url, json=data, stream=True
+        ) as response:
+            response.raise_for_status()
+            pending = ""
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                pending += chunk.get("message", {}).get("content", "")
+                sentences, pending = split_sentences(pending)
+                first = span is not None and "first_sentence" not in span.attributes
+                if sentences and first:
+                    span.set(first_sentence=round(time.monotonic() - span.start, 4))
+                yield from sentences
+                if chunk.get("done"):
+                    tracing.record_ollama(span, chunk)
+                    break
+
+        if pending.strip():
+            yield pending.strip()
+
+    def _chat_data(self, query: str, stream: bool) -> dict:
+        """Builds the chat request asking for a description of the objects.
+
+        Args:
+            query: The query to send asking for the objects to describe.
+            stream: Whether the response should be streamed.
+
+        Returns:
+            The request payload.
+        """
+        return {
             "model": self.model,
             "messages": [
                 {
@@ -56,18 +167,108 @@ class Language:
                     "content": query,
                 }
             ],
-            "stream": False,
+            "stream": stream,
             "keep_alive": -1,
         }
 
-        logger.info(f"Prompt sent: {data}")
-        response = requests.post(self.url, json=data)
-        response.raise_for_status()
-        return response.json().get("message", {}).get("content").strip()
-
     def translate(self, text: str, language: str) -> str:
         """Translate a text to a given language.
 
+        Args:
+            text: The text to translate.
+            language: The language to translate to.
+
+        Returns:
+            The translated text.
+        """
+        known = self.translations.lookup([text], language, self.model)
+        if text in known:
+            return known[text]
+
+        translation = self._translate(text, language)
+        self.translations.store({text: translation}, language, self.model)
+        return translation
+
+    def translate_many(self, texts: list[str], language: str) -> list[str]:
+        """Translate texts to a given language in a single request.
+
+        The texts already translated are taken from the store; the others are
+        sent together and the model replies with a JSON list of translations.
+
+        Args:
+            texts: The texts to translate.
+            language: The language to translate to.
+
+        Returns:
+            The translated texts, in the same order.
+        """
+        known = self.translations.lookup(texts, language, self.model)
+        missing = [text for text in dict.fromkeys(texts) if text not in known]
+        if len(missing) == 1:
+            known[missing[0]] = self.translate(missing[0], language)
+        elif missing:
+            translations = self._translate_batch(missing, language)
+            if translations is None:
+                # Fall back on one request per text
+                translations = [self._translate(text, language) for text in missing]
+            batch = dict(zip(missing, translations))
+            self.translations.store(batch, language, self.model)
+            known.update(batch)
+        return [known[text] for text in texts]
+
+    def _translate_batch(self, texts: list[str], language: str) -> list[str] | None:
+        """Requests the translations of several texts as structured output.
+
+        Args:
+            texts: The texts to translate.
+            language: The language to translate to.
+
+        Returns:
+            The translated texts, or None if the response is not a list of
+            as many translations.
+        """
+        language = language.capitalize()
+        data = {
+            "model": self.model,
+            "messages": [
+                {
+                    "role": "system",
+                    "content": "You are a helpful assistant that translates texts "
+                    f"from English into {language}."
+                    "Do not use any special formatting or emojis in your response."
+                    f"Provide only the {language} translation of each text, "
+                    "in the same order.",
+                },
+                {
+                    "role": "user",
+                    "content": "Translate the following texts: "
+                    f"{json.dumps(texts, ensure_ascii=False)}",
+                },
+            ],
+            "format": TRANSLATIONS_SCHEMA,
+            "stream": False,
+            "keep_alive": -1,
+        }
+
+        logger.debug(f"Batched translation prompt sent: {data}")
+        with tracing.span("translate", texts=len(texts)) as span:
+            response = self.client.post("ollama.translate", self.url, json=data)
+            response.raise_for_status()
+            body = response.json()
+            tracing.record_ollama(span, body)
+        try:
+            content = body.get("message", {}).get("content")
+            translations = json.loads(content)["translations"]
+        except (TypeError, KeyError, json.JSONDecodeError):
+            translations = None
+        if not isinstance(translations, list) or len(translations) != len(texts):
+            logger.warning(f"Unexpected batched translation: {translations}")
+            return None
+        return [str(translation).strip() for translation in translations]
+
+    def _translate(self, text: str, language: str) -> str:
+        """Requests the translation of a text.
+
         Args:
             text: The text to translate.
             language: The language to translate to.
@@ -91,7 +292,10 @@ class Language:
             "keep_alive": -1,
         }
 
-        logger.info(f"Translation prompt sent: {data}")
-        response = requests.post(self.url, json=data)
-        response.raise_for_status()
-        return response.json().get("message", {}).get("content").strip()
+        logger.debug(f"Translation prompt sent: {data}")
+        with tracing.span("translate", texts=1) as span:
+            response = self.client.post("ollama.translate", self.url, json=data)
+            response.raise_for_status()
+            body = response.json()
+            tracing.record_ollama(span, body)
+        return body.get("message", {}).get("content").strip()
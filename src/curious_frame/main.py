@@ -3,45 +3,52 @@
 # SPDX-License-Identifier: MIT
 """Main module for the Curious Frame project."""
 import argparse
-import csv
 import logging
 import os
-import time
-from datetime import datetime
+import re
+import sys
+import threading
 from pathlib import Path
+from typing import Any
 
+from curious_frame.archive import Archive
 from curious_frame.audio import Audio
 from curious_frame.camera import Camera
+from curious_frame.cards import DEFAULT_REGISTRY, ActionCardDetector
+from curious_frame.client import HttpClient
 from curious_frame.language import Language
-from curious_frame.vision import Vision
+from curious_frame.phrases import catalog, phrase
+from curious_frame.replay import Replay, read_captures
+from curious_frame.roi import FrameLocator
+from curious_frame.scheduler import MotionScheduler
+from curious_frame.session import Session
+from curious_frame.startup import Startup
+from curious_frame.stations import StationRuntime, load_stations
+from curious_frame.store import DescriptionCache, TranslationCache
+from curious_frame.tracing import NullTracer, Tracer
+from curious_frame.vision import Vision, VisionCache
 
 logger = logging.getLogger("curious_frame")
 
 
-def main() -> None:
-    """The main function for the Curious Frame project."""
-    parser = argparse.ArgumentParser(prog="python3 -m curious_frame", description="Curious Frame: An interactive tutor for kids.")
+def _common_options() -> argparse.ArgumentParser:
+    """Builds the parser of the options of all commands."""
+    parser = argparse.ArgumentParser(add_help=False)
     parser.add_argument(
-        "--camera-id", type=int, default=0, help="The ID of the camera to use (default: 0)."
-    )
-    parser.add_argument(
-        "--width", type=int, default=1280, help="The width of the camera frame (default: 1280)."
-    )
-    parser.add_argument(
-        "--height", type=int, default=720, help="The height of the camera frame (default: 720)."
-    )
-    parser.add_argument("--fps", type=int, default=15, help="The framerate of the camera (default: 15).")
-    parser.add_argument(
-        "--capture-dir",
-        type=str,
-        default=str(Path.home() / "curious_frame_captures"),
-        help="The directory to store captures (default: ~/curious_frame_captures).",
+        "--verbose", "-v", action="store_true", help="Display verbose logs."
     )
+    return parser
+
+
+def _model_options() -> argparse.ArgumentParser:
+    """Builds the parser of the options of the vision and language models."""
+    parser = argparse.ArgumentParser(add_help=False)
     parser.add_argument(
         "--llm-model",
         type=str,
         default="hf.co/unsloth/gemma-3n-E2B-it-GGUF:Q4_K_M",
-        help="The name of the language model to use (default: hf.co/unsloth/gemma-3n-E2B-it-GGUF:Q4_K_M).",
+        help="The name of the language model to use "
+        "(default: hf.co/unsloth/gemma-3n-E2B-it-GGUF:Q4_K_M).",
     )
     parser.add_argument(
         "--vlm-model",
@@ -55,12 +62,37 @@ def main() -> None:
         default="2025-06-21",
         help="The revision of the vision model (default: 2025-06-21).",
     )
+    parser.add_argument(
+        "--vlm-local",
+        action="store_true",
+        help="Run the vision model locally with transformers instead of Ollama; "
+        "the snapshots are then analyzed one at a time.",
+    )
+    parser.add_argument(
+        "--vlm-structured",
+        action="store_true",
+        help="Detect the French flag and list the objects in a single VLM call "
+        "returning JSON.",
+    )
     parser.add_argument(
         "--ollama-url",
         type=str,
         default="http://127.0.0.1:11434/api/chat",
         help="The URL of the Ollama API (default: http://127.0.0.1:11434/api/chat).",
     )
+    parser.add_argument(
+        "--ollama-timeout",
+        type=float,
+        default=60,
+        help="The maximal time in seconds to wait for an answer of the LLM; "
+        "the VLM gets twice as long (default: 60).",
+    )
+    return parser
+
+
+def _audio_options() -> argparse.ArgumentParser:
+    """Builds the parser of the options of the speech synthesis."""
+    parser = argparse.ArgumentParser(add_help=False)
     parser.add_argument(
         "--piper-url",
         type=str,
@@ -68,181 +100,697 @@ def main() -> None:
         help="The URL of the Piper TTS API (default: http://127.0.0.1:5000).",
     )
     parser.add_argument(
-        "--language",
+        "--piper-timeout",
+        type=float,
+        default=60,
+        help="The maximal time in seconds to wait for an answer of the Piper TTS "
+        "API (default: 60).",
+    )
+    parser.add_argument(
+        "--audio-cache-dir",
         type=str,
-        default="en",
-        choices=["en", "fr"],
-        help="The default language to use (default: en).",
+        default="audio_cache",
+        help="The directory to store cached audio files (default: audio_cache).",
+    )
+    parser.add_argument(
+        "--audio-cache-size",
+        type=int,
+        default=256,
+        help="The size budget in MB of the audio cache; the least recently played "
+        "audio is evicted beyond (default: 256).",
+    )
+    return parser
+
+
+def _session_options() -> argparse.ArgumentParser:
+    """Builds the parser of the options of the interactive sessions."""
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument(
+        "--width",
+        type=int,
+        default=1280,
+        help="The width of the camera frame (default: 1280).",
+    )
+    parser.add_argument(
+        "--height",
+        type=int,
+        default=720,
+        help="The height of the camera frame (default: 720).",
+    )
+    parser.add_argument(
+        "--fps", type=int, default=15, help="The framerate of the camera (default: 15)."
+    )
+    parser.add_argument(
+        "--jpeg-passthrough",
+        action="store_true",
+        help="Keep the JPEG images of the camera to store them and send them to the "
+        "VLM without re-encoding.",
+    )
+    parser.add_argument(
+        "--archive-reduction",
+        type=int,
+        default=1,
+        choices=[1, 2, 4, 8],
+        help="The factor by which the resolution of the stored snapshots is divided "
+        "(default: 1).",
+    )
+    parser.add_argument(
+        "--archive-thumbnail-width",
+        type=int,
+        default=0,
+        help="The width in pixels of the thumbnails stored next to the snapshots; "
+        "0 disables them (default: 0).",
+    )
+    parser.add_argument(
+        "--archive-max-size",
+        type=float,
+        default=0,
+        help="The maximal size in MB of the stored snapshots, the oldest are deleted "
+        "beyond; 0 for no limit (default: 0).",
+    )
+    parser.add_argument(
+        "--archive-max-age",
+        type=float,
+        default=0,
+        help="The number of days after which the stored snapshots are deleted; "
+        "0 to keep them (default: 0).",
+    )
+    parser.add_argument(
+        "--startup-timeout",
+        type=float,
+        default=120,
+        help="The maximal time in seconds to wait for the models, Piper, the camera "
+        "and the audio device at startup (default: 120).",
     )
     parser.add_argument(
         "--wait-time",
         type=int,
         default=60,
-        help="The time to wait in seconds when identical objects are detected (default: 60).",
+        help="The time to wait in seconds when identical objects are detected "
+        "(default: 60).",
+    )
+    parser.add_argument(
+        "--motion-trigger",
+        action="store_true",
+        help="Look at the scene again when it changed instead of after the wait "
+        "time; the shutdown timeout counts from the last motion.",
+    )
+    parser.add_argument(
+        "--motion-stable-time",
+        type=float,
+        default=1.0,
+        help="The time in seconds without motion before the changed scene is "
+        "analyzed (default: 1.0).",
+    )
+    parser.add_argument(
+        "--local-cards",
+        action="store_true",
+        help="Recognize the action cards locally with OpenCV instead of asking the "
+        "VLM.",
+    )
+    parser.add_argument(
+        "--card-registry",
+        type=str,
+        default=str(DEFAULT_REGISTRY),
+        help="The JSON registry of the action cards recognized locally "
+        "(default: the bundled registry).",
+    )
+    parser.add_argument(
+        "--frame-crop",
+        action="store_true",
+        help="Crop the snapshots to the cardboard frame before their analysis.",
+    )
+    parser.add_argument(
+        "--vlm-input-size",
+        type=int,
+        default=768,
+        help="The maximal size in pixels of the cropped snapshots sent to the VLM "
+        "(default: 768).",
+    )
+    parser.add_argument(
+        "--vision-cache-size",
+        type=int,
+        default=0,
+        help="The number of vision results cached by frame fingerprint; 0 disables "
+        "the cache (default: 0).",
+    )
+    parser.add_argument(
+        "--vision-cache-threshold",
+        type=int,
+        default=12,
+        help="The maximal number of differing fingerprint bits for two snapshots to "
+        "be considered the same scene (default: 12).",
+    )
+    parser.add_argument(
+        "--vision-cache-ttl",
+        type=float,
+        default=30,
+        help="The time in seconds after which a cached vision result expires; 0 "
+        "keeps the results until they are evicted (default: 30).",
     )
     parser.add_argument(
         "--shutdown-timeout",
         type=int,
         default=600,
-        help="The time in seconds before shutting down if identical objects are detected repeatedly (default: 600).",
+        help="The time in seconds before stopping if identical objects are detected "
+        "repeatedly (default: 600).",
     )
     parser.add_argument(
-        "--shutdown-at-exit",
+        "--stream-synthesis",
         action="store_true",
-        help="Shutdown the OS when the program exits.",
+        help="Start playing the audio missing from the cache while Piper "
+        "synthesizes it.",
     )
     parser.add_argument(
-        "--audio-cache-dir",
+        "--multilanguage",
+        action="store_true",
+        help="The LLM can speak multiple languages.",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Stream the description from the LLM and speak it sentence by sentence.",
+    )
+    parser.add_argument(
+        "--description-cache",
+        action="store_true",
+        help="Reuse the descriptions of object sets already described, stored in "
+        "the capture directory.",
+    )
+    parser.add_argument(
+        "--description-variants",
+        type=int,
+        default=3,
+        help="The number of descriptions generated then spoken in turn per object "
+        "set (default: 3).",
+    )
+    parser.add_argument(
+        "--description-ttl",
+        type=float,
+        default=30,
+        help="The number of days after which a cached description is generated "
+        "again (default: 30).",
+    )
+    parser.add_argument(
+        "--queue-size",
+        type=int,
+        default=2,
+        help="The maximal number of items waiting between two pipeline stages "
+        "(default: 2).",
+    )
+    return parser
+
+
+def _http_client(args: argparse.Namespace, pool_size: int = 4) -> HttpClient:
+    """Creates the HTTP client with the timeouts given on the command line.
+
+    Args:
+        args: The parsed command line arguments.
+        pool_size: The number of connections kept alive per server.
+
+    Returns:
+        The HTTP client.
+    """
+    timeouts = {}
+    if "ollama_timeout" in args:
+        timeouts.update(
+            {
+                "ollama.chat": (3.0, args.ollama_timeout),
+                "ollama.stream": (3.0, args.ollama_timeout / 2),
+                "ollama.translate": (3.0, args.ollama_timeout),
+                "ollama.vision": (3.0, 2 * args.ollama_timeout),
+            }
+        )
+    if "piper_timeout" in args:
+        timeouts.update(
+            {
+                "piper.synthesize": (3.0, args.piper_timeout),
+                "piper.stream": (3.0, args.piper_timeout),
+            }
+        )
+    return HttpClient(timeouts=timeouts, pool_size=pool_size)
+
+
+def _vision(
+    args: argparse.Namespace, client: HttpClient, cache: VisionCache | None = None
+) -> Vision:
+    """Creates the vision model given on the command line.
+
+    Args:
+        args: The parsed command line arguments.
+        client: The HTTP client calling Ollama.
+        cache: The cache of the vision results.
+
+    Returns:
+        The vision model.
+    """
+    return Vision(
+        model_name=args.vlm_model,
+        revision=args.vlm_revision,
+        url="" if args.vlm_local else args.ollama_url,
+        cache=cache,
+        structured=args.vlm_structured,
+        client=client,
+    )
+
+
+def _descriptions(
+    args: argparse.Namespace, capture_dir: Path
+) -> DescriptionCache | None:
+    """Opens the description cache if enabled on the command line.
+
+    Args:
+        args: The parsed command line arguments.
+        capture_dir: The directory storing the cache.
+
+    Returns:
+        The description cache; None if disabled.
+    """
+    if not args.description_cache:
+        return None
+    return DescriptionCache(
+        capture_dir / "descriptions.sqlite",
+        ttl=args.description_ttl * 24 * 3600,
+        variants=args.description_variants,
+    )
+
+
+def _device_options(
+    args: argparse.Namespace, camera: Camera, capture_dir: Path
+) -> dict[str, Any]:
+    """Creates the session options bound to a camera and its capture directory.
+
+    Args:
+        args: The parsed command line arguments.
+        camera: The camera of the session.
+        capture_dir: The directory storing the captures of the session.
+
+    Returns:
+        The archive, the action card detector, the frame locator and the motion
+        scheduler of the session.
+    """
+    return {
+        "archive": Archive(
+            capture_dir,
+            image_reduction=args.archive_reduction,
+            thumbnail_width=args.archive_thumbnail_width,
+            max_bytes=int(args.archive_max_size * 1024 * 1024),
+            max_age=args.archive_max_age * 24 * 3600,
+        ),
+        "cards": ActionCardDetector(args.card_registry) if args.local_cards else None,
+        "locator": (
+            FrameLocator(output_size=args.vlm_input_size) if args.frame_crop else None
+        ),
+        "scheduler": (
+            MotionScheduler(camera, stable_time=args.motion_stable_time)
+            if args.motion_trigger
+            else None
+        ),
+    }
+
+
+def prewarm(argv: list[str]) -> None:
+    """Synthesizes the phrase catalog into the audio cache.
+
+    Args:
+        argv: The command line arguments.
+    """
+    parser = argparse.ArgumentParser(
+        prog="python3 -m curious_frame prewarm",
+        description="Synthesize the fixed phrases of Curious Frame into the audio "
+        "cache.",
+        parents=[_audio_options(), _common_options()],
+    )
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO)
+
+    client = _http_client(args)
+    audio = Audio(
+        piper_url=args.piper_url,
+        cache_dir=args.audio_cache_dir,
+        cache_max_bytes=args.audio_cache_size * 1024 * 1024,
+        client=client,
+    )
+    try:
+        audio.prewarm(catalog())
+    finally:
+        audio.close()
+        client.close()
+
+
+def replay(argv: list[str]) -> None:
+    """Analyzes the snapshots of a capture directory again.
+
+    Args:
+        argv: The command line arguments.
+    """
+    parser = argparse.ArgumentParser(
+        prog="python3 -m curious_frame replay",
+        description="Analyze the snapshots of a capture directory again, e.g. with "
+        "another vision model.",
+        parents=[_model_options(), _common_options()],
+    )
+    parser.add_argument(
+        "--capture-dir",
         type=str,
-        default="audio_cache",
-        help="The directory to store cached audio files (default: audio_cache).",
+        default=str(Path.home() / "curious_frame_captures"),
+        help="The directory of the captures to replay "
+        "(default: ~/curious_frame_captures).",
+    )
+    parser.add_argument(
+        "--results",
+        type=str,
+        default=None,
+        help="The CSV file the results are appended to; an existing file is resumed "
+        "(default: replay_<vlm-model>.csv in the capture directory).",
+    )
+    parser.add_argument(
+        "--describe",
+        action="store_true",
+        help="Also describe the objects found with the language model.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=4,
+        help="The number of snapshots analyzed concurrently (default: 4).",
+    )
+    parser.add_argument(
+        "--limit",
+        type=int,
+        default=0,
+        help="The maximal number of snapshots to analyze; 0 for all (default: 0).",
+    )
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO)
+
+    capture_dir = Path(args.capture_dir)
+    model = re.sub(r"[^A-Za-z0-9.-]+", "_", args.vlm_model)
+    results = args.results or capture_dir / f"replay_{model}.csv"
+    workers = 1 if args.vlm_local else args.workers
+    client = _http_client(args, pool_size=workers)
+    vision = _vision(args, client)
+    language = (
+        Language(model=args.llm_model, url=args.ollama_url, client=client)
+        if args.describe
+        else None
+    )
+    try:
+        Replay(vision, results, language, workers).run(
+            read_captures(capture_dir), args.limit
+        )
+    finally:
+        client.close()
+    logger.info(f"Results written to {results!s}")
+
+
+def stations(argv: list[str]) -> None:
+    """Runs several stations sharing the vision and language models.
+
+    Args:
+        argv: The command line arguments.
+    """
+    parser = argparse.ArgumentParser(
+        prog="python3 -m curious_frame stations",
+        description="Drive several cardboard frames, each with its own camera and "
+        "audio device, from one device.",
+        parents=[
+            _model_options(),
+            _audio_options(),
+            _session_options(),
+            _common_options(),
+        ],
+    )
+    parser.add_argument(
+        "config",
+        type=str,
+        help="The JSON file listing the stations, e.g. "
+        '[{"name": "kitchen", "camera_id": 0, "audio_device": "plughw:1,0", '
+        '"language": "fr"}].',
+    )
+    parser.add_argument(
+        "--capture-dir",
+        type=str,
+        default=str(Path.home() / "curious_frame_captures"),
+        help="The directory to store the captures, in a subdirectory per station "
+        "(default: ~/curious_frame_captures).",
+    )
+    parser.add_argument(
+        "--backend-workers",
+        type=int,
+        default=1,
+        help="The number of requests sent concurrently to the models, "
+        "e.g. OLLAMA_NUM_PARALLEL (default: 1).",
+    )
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO)
+
+    configs = load_stations(args.config)
+    capture_dir = Path(args.capture_dir)
+    capture_dir.mkdir(parents=True, exist_ok=True)
+    # Each station keeps a connection to the models and to Piper
+    client = _http_client(args, pool_size=max(4, 2 * len(configs)))
+    translations = TranslationCache(capture_dir / "translations.sqlite")
+    language = Language(
+        model=args.llm_model,
+        url=args.ollama_url,
+        translations=translations,
+        client=client,
+    )
+    # The vision results are cached per station, their scenes differ
+    vision = _vision(args, client)
+    descriptions = _descriptions(args, capture_dir)
+
+    startup = Startup(timeout=args.startup_timeout)
+    startup.add("llm", language.warm_up, retry=True)
+    if args.vlm_local or args.vlm_model != args.llm_model:
+        startup.add("vlm", vision.warm_up, retry=True)
+    if not startup.run():
+        logger.warning("Some models are not ready; starting anyway.")
+
+    runtime = StationRuntime(
+        configs,
+        vision,
+        language,
+        args.piper_url,
+        capture_dir,
+        audio_cache_dir=args.audio_cache_dir,
+        audio_cache_max_bytes=args.audio_cache_size * 1024 * 1024,
+        client=client,
+        backend_workers=args.backend_workers,
+        camera_options={
+            "width": args.width,
+            "height": args.height,
+            "fps": args.fps,
+            "passthrough": args.jpeg_passthrough,
+        },
+        stream_synthesis=args.stream_synthesis,
+        vision_cache_size=args.vision_cache_size,
+        vision_cache_threshold=args.vision_cache_threshold,
+        vision_cache_ttl=args.vision_cache_ttl or None,
+        station_options=lambda camera, station_dir: _device_options(
+            args, camera, station_dir
+        ),
+        wait_time=args.wait_time,
+        shutdown_timeout=args.shutdown_timeout,
+        multilanguage=args.multilanguage,
+        stream=args.stream,
+        queue_size=args.queue_size,
+        descriptions=descriptions,
+    )
+    try:
+        runtime.run()
+    finally:
+        translations.close()
+        if descriptions is not None:
+            descriptions.close()
+        logger.info(f"HTTP calls: {client.summary()}")
+        client.close()
+
+
+COMMANDS = {"prewarm": prewarm, "replay": replay, "stations": stations}
+
+
+def main(argv: list[str] | None = None) -> None:
+    """The main function for the Curious Frame project.
+
+    Args:
+        argv: The command line arguments; the process arguments if None.
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] in COMMANDS:
+        COMMANDS[argv[0]](argv[1:])
+        return
+
+    parser = argparse.ArgumentParser(
+        prog="python3 -m curious_frame",
+        description="Curious Frame: An interactive tutor for kids.",
+        epilog="Other commands: 'prewarm' synthesizes the fixed phrases into the "
+        "audio cache, 'replay' analyzes the snapshots of a capture directory again "
+        "and 'stations' drives several cardboard frames sharing the models.",
+        parents=[
+            _model_options(),
+            _audio_options(),
+            _session_options(),
+            _common_options(),
+        ],
+    )
+    parser.add_argument(
+        "--camera-id",
+        type=int,
+        default=0,
+        help="The ID of the camera to use (default: 0).",
+    )
+    parser.add_argument(
+        "--capture-dir",
+        type=str,
+        default=str(Path.home() / "curious_frame_captures"),
+        help="The directory to store captures (default: ~/curious_frame_captures).",
+    )
+    parser.add_argument(
+        "--language",
+        type=str,
+        default="en",
+        choices=["en", "fr"],
+        help="The default language to use (default: en).",
+    )
+    parser.add_argument(
+        "--shutdown-at-exit",
+        action="store_true",
+        help="Shutdown the OS when the program exits.",
     )
     parser.add_argument(
         "--audio-device",
         type=str,
         default="sysdefault",
-        help="The audio device to use for playback (default: sysdefault).",
+        help="The ALSA device kept open for playback (default: sysdefault).",
     )
     parser.add_argument(
-        "--multilanguage",
-        action="store_true",
-        help="The LLM can speak multiple languages."
+        "--trace-file",
+        type=str,
+        default=None,
+        help="The JSON Lines file to append the stage timings of each interaction to "
+        "(default: no tracing).",
     )
-    parser.add_argument("--verbose", "-v", action="store_true", help="Display verbose logs.")
-    args = parser.parse_args()
-    
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        default=0,
+        help="The port serving the latency and cache metrics in the Prometheus "
+        "format at /metrics; 0 disables it (default: 0).",
+    )
+    args = parser.parse_args(argv)
+
     logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO)
 
     camera = Camera(
-        camera_id=args.camera_id, width=args.width, height=args.height, fps=args.fps
+        camera_id=args.camera_id,
+        width=args.width,
+        height=args.height,
+        fps=args.fps,
+        passthrough=args.jpeg_passthrough,
     )
+    # Create a directory to store the captures
+    capture_dir = Path(args.capture_dir)
+    capture_dir.mkdir(parents=True, exist_ok=True)
+
     multimodal_model = args.vlm_model == args.llm_model
-    vision = Vision(model_name=args.vlm_model, revision=args.vlm_revision, url=args.ollama_url)
-    language = Language(model=args.llm_model, url=args.ollama_url)
+    # Keep the connections to Ollama and Piper alive for the whole session
+    client = _http_client(args)
+    translations = TranslationCache(capture_dir / "translations.sqlite")
+    language = Language(
+        model=args.llm_model,
+        url=args.ollama_url,
+        translations=translations,
+        client=client,
+    )
     audio = Audio(
         piper_url=args.piper_url,
         language_model=language,
         language=args.language,
         cache_dir=args.audio_cache_dir,
+        cache_max_bytes=args.audio_cache_size * 1024 * 1024,
         aplay_device=args.audio_device,
+        stream_synthesis=args.stream_synthesis,
+        client=client,
     )
+    # Synthesize the fixed phrases while the models are loading
+    threading.Thread(
+        target=audio.prewarm, args=(catalog(),), name="audio-prewarm", daemon=True
+    ).start()
 
-    # Create a directory to store the captures
-    capture_dir = Path(args.capture_dir)
-    capture_dir.mkdir(parents=True, exist_ok=True)
-    csv_path = capture_dir / "captures.csv"
-
-    audio.speak("Hey there! I am curious about the world around me. Let's explore together!")
-
-    last_objects = set()
-    identical_start_time = None
-    asked_for_new_object = False
-
-    while True:
-        logger.info("Taking a new snapshot...")
-        frame = camera.get_frame()
-        if frame is None:
-            break
-
-        # Save the image first
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        image_path = capture_dir / f"{timestamp}.jpg"
-        camera.save_frame(str(image_path), frame)
-        logger.info(f"Snapshot taken and saved in {image_path!s}")
-
-        objects = set()
-        description = ""
-        objects_list = None
-        try:
-            # audio.speak("I am looking for objects.")
-            logger.info("Analyzing the snapshot...")
-            objects_list = vision.find_objects(frame) or ""
-            logger.info(f"Found objects: {objects_list}")
-            found_flag = False
-
-            for obj in objects_list.split(","):
-                obj = obj.strip()
-                if not obj:
-                    continue
-
-                if "french flag" not in obj.lower():
-                    if obj.lower() not in {"cardboard frame", "unknown"}:
-                        objects.add(obj)
-                else:
-                    found_flag = True
-                    if audio.language != "fr":
-                        audio.set_language("fr")
-                        audio.speak("Je vais maintenant parler en français.", skip_translation=True)
-            
-            if not found_flag and audio.language != "en":
-                audio.set_language("en")
-                audio.speak("I'm switching to English.")
-
-            if len(objects.difference(last_objects)) == 0:
-                logger.info("Identical objects detected, waiting for new input...")
-                if identical_start_time is None:
-                    identical_start_time = time.time()
-
-                elapsed_time = time.time() - identical_start_time
-                if elapsed_time >= args.shutdown_timeout:
-                    audio.speak("I am shutting down now. Goodbye!")
-                    break
-
-                if (
-                    not asked_for_new_object
-                    and elapsed_time >= (2 / 3) * args.shutdown_timeout
-                ):
-                    msg = "Veux-tu me montrer autre chose?" if audio.language == "fr" else "Do you want to show me something else?"
-                    audio.speak(msg, skip_translation=True)
-                    asked_for_new_object = True
-
-                time.sleep(args.wait_time)
-                # Take a new frame after the wait time
-                continue
-            else:
-                identical_start_time = None
-                asked_for_new_object = False
-
-            if len(objects):
-                object_str = ", ".join([*objects][:2])  # Limit to first two objects
-                text = f"J'ai vu {object_str}. Je recherche des informations sur ceux-ci." if args.multilanguage and audio.language == "fr" else f"I found {object_str}. Let me find information about them."
-                audio.speak(text, skip_translation=True)
-                query = f"Dis moi ce que sont les objets suivants et à quoi ils servent: {object_str}." if args.multilanguage and audio.language == "fr" else f"Tell what those objects are and what they are used for: {object_str}."
-                description = language.chat(query)
-            elif found_flag:
-                # This case happens when only the french flag is detected
-                query = "Qu'est-ce que le drapeau français et à quoi sert-il?" if args.multilanguage and audio.language == "fr" else "Tell me what is the French flag and what it is used for."
-                description = language.chat("the French flag")
-            else:
-                description = "I could not find any objects."
-                logger.info("No objects found.")
-
-            logger.info(f"Description: {description}")
-            audio.speak(description.replace("*", ""), skip_translation=args.multilanguage)
-
-            time.sleep(5)
-            msg = "Veux-tu me montrer autre chose?" if audio.language == "fr" else "Do you want to show me something else?"
-            audio.speak(msg, skip_translation=True)
-        except KeyboardInterrupt:
-            audio.speak("Stopping now! Goodbye!", language="en", skip_translation=True)
-            break
-        except Exception as e:
-            audio.speak("I don't know what to say, sorry.", language="en", skip_translation=True)
-            logger.exception(f"An error occurred.", exc_info=e)
-            description = f"Error: {e}"
-        
-        last_objects = objects
-
-        # Always store the information in the CSV file
-        with open(csv_path, "a", newline="") as csvfile:
-            writer = csv.writer(csvfile)
-            writer.writerow(
-                [
-                    str(image_path),
-                    objects_list if objects_list else "N/A",
-                    description if description else "N/A",
-                ]
-            )
+    vision_cache = (
+        VisionCache(
+            max_size=args.vision_cache_size,
+            max_distance=args.vision_cache_threshold,
+            ttl=args.vision_cache_ttl or None,
+        )
+        if args.vision_cache_size > 0
+        else None
+    )
+    vision = _vision(args, client, vision_cache)
+    descriptions = _descriptions(args, capture_dir)
+
+    tracing = args.trace_file or args.metrics_port
+    tracer = Tracer(args.trace_file) if tracing else NullTracer()
+    if vision_cache is not None:
+        tracer.gauges["vision_cache_hit_rate"] = lambda: vision_cache.hits / max(
+            vision_cache.hits + vision_cache.misses, 1
+        )
+    if descriptions is not None:
+        tracer.gauges["description_cache_hit_rate"] = lambda: descriptions.hit_rate
+    tracer.gauges["translation_cache_hit_rate"] = lambda: translations.hit_rate
+    tracer.gauges["audio_cache_hit_rate"] = lambda: audio.cache.hit_rate
+    if args.metrics_port:
+        tracer.serve_metrics(args.metrics_port)
+
+    # Load the models, open the devices and synthesize the greeting in parallel
+    greeting = phrase("greeting", args.language)
+    startup = Startup(timeout=args.startup_timeout)
+    startup.add("llm", language.warm_up, retry=True)
+    if args.vlm_local or not multimodal_model:
+        # The local model is run once on a dummy image
+        startup.add("vlm", vision.warm_up, retry=True)
+    startup.add(
+        "piper", lambda: audio.synthesize(greeting, skip_translation=True), retry=True
+    )
+    # Keep the capture pipeline open for the whole session
+    startup.add("camera", lambda: camera.start(timeout=args.startup_timeout))
+    startup.add("audio", audio.check_output)
+    if not startup.run():
+        logger.warning("Some components are not ready; starting anyway.")
+
+    audio.speak(greeting, skip_translation=True)
+
+    session = Session(
+        camera,
+        vision,
+        language,
+        audio,
+        capture_dir,
+        wait_time=args.wait_time,
+        shutdown_timeout=args.shutdown_timeout,
+        multilanguage=args.multilanguage,
+        stream=args.stream,
+        queue_size=args.queue_size,
+        descriptions=descriptions,
+        tracer=tracer,
+        **_device_options(args, camera, capture_dir),
+    )
+    try:
+        session.run()
+    finally:
+        camera.stop()
+        audio.close()
+        translations.close()
+        logger.info(f"HTTP calls: {client.summary()}")
+        client.close()
+        if descriptions is not None:
+            descriptions.close()
+        tracer.close()
 
     if args.shutdown_at_exit:
         os.system("shutdown now")
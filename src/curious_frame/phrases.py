@@ -0,0 +1,69 @@
+# SPDX-FileCopyrightText: 2025-present Frédéric Collonval <frederic.collonval@webscit.com>
+#
+# SPDX-License-Identifier: MIT
+"""Catalog of the fixed phrases spoken by Curious Frame.
+
+Each phrase is declared in all supported languages so it never needs to be
+translated at runtime and its audio can be synthesized ahead of time.
+"""
+from typing import Iterator
+
+LANGUAGES = ("en", "fr")
+
+PHRASES: dict[str, dict[str, str]] = {
+    "greeting": {
+        "en": "Hey there! I am curious about the world around me. "
+        "Let's explore together!",
+        "fr": "Coucou ! Je suis curieux du monde qui m'entoure. "
+        "Explorons-le ensemble !",
+    },
+    "switch_language": {
+        "en": "I'm switching to English.",
+        "fr": "Je vais maintenant parler en français.",
+    },
+    "something_else": {
+        "en": "Do you want to show me something else?",
+        "fr": "Veux-tu me montrer autre chose?",
+    },
+    "no_objects": {
+        "en": "I could not find any objects.",
+        "fr": "Je n'ai trouvé aucun objet.",
+    },
+    "error": {
+        "en": "I don't know what to say, sorry.",
+        "fr": "Je ne sais pas quoi dire, désolé.",
+    },
+    "shutdown": {
+        "en": "I am shutting down now. Goodbye!",
+        "fr": "Je m'éteins maintenant. Au revoir !",
+    },
+    "stopping": {
+        "en": "Stopping now! Goodbye!",
+        "fr": "Je m'arrête maintenant ! Au revoir !",
+    },
+}
+
+
+def phrase(key: str, language: str) -> str:
+    """Gets a phrase of the catalog.
+
+    Args:
+        key: The key of the phrase.
+        language: The language of the phrase; English if it is not supported.
+
+    Returns:
+        The text of the phrase.
+    """
+    texts = PHRASES[key]
+    return texts.get(language, texts["en"])
+
+
+def catalog() -> Iterator[tuple[str, str]]:
+    """Lists all phrases of the catalog.
+
+    Yields:
+        The text and the language of each phrase.
+    """
+    for texts in PHRASES.values():
+        for language in LANGUAGES:
+            yield texts[language], language
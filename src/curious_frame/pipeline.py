@@ -0,0 +1,204 @@
+# SPDX-FileCopyrightText: 2025-present Frédéric Collonval <frederic.collonval@webscit.com>
+#
+# SPDX-License-Identifier: MIT
+"""Staged pipeline module for the Curious Frame project.
+
+A pipeline is made of worker threads, the stages, connected by bounded
+queues. A full queue blocks the upstream stage (backpressure) and stopping
+the pipeline cancels any pending ``put`` or ``get``.
+"""
+import logging
+import queue
+import threading
+from typing import Any, Callable
+
+logger = logging.getLogger(__name__)
+
+# Period in seconds at which blocked stages check for cancellation
+_POLL_INTERVAL = 0.1
+
+
+class Stage:
+    """A worker thread processing the items of a bounded queue."""
+
+    def __init__(
+        self,
+        name: str,
+        handler: Callable[[Any], None],
+        stop_event: threading.Event,
+        maxsize: int = 1,
+    ) -> None:
+        """Initializes the stage.
+
+        Args:
+            name: The name of the stage.
+            handler: The function called for each item.
+            stop_event: The event cancelling the stage.
+            maxsize: The maximal number of items waiting in the queue.
+        """
+        self.name = name
+        self.handler = handler
+        self.queue: queue.Queue = queue.Queue(maxsize)
+        self._stop_event = stop_event
+        self._pending = 0
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(
+            target=self._run, name=f"stage-{name}", daemon=True
+        )
+
+    @property
+    def depth(self) -> int:
+        """The number of items waiting in the queue."""
+        return self.queue.qsize()
+
+    @property
+    def pending(self) -> int:
+        """The number of items waiting or being processed."""
+        return self._pending
+
+    def peek(self) -> list[Any]:
+        """Gets the items waiting in the queue without removing them.
+
+        Returns:
+            The waiting items, oldest first.
+        """
+        with self.queue.mutex:
+            return list(self.queue.queue)
+
+    def put(self, item: Any) -> bool:
+        """Puts an item in the queue, blocking while the queue is full.
+
+        Args:
+            item: The item to process.
+
+        Returns:
+            Whether the item was queued; False if the pipeline was stopped.
+        """
+        with self._condition:
+            self._pending += 1
+        while not self._stop_event.is_set():
+            try:
+                self.queue.put(item, timeout=_POLL_INTERVAL)
+                return True
+            except queue.Full:
+                continue
+        self._done()
+        return False
+
+    def join(self) -> bool:
+        """Waits until all queued items have been processed.
+
+        Returns:
+            Whether the stage is idle; False if the pipeline was stopped.
+        """
+        with self._condition:
+            while self._pending and not self._stop_event.is_set():
+                self._condition.wait(_POLL_INTERVAL)
+            return not self._pending
+
+    def _done(self) -> None:
+        with self._condition:
+            self._pending -= 1
+            self._condition.notify_all()
+
+    def _run(self) -> None:
+        while not self._stop_event.is_set():
+            try:
+                item = self.queue.get(timeout=_POLL_INTERVAL)
+            except queue.Empty:
+                continue
+            try:
+                self.handler(item)
+            except Exception as e:
+                logger.exception(
+                    f"Stage {self.name} failed to process an item.", exc_info=e
+                )
+            finally:
+                self._done()
+
+
+class Pipeline:
+    """A set of stages sharing the same cancellation event."""
+
+    def __init__(self) -> None:
+        """Initializes the pipeline."""
+        self.stop_event = threading.Event()
+        self.stages: dict[str, Stage] = {}
+        self._threads: list[threading.Thread] = []
+
+    @property
+    def stopped(self) -> bool:
+        """Whether the pipeline was stopped."""
+        return self.stop_event.is_set()
+
+    def add_stage(
+        self, name: str, handler: Callable[[Any], None], maxsize: int = 1
+    ) -> Stage:
+        """Adds a stage processing the items of a bounded queue.
+
+        Args:
+            name: The name of the stage.
+            handler: The function called for each item.
+            maxsize: The maximal number of items waiting in the queue.
+
+        Returns:
+            The stage.
+        """
+        stage = Stage(name, handler, self.stop_event, maxsize)
+        self.stages[name] = stage
+        self._threads.append(stage._thread)
+        return stage
+
+    def add_source(self, name: str, produce: Callable[[], None]) -> None:
+        """Adds a stage without input calling a function until the pipeline stops.
+
+        Args:
+            name: The name of the source.
+            produce: The function called repeatedly; it feeds the other stages.
+        """
+
+        def run() -> None:
+            while not self.stop_event.is_set():
+                try:
+                    produce()
+                except Exception as e:
+                    logger.exception(f"Source {name} failed.", exc_info=e)
+                    self.stop()
+
+        self._threads.append(
+            threading.Thread(target=run, name=f"source-{name}", daemon=True)
+        )
+
+    def queue_depths(self) -> dict[str, int]:
+        """Gets the number of items waiting in each stage queue.
+
+        Returns:
+            The queue depth per stage name.
+        """
+        return {name: stage.depth for name, stage in self.stages.items()}
+
+    def start(self) -> None:
+        """Starts all stages."""
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self) -> None:
+        """Cancels all stages; it can be called from any thread."""
+        self.stop_event.set()
+
+    def wait(self) -> None:
+        """Blocks until the pipeline is stopped."""
+        # Wake up regularly so KeyboardInterrupt is raised in the main thread
+        while not self.stop_event.wait(0.5):
+            pass
+
+    def join(self, timeout: float | None = None) -> None:
+        """Waits for the stage threads to finish their current item.
+
+        Args:
+            timeout: The maximal time in seconds to wait for each thread.
+        """
+        current = threading.current_thread()
+        for thread in self._threads:
+            if thread is not current and thread.is_alive():
+                thread.join(timeout)
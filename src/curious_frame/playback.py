@@ -0,0 +1,266 @@
+# SPDX-FileCopyrightText: 2025-present Frédéric Collonval <frederic.collonval@webscit.com>
+#
+# SPDX-License-Identifier: MIT
+"""Audio output module for the Curious Frame project.
+
+The audio device is opened once and fed from a queue of PCM buffers, so
+utterances are played back to back without reopening the device and a
+buffer can be played while the next ones are still being synthesized.
+
+The device is driven in-process with ``pyalsaaudio`` when it is installed;
+otherwise a single long-lived ``aplay`` process reads raw PCM on its
+standard input.
+
+The device buffers the audio it receives, so the audio sent is only played
+some time later; the end of the playback is estimated from the duration of
+the audio sent.
+"""
+import logging
+import queue
+import subprocess
+import threading
+import time
+import wave
+from dataclasses import dataclass
+
+logger = logging.getLogger(__name__)
+
+# Number of frames read at once from a WAV file
+_CHUNK_FRAMES = 4096
+
+
+@dataclass(frozen=True)
+class PcmFormat:
+    """The format of raw PCM audio."""
+
+    rate: int = 22050
+    """Sample rate in Hz."""
+    width: int = 2
+    """Sample width in bytes."""
+    channels: int = 1
+    """Number of channels."""
+
+    @property
+    def frame_size(self) -> int:
+        """The size in bytes of a frame."""
+        return self.width * self.channels
+
+
+class _AplaySink:
+    """Writes PCM to a long-lived aplay process."""
+
+    _FORMATS = {1: "U8", 2: "S16_LE", 4: "S32_LE"}
+
+    def __init__(self, device: str, fmt: PcmFormat) -> None:
+        self.process = subprocess.Popen(
+            [
+                "aplay",
+                "-q",
+                "-D",
+                device,
+                "-t",
+                "raw",
+                "-f",
+                self._FORMATS[fmt.width],
+                "-r",
+                str(fmt.rate),
+                "-c",
+                str(fmt.channels),
+            ],
+            stdin=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+
+    def write(self, data: bytes | memoryview) -> None:
+        self.process.stdin.write(data)
+        self.process.stdin.flush()
+
+    def close(self) -> None:
+        # Closing the input lets aplay play the remaining buffer and exit
+        try:
+            self.process.stdin.close()
+        except BrokenPipeError:
+            pass
+        self.process.wait()
+
+
+class _AlsaSink:
+    """Writes PCM to an ALSA device opened in-process."""
+
+    def __init__(self, device: str, fmt: PcmFormat) -> None:
+        import alsaaudio
+
+        formats = {
+            1: alsaaudio.PCM_FORMAT_U8,
+            2: alsaaudio.PCM_FORMAT_S16_LE,
+            4: alsaaudio.PCM_FORMAT_S32_LE,
+        }
+        self.frame_size = fmt.frame_size
+        self.pending = b""
+        self.pcm = alsaaudio.PCM(
+            alsaaudio.PCM_PLAYBACK,
+            device=device,
+            channels=fmt.channels,
+            rate=fmt.rate,
+            format=formats[fmt.width],
+            periodsize=1024,
+        )
+
+    def write(self, data: bytes | memoryview) -> None:
+        # ALSA only accepts whole frames; the data is copied only to join a partial one
+        if self.pending:
+            data = self.pending + bytes(data)
+        cut = len(data) - len(data) % self.frame_size
+        self.pending = bytes(data[cut:])
+        if cut:
+            self.pcm.write(data[:cut])
+
+    def close(self) -> None:
+        self.pcm.drain()
+        self.pcm.close()
+
+
+def _open_sink(device: str, fmt: PcmFormat):
+    try:
+        return _AlsaSink(device, fmt)
+    except ImportError:
+        return _AplaySink(device, fmt)
+
+
+class AudioOutput:
+    """Plays queued PCM buffers on an audio device kept open."""
+
+    def __init__(self, device: str = "sysdefault", max_buffers: int = 64) -> None:
+        """Initializes the audio output.
+
+        Args:
+            device: The ALSA device to play on.
+            max_buffers: The maximal number of buffers waiting to be played.
+        """
+        self.device = device
+        self._queue: queue.Queue = queue.Queue(max_buffers)
+        self._sink = None
+        self._format: PcmFormat | None = None
+        self._played_at = 0.0
+        """The monotonic time at which the audio sent is played."""
+        self.last_error: Exception | None = None
+        """The last error raised by the audio device."""
+        self._thread = threading.Thread(
+            target=self._run, name="audio-output", daemon=True
+        )
+        self._thread.start()
+
+    def write(self, data: bytes | memoryview, fmt: PcmFormat) -> None:
+        """Queues a PCM buffer; it blocks while the queue is full.
+
+        Args:
+            data: The raw PCM audio.
+            fmt: The format of the audio.
+        """
+        self._queue.put((fmt, data))
+
+    def mark(self) -> threading.Event:
+        """Queues a marker set once all previous buffers are sent to the device.
+
+        Returns:
+            The event set when the marker is reached.
+        """
+        reached = threading.Event()
+        self._queue.put((None, reached))
+        return reached
+
+    def drain(self) -> None:
+        """Waits until the queued audio is played, not only sent to the device."""
+        self.mark().wait()
+        remaining = self._played_at - time.monotonic()
+        if remaining > 0:
+            time.sleep(remaining)
+
+    def play_wav(self, path: str, block: bool = True) -> None:
+        """Queues the audio of a WAV file.
+
+        Args:
+            path: The path to the WAV file.
+            block: Whether to wait until the audio is sent to the device.
+
+        Raises:
+            wave.Error: If the file is not a valid WAV file.
+        """
+        with wave.open(path, "rb") as wav_file:
+            fmt = PcmFormat(
+                wav_file.getframerate(),
+                wav_file.getsampwidth(),
+                wav_file.getnchannels(),
+            )
+            while data := wav_file.readframes(_CHUNK_FRAMES):
+                self.write(data, fmt)
+        if block:
+            self.mark().wait()
+
+    def play_pcm(
+        self, data: bytes | memoryview, fmt: PcmFormat, block: bool = True
+    ) -> None:
+        """Queues raw PCM audio.
+
+        The audio is queued in slices of the given buffer, without copy.
+
+        Args:
+            data: The raw PCM audio.
+            fmt: The format of the audio.
+            block: Whether to wait until the audio is sent to the device.
+        """
+        data = memoryview(data)
+        step = _CHUNK_FRAMES * fmt.frame_size
+        for start in range(0, len(data), step):
+            self.write(data[start : start + step], fmt)
+        if block:
+            self.mark().wait()
+
+    def check(self, timeout: float = 5.0) -> bool:
+        """Plays a short silence to check that the device can be opened.
+
+        Args:
+            timeout: The maximal time in seconds to wait for the device.
+
+        Returns:
+            Whether the silence was played without error.
+        """
+        self.last_error = None
+        fmt = PcmFormat()
+        self.write(bytes(fmt.frame_size * fmt.rate // 20), fmt)
+        return self.mark().wait(timeout) and self.last_error is None
+
+    def close(self) -> None:
+        """Plays the remaining buffers and closes the device."""
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self) -> None:
+        while (item := self._queue.get()) is not None:
+            fmt, data = item
+            if fmt is None:
+                data.set()
+                continue
+            try:
+                if fmt != self._format:
+                    self._close_sink()
+                    self._sink = _open_sink(self.device, fmt)
+                    self._format = fmt
+                # The audio follows the one still buffered, or starts now
+                start = max(self._played_at, time.monotonic())
+                self._sink.write(data)
+                self._played_at = start + len(data) / (fmt.frame_size * fmt.rate)
+            except Exception as e:
+                self.last_error = e
+                logger.exception(f"Error playing audio on {self.device}.", exc_info=e)
+                self._close_sink()
+        self._close_sink()
+
+    def _close_sink(self) -> None:
+        if self._sink is not None:
+            try:
+                self._sink.close()
+            except Exception as e:
+                logger.warning(f"Error closing the audio device: {e}")
+            self._sink = None
+            self._format = None
@@ -0,0 +1,253 @@
+# SPDX-FileCopyrightText: 2025-present Frédéric Collonval <frederic.collonval@webscit.com>
+#
+# SPDX-License-Identifier: MIT
+"""Replay module for the Curious Frame project.
+
+The snapshots of a capture directory are analyzed again, e.g. to compare
+vision models offline. The images are streamed through a pool of concurrent
+requests and each result is appended to a CSV file as soon as it is known,
+so an interrupted replay resumes with the images not analyzed yet.
+"""
+import csv
+import json
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from curious_frame.camera import Snapshot
+from curious_frame.language import Language
+from curious_frame.session import describe_query
+from curious_frame.vision import Detection, Vision
+
+logger = logging.getLogger(__name__)
+
+RESULT_FIELDS = [
+    "image",
+    "recorded_objects",
+    "objects",
+    "added",
+    "removed",
+    "french_flag",
+    "vision_latency",
+    "description",
+    "describe_latency",
+    "error",
+]
+
+
+@dataclass
+class Capture:
+    """A snapshot of a capture directory and what was recorded about it."""
+
+    image: Path
+    objects: str | None = None
+    """The objects recorded for the snapshot; None if unknown."""
+
+
+def read_captures(capture_dir: str | Path) -> Iterator[Capture]:
+    """Lists the snapshots of a capture directory.
+
+    The snapshots are read from the ``captures.jsonl`` log, or the
+    ``captures.csv`` log of older versions. The snapshots missing from the
+    logs are listed last, without recorded objects.
+
+    Args:
+        capture_dir: The capture directory.
+
+    Yields:
+        The snapshots still on disk, in the order they were taken.
+    """
+    capture_dir = Path(capture_dir)
+    seen = set()
+
+    def locate(image: str) -> Path | None:
+        # The legacy log stores the absolute path of the snapshot
+        path = Path(image)
+        if not path.is_absolute() or not path.exists():
+            path = capture_dir / path.name
+        return path if path.exists() else None
+
+    log_path = capture_dir / "captures.jsonl"
+    if log_path.exists():
+        with open(log_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning(f"Skipping a malformed record of {log_path!s}.")
+                    continue
+                path = locate(record.get("image") or "")
+                if path is not None and path not in seen:
+                    seen.add(path)
+                    yield Capture(path, record.get("objects"))
+
+    legacy_path = capture_dir / "captures.csv"
+    if legacy_path.exists():
+        with open(legacy_path, newline="", encoding="utf-8") as f:
+            for row in csv.reader(f):
+                if not row:
+                    continue
+                path = locate(row[0])
+                if path is not None and path not in seen:
+                    seen.add(path)
+                    objects = row[1] if len(row) > 1 and row[1] != "N/A" else None
+                    yield Capture(path, objects)
+
+    for path in sorted(capture_dir.glob("*.jpg")):
+        if path not in seen:
+            yield Capture(path)
+
+
+class Replay:
+    """Analyzes the snapshots of a capture directory again."""
+
+    def __init__(
+        self,
+        vision: Vision,
+        results_path: str | Path,
+        language: Language | None = None,
+        workers: int = 4,
+    ) -> None:
+        """Initializes the replay.
+
+        Args:
+            vision: The vision model listing the objects.
+            results_path: The CSV file the results are appended to.
+            language: The language model describing the objects found; if None
+                the objects are not described.
+            workers: The number of snapshots analyzed concurrently.
+        """
+        self.vision = vision
+        self.language = language
+        self.results_path = Path(results_path)
+        self.workers = max(1, workers)
+
+    def done(self) -> set[str]:
+        """Gets the snapshots already analyzed successfully.
+
+        Returns:
+            The names of the analyzed snapshots.
+        """
+        if not self.results_path.exists():
+            return set()
+        with open(self.results_path, newline="", encoding="utf-8") as f:
+            # The failed snapshots are analyzed again
+            return {row["image"] for row in csv.DictReader(f) if not row.get("error")}
+
+    def run(self, captures: Iterable[Capture], limit: int = 0) -> dict[str, float]:
+        """Analyzes the snapshots not in the results file yet.
+
+        Args:
+            captures: The snapshots.
+            limit: The maximal number of snapshots to analyze; 0 for no limit.
+
+        Returns:
+            The number of snapshots analyzed, the number of failures, the number
+            of snapshots with recorded objects and of those whose objects match
+            the recorded ones, the mean vision latency in seconds and the
+            throughput in snapshots per second.
+        """
+        done = self.done()
+        if done:
+            logger.info(f"Resuming after {len(done)} snapshots already analyzed.")
+        pending = (capture for capture in captures if capture.image.name not in done)
+
+        summary = {
+            "analyzed": 0,
+            "failures": 0,
+            "compared": 0,
+            "matches": 0,
+            "mean_latency": 0.0,
+        }
+        start = time.monotonic()
+        new_file = not self.results_path.exists()
+        with open(
+            self.results_path, "a", newline="", encoding="utf-8"
+        ) as f, ThreadPoolExecutor(
+            self.workers, thread_name_prefix="replay"
+        ) as executor:
+            writer = csv.DictWriter(f, RESULT_FIELDS)
+            if new_file:
+                writer.writeheader()
+            running: set[Future] = set()
+            submitted = 0
+            for capture in pending:
+                if limit and submitted >= limit:
+                    break
+                # Only a few images are loaded at once
+                if len(running) >= 2 * self.workers:
+                    completed, running = wait(running, return_when=FIRST_COMPLETED)
+                    self._write(writer, f, completed, summary)
+                running.add(executor.submit(self._analyze, capture))
+                submitted += 1
+            self._write(writer, f, wait(running).done, summary)
+
+        elapsed = time.monotonic() - start
+        summary["throughput"] = summary["analyzed"] / elapsed if elapsed else 0.0
+        logger.info(
+            f"Replayed {summary['analyzed']} snapshots in {elapsed:.1f}s "
+            f"({summary['throughput']:.2f}/s): "
+            f"{summary['matches']}/{summary['compared']} unchanged, "
+            f"{summary['failures']} failures, "
+            f"mean vision latency {summary['mean_latency']:.2f}s."
+        )
+        return summary
+
+    def _analyze(self, capture: Capture) -> dict[str, str]:
+        """Lists the objects of a snapshot and describes them."""
+        # The recorded objects stay None when unknown, written as an empty cell
+        row = {"image": capture.image.name, "recorded_objects": capture.objects}
+        try:
+            snapshot = Snapshot(jpeg=capture.image.read_bytes())
+            start = time.monotonic()
+            detection = self.vision.detect(snapshot)
+            row["vision_latency"] = f"{time.monotonic() - start:.3f}"
+            row["objects"] = str(detection)
+            row["french_flag"] = str(detection.french_flag)
+
+            if capture.objects is not None:
+                found = {obj.lower() for obj in detection.objects}
+                recorded = set()
+                if capture.objects.lower() != "no cardboard frame":
+                    recorded_detection = Detection.from_text(capture.objects)
+                    recorded = {obj.lower() for obj in recorded_detection.objects}
+                row["added"] = ", ".join(sorted(found - recorded))
+                row["removed"] = ", ".join(sorted(recorded - found))
+
+            if self.language is not None and detection.objects:
+                start = time.monotonic()
+                query = describe_query(sorted(detection.objects)[:2])
+                row["description"] = self.language.chat(query)
+                row["describe_latency"] = f"{time.monotonic() - start:.3f}"
+        except Exception as e:
+            logger.warning(f"Unable to analyze {capture.image.name}: {e}")
+            row["error"] = str(e) or type(e).__name__
+        return row
+
+    def _write(
+        self,
+        writer: csv.DictWriter,
+        f,
+        completed: Iterable[Future],
+        summary: dict[str, float],
+    ) -> None:
+        """Appends the completed results and updates the summary."""
+        for future in completed:
+            row = future.result()
+            writer.writerow(row)
+            if row.get("error"):
+                summary["failures"] += 1
+                continue
+            summary["analyzed"] += 1
+            # The snapshots without recorded objects are not compared
+            if row["recorded_objects"] is not None:
+                summary["compared"] += 1
+                summary["matches"] += not row["added"] and not row["removed"]
+            latency = float(row["vision_latency"])
+            deviation = latency - summary["mean_latency"]
+            summary["mean_latency"] += deviation / summary["analyzed"]
+        # A crash loses no completed result
+        f.flush()
@@ -0,0 +1,188 @@
+# SPDX-FileCopyrightText: 2025-present Frédéric Collonval <frederic.collonval@webscit.com>
+#
+# SPDX-License-Identifier: MIT
+"""Region of interest module for the Curious Frame project.
+
+The cardboard frame is located once as the largest quadrilateral of the
+image. Its corners are cached and re-validated on each snapshot by checking
+that edges are still found along its sides; the frame is only searched
+again when the check fails.
+"""
+import logging
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Width in pixels of the image used to locate the frame
+_ANALYSIS_WIDTH = 480
+
+
+class FrameLocator:
+    """Locates the cardboard frame and crops the snapshots to it."""
+
+    def __init__(
+        self,
+        output_size: int = 768,
+        min_area: float = 0.1,
+        min_edge_ratio: float = 0.6,
+    ) -> None:
+        """Initializes the locator.
+
+        Args:
+            output_size: The maximal size in pixels of the longest side of the crop;
+                typically the native input size of the VLM.
+            min_area: The minimal area of the frame relative to the image area.
+            min_edge_ratio: The minimal ratio of points along the cached frame
+                sides lying on an edge for the frame to be still valid.
+        """
+        self.output_size = output_size
+        self.min_area = min_area
+        self.min_edge_ratio = min_edge_ratio
+        self.corners: np.ndarray | None = None
+        """The corners of the frame in full resolution: top-left, top-right,
+        bottom-right and bottom-left."""
+
+    def locate(self, frame: np.ndarray) -> np.ndarray | None:
+        """Locates the cardboard frame, reusing the cached corners if still valid.
+
+        Args:
+            frame: The BGR frame.
+
+        Returns:
+            The corners of the cardboard frame, or None if it is not found.
+        """
+        scale = min(1.0, _ANALYSIS_WIDTH / frame.shape[1])
+        small = cv2.resize(
+            frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA
+        )
+        gray = cv2.GaussianBlur(cv2.cvtColor(small, cv2.COLOR_BGR2GRAY), (5, 5), 0)
+        edges = cv2.Canny(gray, 50, 150)
+
+        if self.corners is not None and self._is_valid(edges, self.corners * scale):
+            return self.corners
+
+        corners = self._find_quadrilateral(edges)
+        if corners is None:
+            if self.corners is not None:
+                logger.info("The cardboard frame is lost.")
+            self.corners = None
+        else:
+            self.corners = corners / scale
+            located = self.corners.astype(int).tolist()
+            logger.info(f"Located the cardboard frame at {located}")
+        return self.corners
+
+    def crop(self, frame: np.ndarray) -> np.ndarray:
+        """Warps the cardboard frame to a rectangle of at most the output size.
+
+        If the cardboard frame is not found, the whole image is downscaled.
+
+        Args:
+            frame: The BGR frame.
+
+        Returns:
+            The cropped frame.
+        """
+        corners = self.locate(frame)
+        if corners is None:
+            return _fit(frame, self.output_size)
+
+        top_left, top_right, bottom_right, bottom_left = corners
+        width = max(
+            np.linalg.norm(top_right - top_left),
+            np.linalg.norm(bottom_right - bottom_left),
+        )
+        height = max(
+            np.linalg.norm(bottom_left - top_left),
+            np.linalg.norm(bottom_right - top_right),
+        )
+        # Warp and downscale in a single pass
+        factor = min(1.0, self.output_size / max(width, height))
+        width, height = int(round(width * factor)), int(round(height * factor))
+        target = np.array(
+            [[0, 0], [width - 1, 0], [width - 1, height - 1], [0, height - 1]],
+            dtype=np.float32,
+        )
+        transform = cv2.getPerspectiveTransform(corners.astype(np.float32), target)
+        return cv2.warpPerspective(
+            frame, transform, (width, height), flags=cv2.INTER_AREA
+        )
+
+    def _find_quadrilateral(self, edges: np.ndarray) -> np.ndarray | None:
+        """Finds the largest convex quadrilateral in an edge map.
+
+        Args:
+            edges: The edge map.
+
+        Returns:
+            The ordered corners, or None if no large enough quadrilateral is found.
+        """
+        edges = cv2.dilate(edges, np.ones((3, 3), np.uint8))
+        contours, _ = cv2.findContours(edges, cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE)
+        min_area = self.min_area * edges.shape[0] * edges.shape[1]
+        for contour in sorted(contours, key=cv2.contourArea, reverse=True):
+            if cv2.contourArea(contour) < min_area:
+                break
+            perimeter = cv2.arcLength(contour, True)
+            approx = cv2.approxPolyDP(contour, 0.02 * perimeter, True)
+            if len(approx) == 4 and cv2.isContourConvex(approx):
+                return _order_corners(approx.reshape(4, 2).astype(np.float32))
+        return None
+
+    def _is_valid(
+        self, edges: np.ndarray, corners: np.ndarray, samples: int = 20
+    ) -> bool:
+        """Checks that edges are still found along the sides of the frame.
+
+        Args:
+            edges: The edge map.
+            corners: The corners of the frame in the edge map coordinates.
+            samples: The number of points checked per side.
+
+        Returns:
+            Whether the frame is still there.
+        """
+        near_edges = cv2.dilate(edges, np.ones((5, 5), np.uint8))
+        steps = np.linspace(0, 1, samples, endpoint=False)[:, None]
+        points = np.concatenate(
+            [
+                start + steps * (end - start)
+                for start, end in zip(corners, np.roll(corners, -1, axis=0))
+            ]
+        ).astype(int)
+        height, width = edges.shape
+        inside = (
+            (points[:, 0] >= 0)
+            & (points[:, 0] < width)
+            & (points[:, 1] >= 0)
+            & (points[:, 1] < height)
+        )
+        if not inside.all():
+            return False
+        on_edges = near_edges[points[:, 1], points[:, 0]].astype(bool)
+        return on_edges.mean() >= self.min_edge_ratio
+
+
+def _order_corners(points: np.ndarray) -> np.ndarray:
+    """Orders corners as top-left, top-right, bottom-right and bottom-left."""
+    sums = points.sum(axis=1)
+    diffs = np.diff(points, axis=1).ravel()
+    return np.array(
+        [
+            points[sums.argmin()],
+            points[diffs.argmin()],
+            points[sums.argmax()],
+            points[diffs.argmax()],
+        ],
+        dtype=np.float32,
+    )
+
+
+def _fit(frame: np.ndarray, size: int) -> np.ndarray:
+    """Downscales a frame so its longest side is at most the given size."""
+    factor = size / max(frame.shape[:2])
+    if factor >= 1:
+        return frame
+    return cv2.resize(frame, None, fx=factor, fy=factor, interpolation=cv2.INTER_AREA)
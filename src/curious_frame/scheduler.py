@@ -0,0 +1,149 @@
+# SPDX-FileCopyrightText: 2025-present Frédéric Collonval <frederic.collonval@webscit.com>
+#
+# SPDX-License-Identifier: MIT
+"""Capture scheduler module for the Curious Frame project.
+
+Instead of polling the scene at a fixed period, low resolution frames are
+compared to detect the child's activity in front of the camera. A snapshot
+is analyzed once the scene is stable again after some motion and differs
+from the scene analyzed last. The time since the last activity drives the
+idle shutdown.
+"""
+import logging
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from curious_frame.camera import Camera
+
+logger = logging.getLogger(__name__)
+
+# Reduction of the camera resolution for the motion detection
+_REDUCTION = 8
+
+
+class MotionScheduler:
+    """Triggers the analysis when the scene changed and is stable."""
+
+    def __init__(
+        self,
+        camera: Camera,
+        sample_interval: float = 0.2,
+        stable_time: float = 1.0,
+        pixel_threshold: int = 25,
+        motion_ratio: float = 0.02,
+    ) -> None:
+        """Initializes the scheduler.
+
+        Args:
+            camera: The camera, already started.
+            sample_interval: The time in seconds between two compared frames.
+            stable_time: The time in seconds without motion for the scene to be stable.
+            pixel_threshold: The minimal difference of gray level for a pixel to change.
+            motion_ratio: The minimal ratio of changed pixels for a motion.
+        """
+        self.camera = camera
+        self.sample_interval = sample_interval
+        self.stable_time = stable_time
+        self.pixel_threshold = pixel_threshold
+        self.motion_ratio = motion_ratio
+        self.last_activity = time.monotonic()
+        """The time of the last motion, from ``time.monotonic``."""
+        self._reference: np.ndarray | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def idle_time(self) -> float:
+        """The time in seconds since the last motion."""
+        return time.monotonic() - self.last_activity
+
+    def record_activity(self) -> None:
+        """Records an activity detected by other means, e.g. new objects."""
+        self.last_activity = time.monotonic()
+
+    def mark_analyzed(self) -> None:
+        """Records the current scene as the last analyzed one."""
+        frame = self._sample()
+        if frame is not None:
+            with self._lock:
+                self._reference = frame
+
+    def wait_for_change(self, stop_event: threading.Event, timeout: float) -> bool:
+        """Waits until the scene changed since the last analysis and is stable.
+
+        Args:
+            stop_event: The event cancelling the wait.
+            timeout: The maximal time in seconds to wait.
+
+        Returns:
+            Whether the scene changed; False on timeout or cancellation.
+        """
+        deadline = time.monotonic() + timeout
+        previous = self._sample()
+        with self._lock:
+            reference = self._reference
+        # The scene may have changed while the speech was played
+        moved = (
+            previous is not None
+            and reference is not None
+            and self._differs(previous, reference)
+        )
+        stable_since = time.monotonic()
+        while not stop_event.wait(self.sample_interval):
+            now = time.monotonic()
+            frame = self._sample()
+            if frame is None or previous is None:
+                previous = frame
+            elif self._differs(frame, previous):
+                moved = True
+                self.last_activity = stable_since = now
+                previous = frame
+            elif moved and now - stable_since >= self.stable_time:
+                with self._lock:
+                    reference = self._reference
+                if reference is None or self._differs(frame, reference):
+                    logger.info(
+                        f"The scene changed and is stable since {self.stable_time}s."
+                    )
+                    return True
+                # The child moved but put the same objects back
+                moved = False
+            if now >= deadline:
+                return False
+        return False
+
+    def wait_for_motion(self, stop_event: threading.Event, timeout: float) -> bool:
+        """Waits for some motion.
+
+        Args:
+            stop_event: The event cancelling the wait.
+            timeout: The maximal time in seconds to wait.
+
+        Returns:
+            Whether some motion was detected; False on timeout or cancellation.
+        """
+        deadline = time.monotonic() + timeout
+        previous = self._sample()
+        while time.monotonic() < deadline and not stop_event.wait(self.sample_interval):
+            frame = self._sample()
+            comparable = frame is not None and previous is not None
+            if comparable and self._differs(frame, previous):
+                self.last_activity = time.monotonic()
+                return True
+            previous = frame
+        return False
+
+    def _sample(self) -> np.ndarray | None:
+        """Gets the newest frame in low resolution grayscale."""
+        snapshot = self.camera.get_snapshot(timeout=self.sample_interval)
+        if snapshot is None:
+            return None
+        return cv2.cvtColor(snapshot.to_array(_REDUCTION), cv2.COLOR_BGR2GRAY)
+
+    def _differs(self, frame: np.ndarray, other: np.ndarray) -> bool:
+        """Whether enough pixels changed between two frames."""
+        difference = np.abs(frame.astype(np.int16) - other.astype(np.int16))
+        changed = difference > self.pixel_threshold
+        return changed.mean() >= self.motion_ratio
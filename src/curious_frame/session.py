@@ -0,0 +1,623 @@
+# SPDX-FileCopyrightText: 2025-present Frédéric Collonval <frederic.collonval@webscit.com>
+#
+# SPDX-License-Identifier: MIT
+"""Interaction session module for the Curious Frame project.
+
+A session runs the interaction loop as a staged pipeline::
+
+    capture -> vision -> describe -> synthesize -> play
+
+so the announcement is spoken while the description is generated and the
+next snapshot is analyzed while the current description is spoken.
+"""
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable
+
+from curious_frame import tracing
+from curious_frame.archive import Archive
+from curious_frame.audio import Audio
+from curious_frame.camera import Camera, Snapshot
+from curious_frame.cards import ActionCardDetector, combine_actions
+from curious_frame.language import Language, split_sentences
+from curious_frame.phrases import phrase
+from curious_frame.pipeline import Pipeline
+from curious_frame.roi import FrameLocator
+from curious_frame.scheduler import MotionScheduler
+from curious_frame.store import DescriptionCache
+from curious_frame.tracing import NullTracer, Trace, Tracer
+from curious_frame.vision import Vision
+
+logger = logging.getLogger(__name__)
+
+# Pause in seconds between a description and the follow-up question
+FOLLOW_UP_PAUSE = 5
+
+
+@dataclass
+class Utterance:
+    """A text to speak."""
+
+    text: str
+    language: str
+    skip_translation: bool = False
+    pause: float = 0
+    """Silence in seconds before playing the utterance."""
+    key: str | None = None
+    """Key of the synthesized audio in the audio cache."""
+    trace: Trace | None = None
+    """The trace of the interaction the utterance belongs to, held until played."""
+
+
+@dataclass
+class Interaction:
+    """The data collected for one snapshot."""
+
+    image_path: Path
+    snapshot: Snapshot | None = None
+    objects_list: str | None = None
+    objects: list[str] = field(default_factory=list)
+    """The objects described."""
+    language: str = "en"
+    query: str | None = None
+    description: str = ""
+    timings: dict[str, float] = field(default_factory=dict)
+    """The duration in seconds of each stage."""
+    trace: Trace | None = None
+
+
+class Session:
+    """The interaction loop with a child in front of a cardboard frame."""
+
+    def __init__(
+        self,
+        camera: Camera,
+        vision: Vision,
+        language: Language,
+        audio: Audio,
+        capture_dir: Path,
+        wait_time: float = 60,
+        shutdown_timeout: float = 600,
+        multilanguage: bool = False,
+        stream: bool = False,
+        queue_size: int = 2,
+        cards: ActionCardDetector | None = None,
+        locator: FrameLocator | None = None,
+        descriptions: DescriptionCache | None = None,
+        scheduler: MotionScheduler | None = None,
+        archive: Archive | None = None,
+        tracer: Tracer | None = None,
+    ) -> None:
+        """Initializes the session.
+
+        Args:
+            camera: The camera taking the snapshots.
+            vision: The vision model listing the objects.
+            language: The language model describing the objects.
+            audio: The audio output.
+            capture_dir: The directory to store the snapshots and the captures log;
+                used if no archive is given.
+            wait_time: The time to wait in seconds when identical objects are detected.
+            shutdown_timeout: The time in seconds before stopping if identical
+                objects are detected repeatedly.
+            multilanguage: Whether the language model can reply in the output language.
+            stream: Whether to speak the description sentence by sentence.
+            queue_size: The maximal number of items waiting between stages.
+            cards: The local action card detector; if None the VLM looks
+                for the action cards.
+            locator: The cardboard frame locator cropping the snapshots before
+                their analysis; if None the whole snapshot is analyzed.
+            descriptions: The persistent cache of descriptions; if None every
+                description is generated by the language model.
+            scheduler: The motion scheduler; if set, identical objects are looked
+                at again once the scene changed instead of after the wait time,
+                the idle shutdown is measured from the last motion and the
+                follow-up question is skipped if the child is already moving.
+            archive: The archive storing the snapshots and the captures log in
+                the background; it is closed at the end of the session.
+            tracer: The tracer timing the stages of each interaction; if None
+                nothing is traced.
+        """
+        self.camera = camera
+        self.vision = vision
+        self.language = language
+        self.audio = audio
+        self.capture_dir = Path(capture_dir)
+        self.archive = archive if archive is not None else Archive(self.capture_dir)
+        self.wait_time = wait_time
+        self.shutdown_timeout = shutdown_timeout
+        self.multilanguage = multilanguage
+        self.stream = stream
+        self.cards = cards
+        self.locator = locator
+        self.descriptions = descriptions
+        self.scheduler = scheduler
+        self.tracer = tracer if tracer is not None else NullTracer()
+
+        self.last_objects: set[str] = set()
+        self.identical_start_time: float | None = None
+        self.asked_for_new_object = False
+
+        # Next capture schedule, set by the vision stage
+        self._capture_delay = 0.0
+        self._capture_after_speech = False
+        self._capture_on_change = False
+        self._last_capture = False
+
+        self.pipeline = Pipeline()
+        self._vision_stage = self.pipeline.add_stage("vision", _traced(self._analyze))
+        self._describe_stage = self.pipeline.add_stage(
+            "describe", _traced(self._describe), queue_size
+        )
+        self._synthesize_stage = self.pipeline.add_stage(
+            "synthesize", _traced(self._synthesize), queue_size
+        )
+        self._play_stage = self.pipeline.add_stage(
+            "play", _traced(self._play), queue_size
+        )
+        self.pipeline.add_source("capture", self._capture)
+
+    def run(self) -> None:
+        """Runs the session until it times out, the camera fails or is interrupted."""
+        self.pipeline.start()
+        try:
+            self.pipeline.wait()
+        except KeyboardInterrupt:
+            self.pipeline.stop()
+            self.pipeline.join(timeout=5)
+            self.audio.speak(
+                phrase("stopping", "en"), language="en", skip_translation=True
+            )
+        finally:
+            self.pipeline.stop()
+            self.pipeline.join(timeout=10)
+            self.archive.close()
+
+    def queue_depths(self) -> dict[str, int]:
+        """Gets the number of items waiting in each stage queue.
+
+        Returns:
+            The queue depth per stage name.
+        """
+        return self.pipeline.queue_depths()
+
+    def say(
+        self,
+        text: str,
+        language: str | None = None,
+        skip_translation: bool = False,
+        pause: float = 0,
+    ) -> bool:
+        """Queues a text to be spoken.
+
+        Args:
+            text: The text to speak.
+            language: The language of the audio output; the audio default if None.
+            skip_translation: Whether the text is already in the output language.
+            pause: Silence in seconds before speaking.
+
+        Returns:
+            Whether the text was queued; False if the session is stopping.
+        """
+        trace = tracing.current()
+        utterance = Utterance(
+            text,
+            language or self.audio.language,
+            skip_translation,
+            pause,
+            trace=None if trace is None else trace.hold(),
+        )
+        if self._synthesize_stage.put(utterance):
+            return True
+        if trace is not None:
+            trace.release()
+        return False
+
+    def _schedule_capture(
+        self,
+        delay: float = 0,
+        after_speech: bool = False,
+        last: bool = False,
+        on_change: bool = False,
+    ) -> None:
+        """Sets when the next snapshot is taken.
+
+        Args:
+            delay: The time in seconds to wait before the snapshot.
+            after_speech: Whether to wait for all queued speech to be played first.
+            last: Whether to stop the session instead of taking a snapshot.
+            on_change: Whether to take the snapshot as soon as the scene changed,
+                the delay being the maximal wait.
+        """
+        self._capture_delay = delay
+        self._capture_after_speech = after_speech
+        self._last_capture = last
+        self._capture_on_change = on_change
+
+    def _speech_pending(self) -> bool:
+        """Whether a description is being generated or some speech is not played yet."""
+        stages = (self._describe_stage, self._synthesize_stage, self._play_stage)
+        return any(stage.pending for stage in stages)
+
+    def _capture(self) -> None:
+        """Takes a snapshot and waits for its analysis."""
+        # The speech about the next snapshot must follow the current description
+        if not self._describe_stage.join():
+            return
+        if self._capture_after_speech:
+            stages = (self._describe_stage, self._synthesize_stage, self._play_stage)
+            for stage in stages:
+                if not stage.join():
+                    return
+        if self._capture_on_change and self.scheduler is not None:
+            self.scheduler.wait_for_change(
+                self.pipeline.stop_event, self._capture_delay
+            )
+            if self.pipeline.stopped:
+                return
+        elif self.pipeline.stop_event.wait(self._capture_delay):
+            return
+        if self._last_capture:
+            self.pipeline.stop()
+            return
+
+        logger.info("Taking a new snapshot...")
+        logger.info(f"Queue depths: {self.queue_depths()}")
+        start = time.monotonic()
+        trace = (
+            self.tracer.start(queue_depths=self.queue_depths())
+            if self.tracer.enabled
+            else None
+        )
+        queued = False
+        try:
+            with tracing.activate(trace), tracing.span("capture"):
+                snapshot = self.camera.get_snapshot()
+                if snapshot is None:
+                    self.pipeline.stop()
+                    return
+                if self.scheduler is not None:
+                    self.scheduler.mark_analyzed()
+
+                # The image is written in the background
+                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+                image_path = self.archive.save_snapshot(snapshot, timestamp)
+            logger.info(f"Snapshot taken, archived in {image_path!s}")
+
+            interaction = Interaction(image_path, snapshot, trace=trace)
+            interaction.timings["capture"] = time.monotonic() - start
+            queued = self._vision_stage.put(interaction)
+        finally:
+            if not queued and trace is not None:
+                # The interaction stops here, its trace is written as is
+                trace.release()
+        if queued:
+            self._vision_stage.join()
+
+    def _analyze(self, interaction: Interaction) -> None:
+        """Lists the objects of a snapshot and decides what to say."""
+        objects = set()
+        identical = False
+        start = time.monotonic()
+        try:
+            logger.info("Analyzing the snapshot...")
+            snapshot = interaction.snapshot
+            if self.locator is not None:
+                snapshot = Snapshot(frame=self.locator.crop(snapshot.to_array()))
+            french_flag = None
+            actions = {}
+            if self.cards is not None:
+                # The cards are searched at low resolution; the crop is already small
+                reduction = 1 if self.locator is not None else 2
+                cards = self.cards.detect(snapshot.to_array(reduction))
+                actions = combine_actions(cards)
+                # The VLM is then not asked about the flag
+                french_flag = actions.get("language") == "fr"
+            with tracing.span("vision"):
+                detection = self.vision.detect(snapshot, french_flag)
+            interaction.timings["vision"] = time.monotonic() - start
+            interaction.snapshot = None
+            interaction.objects_list = str(detection)
+            logger.info(f"Found objects: {detection}")
+            objects = set(detection.objects)
+
+            if self.cards is None:
+                language = "fr" if detection.french_flag else "en"
+            else:
+                # The cards only count within the cardboard frame
+                language = actions.get("language") if detection.frame_present else None
+            self._switch_language(language or "en")
+            lang = interaction.language = self.audio.language
+            in_french = self.multilanguage and lang == "fr"
+
+            if len(objects.difference(self.last_objects)) == 0:
+                logger.info("Identical objects detected, waiting for new input...")
+                identical = True
+                self._on_identical_objects()
+                return
+            else:
+                self.identical_start_time = None
+                self.asked_for_new_object = False
+                if self.scheduler is not None:
+                    self.scheduler.record_activity()
+
+            if len(objects):
+                interaction.objects = sorted(objects)[:2]  # Limit to first two objects
+                object_str = ", ".join(interaction.objects)
+                text = (
+                    f"J'ai vu {object_str}. Je recherche des informations sur ceux-ci."
+                    if in_french
+                    else f"I found {object_str}. Let me find information about them."
+                )
+                self.say(text, skip_translation=True)
+                interaction.query = describe_query(interaction.objects, in_french)
+            elif detection.french_flag:
+                # This case happens when only the french flag is detected
+                interaction.objects = ["french flag"]
+                interaction.query = (
+                    "Qu'est-ce que le drapeau français et à quoi sert-il?"
+                    if in_french
+                    else "Tell me what is the French flag and what it is used for."
+                )
+
+            # Analyze the next snapshot while the description is spoken
+            self._schedule_capture()
+            if interaction.query is None:
+                interaction.description = phrase("no_objects", lang)
+                logger.info("No objects found.")
+                self.say(interaction.description, skip_translation=True)
+                self._ask_for_something_else(lang)
+                self._record(interaction)
+            elif not self._describe_stage.put(interaction):
+                # The session is stopping, the interaction stops here
+                self._record(interaction)
+        except Exception as e:
+            self.say(phrase("error", "en"), language="en", skip_translation=True)
+            logger.exception("An error occurred.", exc_info=e)
+            interaction.description = f"Error: {e}"
+            self._schedule_capture(after_speech=True)
+            self._record(interaction)
+        finally:
+            if not identical:
+                self.last_objects = objects
+            elif interaction.trace is not None:
+                interaction.trace.set(image=interaction.image_path.name, identical=True)
+                interaction.trace.release()
+
+    def _on_identical_objects(self) -> None:
+        """Handles a snapshot showing the same objects as the previous one."""
+        if self._speech_pending():
+            # The child may still be listening, look again once speech is over
+            self._schedule_capture(after_speech=True)
+            return
+
+        if self.scheduler is not None:
+            elapsed_time = self.scheduler.idle_time
+        else:
+            if self.identical_start_time is None:
+                self.identical_start_time = time.time()
+            elapsed_time = time.time() - self.identical_start_time
+        if elapsed_time >= self.shutdown_timeout:
+            self.say(phrase("shutdown", self.audio.language), skip_translation=True)
+            self._schedule_capture(after_speech=True, last=True)
+            return
+
+        asking_time = (2 / 3) * self.shutdown_timeout
+        if not self.asked_for_new_object and elapsed_time >= asking_time:
+            self._ask_for_something_else(self.audio.language, pause=0)
+            self.asked_for_new_object = True
+
+        if self.scheduler is not None:
+            # Look again once the scene changed, or at the next idle step
+            next_step = (
+                self.shutdown_timeout
+                if self.asked_for_new_object
+                else (2 / 3) * self.shutdown_timeout
+            )
+            self._schedule_capture(max(next_step - elapsed_time, 0), on_change=True)
+            return
+
+        # Take a new frame after the wait time
+        self._schedule_capture(self.wait_time)
+
+    def _switch_language(self, language: str) -> None:
+        """Switches the audio output to a language, announcing it."""
+        if language != self.audio.language:
+            self.audio.set_language(language)
+            self.say(phrase("switch_language", language), skip_translation=True)
+
+    def _ask_for_something_else(
+        self, language: str, pause: float | None = None
+    ) -> None:
+        """Queues the follow-up question, by default after a pause."""
+        if pause is None:
+            pause = FOLLOW_UP_PAUSE
+        self.say(
+            phrase("something_else", language),
+            language=language,
+            skip_translation=True,
+            pause=pause,
+        )
+
+    def _describe(self, interaction: Interaction) -> None:
+        """Generates the description of the objects and queues it for speech."""
+        lang = interaction.language
+        cached = None
+        complete = True
+        start = time.monotonic()
+        try:
+            if self.descriptions is not None:
+                cached = self.descriptions.lookup(
+                    interaction.objects, lang, self.language.model
+                )
+            if interaction.trace is not None:
+                interaction.trace.set(
+                    description_cache="miss" if cached is None else "hit"
+                )
+            if cached is not None:
+                # Spoken as generated: in sentences when streaming, at once otherwise
+                interaction.description = cached
+                sentences = [cached]
+                if self.stream:
+                    sentences, remainder = split_sentences(cached + " ")
+                    # The generation may have stopped in the middle of a sentence
+                    if remainder.strip():
+                        sentences.append(remainder.strip())
+                for sentence in sentences:
+                    sentence = sentence.replace("*", "")
+                    if not self.say(
+                        sentence, lang, skip_translation=self.multilanguage
+                    ):
+                        break
+            elif self.stream:
+                # Speak each sentence while the next ones are generated
+                sentences = []
+                for sentence in self.language.chat_stream(interaction.query):
+                    sentence = sentence.replace("*", "")
+                    sentences.append(sentence)
+                    if not self.say(
+                        sentence, lang, skip_translation=self.multilanguage
+                    ):
+                        complete = False
+                        break
+                interaction.description = " ".join(sentences)
+            else:
+                interaction.description = self.language.chat(interaction.query)
+                self.say(
+                    interaction.description.replace("*", ""),
+                    lang,
+                    skip_translation=self.multilanguage,
+                )
+
+            logger.info(f"Description: {interaction.description}")
+            if (
+                cached is None
+                and complete
+                and self.descriptions is not None
+                and interaction.description
+            ):
+                self.descriptions.store(
+                    interaction.objects,
+                    lang,
+                    self.language.model,
+                    interaction.description,
+                )
+            self._ask_for_something_else(lang)
+        except Exception as e:
+            self.say(phrase("error", "en"), language="en", skip_translation=True)
+            logger.exception("An error occurred.", exc_info=e)
+            interaction.description = f"Error: {e}"
+        finally:
+            interaction.timings["describe"] = time.monotonic() - start
+            self._record(interaction)
+
+    def _synthesize(self, utterance: Utterance) -> None:
+        """Synthesizes an utterance and queues it for playback."""
+        if not utterance.skip_translation:
+            # Translate the utterances waiting behind this one in the same request
+            waiting = [
+                item.text
+                for item in self._synthesize_stage.peek()
+                if not item.skip_translation and item.language == utterance.language
+            ]
+            if waiting:
+                self.audio.prepare([utterance.text, *waiting], utterance.language)
+        if not self.audio.stream_synthesis or self.audio.is_cached(
+            utterance.text, utterance.language
+        ):
+            utterance.key = self.audio.synthesize(
+                utterance.text, utterance.language, utterance.skip_translation
+            )
+        # Otherwise it is synthesized while played, in order with the other utterances
+        if not self._play_stage.put(utterance) and utterance.trace is not None:
+            utterance.trace.release()
+
+    def _play(self, utterance: Utterance) -> None:
+        """Plays a synthesized utterance."""
+        try:
+            self._play_utterance(utterance)
+            # The next utterance is queued while this one plays to avoid a gap;
+            # otherwise the stage is done once the speech is heard
+            if not self._play_stage.peek():
+                self.audio.drain()
+        finally:
+            if utterance.trace is not None:
+                utterance.trace.release()
+
+    def _play_utterance(self, utterance: Utterance) -> None:
+        if utterance.pause:
+            # The pause starts at the end of the previous speech
+            self.audio.drain()
+        if utterance.pause and self.scheduler is not None:
+            # The follow-up question is useless if the child already shows something
+            stop_event = self.pipeline.stop_event
+            if self.scheduler.wait_for_motion(stop_event, utterance.pause):
+                logger.info(f"Activity detected, skipping: {utterance.text}")
+                return
+            if self.pipeline.stopped:
+                return
+        elif utterance.pause and self.pipeline.stop_event.wait(utterance.pause):
+            return
+        if utterance.key is None:
+            self.audio.synthesize_stream(
+                utterance.text, utterance.language, utterance.skip_translation
+            )
+        else:
+            self.audio.play(utterance.key)
+
+    def _record(self, interaction: Interaction) -> None:
+        """Queues the information of an interaction for the captures log."""
+        self.archive.log(
+            {
+                "timestamp": datetime.now().isoformat(timespec="milliseconds"),
+                "image": interaction.image_path.name,
+                "objects": interaction.objects_list,
+                "language": interaction.language,
+                "query": interaction.query,
+                "description": interaction.description,
+                "timings": {
+                    stage: round(duration, 3)
+                    for stage, duration in interaction.timings.items()
+                },
+            }
+        )
+        if interaction.trace is not None:
+            # The trace is written once the utterances of the interaction are played
+            interaction.trace.set(
+                image=interaction.image_path.name,
+                objects=interaction.objects,
+                language=interaction.language,
+            )
+            interaction.trace.release()
+
+
+def describe_query(objects: list[str], in_french: bool = False) -> str:
+    """Builds the query asking the language model to describe objects.
+
+    Args:
+        objects: The objects to describe.
+        in_french: Whether to ask in French.
+
+    Returns:
+        The query.
+    """
+    object_str = ", ".join(objects)
+    if in_french:
+        return (
+            "Dis moi ce que sont les objets suivants et à quoi ils servent: "
+            f"{object_str}."
+        )
+    return f"Tell what those objects are and what they are used for: {object_str}."
+
+
+def _traced(handler: Callable[[Any], None]) -> Callable[[Any], None]:
+    """Wraps a stage handler to activate the trace of the processed item."""
+
+    def handle(item: Any) -> None:
+        with tracing.activate(item.trace):
+            handler(item)
+
+    return handle
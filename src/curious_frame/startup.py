@@ -0,0 +1,163 @@
+# SPDX-FileCopyrightText: 2025-present Frédéric Collonval <frederic.collonval@webscit.com>
+#
+# SPDX-License-Identifier: MIT
+"""Startup module for the Curious Frame project.
+
+The components are made ready in parallel: the models are loaded into
+Ollama, Piper is pinged, the camera is opened and the audio device is
+checked. The session only starts once they are all ready or timed out; a
+component still blocked in a call at the timeout is reported as not ready
+and left running in the background.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from dataclasses import dataclass, replace
+from typing import Any, Callable
+
+logger = logging.getLogger(__name__)
+
+# Delay in seconds between two attempts of a failed component
+_RETRY_INTERVAL = 2.0
+
+
+@dataclass
+class Readiness:
+    """The readiness of a component."""
+
+    name: str
+    ready: bool = False
+    elapsed: float = 0.0
+    """The time in seconds from the start until the component was ready or failed."""
+    attempts: int = 0
+    error: str | None = None
+
+
+class Startup:
+    """Runs the preparation of the components in parallel."""
+
+    def __init__(self, timeout: float = 120) -> None:
+        """Initializes the startup.
+
+        Args:
+            timeout: The maximal time in seconds to wait for the components.
+        """
+        self.timeout = timeout
+        self.timeline: list[Readiness] = []
+        """The readiness of the components in the order they completed."""
+        self._tasks: dict[str, tuple[Callable[[], Any], bool]] = {}
+        self._results: dict[str, Any] = {}
+        self._errors: dict[str, BaseException] = {}
+        self._timed_out: set[str] = set()
+        self._lock = threading.Lock()
+
+    def add(self, name: str, prepare: Callable[[], Any], retry: bool = False) -> None:
+        """Adds a component to prepare.
+
+        The component is ready once ``prepare`` returns something else than
+        False; its return value is kept as the component result.
+
+        Args:
+            name: The name of the component.
+            prepare: The function making the component ready.
+            retry: Whether to call ``prepare`` again on failure until the timeout;
+                e.g. for a server still starting.
+        """
+        self._tasks[name] = (prepare, retry)
+
+    def run(self) -> bool:
+        """Prepares all components and waits for them.
+
+        Returns:
+            Whether all components are ready.
+        """
+        start = time.monotonic()
+        executor = ThreadPoolExecutor(
+            len(self._tasks) or 1, thread_name_prefix="startup"
+        )
+        readiness = {name: Readiness(name) for name in self._tasks}
+        futures = {
+            executor.submit(self._prepare, readiness[name], prepare, retry, start): name
+            for name, (prepare, retry) in self._tasks.items()
+        }
+        # An attempt may block longer than the timeout, e.g. loading a model
+        _, pending = wait(futures, timeout=self.timeout)
+        executor.shutdown(wait=False)
+        with self._lock:
+            for future in pending:
+                # A copy as the attempt in progress still updates the readiness
+                late = replace(
+                    readiness[futures[future]],
+                    ready=False,
+                    elapsed=time.monotonic() - start,
+                    error=f"timed out after {self.timeout:g}s",
+                )
+                logger.warning(f"{late.name} not ready: {late.error}")
+                self._timed_out.add(late.name)
+                self.timeline.append(late)
+
+        logger.info(
+            "Startup timeline: "
+            + ", ".join(
+                f"{r.name} {'ready' if r.ready else 'FAILED'} at {r.elapsed:.1f}s"
+                + (f" ({r.error})" if r.error else "")
+                for r in self.timeline
+            )
+        )
+        return all(readiness.ready for readiness in self.timeline)
+
+    def result(self, name: str) -> Any:
+        """Gets the value returned when preparing a component.
+
+        Args:
+            name: The name of the component.
+
+        Returns:
+            The value returned by the component preparation.
+
+        Raises:
+            Exception: The error of the last attempt if the component failed.
+        """
+        if name in self._errors:
+            raise self._errors[name]
+        return self._results.get(name)
+
+    def _prepare(
+        self,
+        readiness: Readiness,
+        prepare: Callable[[], Any],
+        retry: bool,
+        start: float,
+    ) -> None:
+        name = readiness.name
+        while True:
+            readiness.attempts += 1
+            try:
+                result = prepare()
+                readiness.ready = result is not False
+                readiness.error = None if readiness.ready else "not ready"
+                self._results[name] = result
+                self._errors.pop(name, None)
+            except Exception as e:
+                readiness.error = str(e) or type(e).__name__
+                self._errors[name] = e
+            elapsed = time.monotonic() - start
+            if readiness.ready or not retry or elapsed + _RETRY_INTERVAL > self.timeout:
+                break
+            logger.debug(f"{name} is not ready yet: {readiness.error}")
+            time.sleep(_RETRY_INTERVAL)
+
+        with self._lock:
+            if name in self._timed_out:
+                # Already reported as not ready
+                logger.info(f"{name} completed after the startup timeout.")
+                return
+            readiness.elapsed = time.monotonic() - start
+            self.timeline.append(readiness)
+        if readiness.ready:
+            logger.info(f"{name} ready in {readiness.elapsed:.1f}s")
+        else:
+            logger.warning(
+                f"{name} not ready after {readiness.elapsed:.1f}s: {readiness.error}"
+            )
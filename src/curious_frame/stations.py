@@ -0,0 +1,487 @@
+# SPDX-FileCopyrightText: 2025-present Frédéric Collonval <frederic.collonval@webscit.com>
+#
+# SPDX-License-Identifier: MIT
+"""Multi-station module for the Curious Frame project.
+
+A single device drives several cardboard frames, the stations. Each station
+has its own camera, audio device, language and session, while the vision and
+language models are shared through a backend scheduler:
+
+- the requests of the stations are served in turn so a busy station does
+  not delay the others (fair queuing);
+- identical requests in flight, e.g. two stations describing the same
+  objects, are sent once and share the answer;
+- the translations waiting in the queues are sent in a single request.
+
+The latency of the backend requests is measured per station. The vision
+results are cached per station, as the scenes of two stations differ.
+"""
+import json
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Hashable, Iterator
+
+from curious_frame.archive import Archive
+from curious_frame.audio import Audio
+from curious_frame.audio_cache import AudioCache
+from curious_frame.camera import Camera, Snapshot
+from curious_frame.client import HttpClient
+from curious_frame.fingerprint import dhash
+from curious_frame.language import Language
+from curious_frame.phrases import phrase
+from curious_frame.session import Session
+from curious_frame.vision import Detection, Vision, VisionCache
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class StationConfig:
+    """The devices and the language of a station."""
+
+    name: str
+    camera_id: int = 0
+    audio_device: str = "sysdefault"
+    language: str = "en"
+
+
+def load_stations(path: str | Path) -> list[StationConfig]:
+    """Loads the stations from a JSON file.
+
+    The file holds a list of stations, e.g.
+    ``[{"name": "kitchen", "camera_id": 0, "audio_device": "plughw:1,0",
+    "language": "fr"}]``.
+
+    Args:
+        path: The path to the JSON file.
+
+    Returns:
+        The stations.
+
+    Raises:
+        ValueError: If two stations have the same name.
+    """
+    with open(path, encoding="utf-8") as f:
+        stations = [StationConfig(**entry) for entry in json.load(f)]
+    names = [station.name for station in stations]
+    if len(set(names)) != len(names):
+        raise ValueError(f"The station names must be unique: {names}")
+    return stations
+
+
+@dataclass
+class _Request:
+    station: str
+    key: Hashable | None
+    """The key of identical requests; None if the request is never shared."""
+    call: Callable[[], Any] | None
+    future: Future
+    submitted: float
+    translation: tuple[str, str] | None = None
+    """The text and the language of a translation request, batched with others."""
+
+
+class Backend:
+    """Schedules the requests of the stations to the shared models."""
+
+    def __init__(self, vision: Vision, language: Language, workers: int = 1) -> None:
+        """Initializes the backend and starts its workers.
+
+        Args:
+            vision: The shared vision model.
+            language: The shared language model.
+            workers: The number of requests sent concurrently to the models.
+        """
+        self.vision = vision
+        self.language = language
+        self._queues: dict[str, deque[_Request]] = {}
+        self._turns: deque[str] = deque()
+        """The stations with waiting requests, the next one to serve first."""
+        self._in_flight: dict[Hashable, Future] = {}
+        self._stats: dict[str, dict[str, float]] = {}
+        self._condition = threading.Condition()
+        self._closed = False
+        self._threads = [
+            threading.Thread(target=self._run, name=f"backend-{index}", daemon=True)
+            for index in range(max(1, workers))
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(
+        self, station: str, key: Hashable | None, call: Callable[[], Any]
+    ) -> Future:
+        """Queues a request of a station.
+
+        Args:
+            station: The name of the station.
+            key: The key identifying identical requests; None to never share
+                the request.
+            call: The function sending the request.
+
+        Returns:
+            The future of the answer; the one of the identical request in flight
+            if any.
+        """
+        return self._submit(station, [(key, call, None)])[0]
+
+    def translate(self, station: str, texts: list[str], language: str) -> list[Future]:
+        """Queues translations; they are sent with the other waiting ones.
+
+        Args:
+            station: The name of the station.
+            texts: The texts to translate.
+            language: The language to translate to.
+
+        Returns:
+            The future of each translation.
+        """
+        return self._submit(
+            station,
+            [(("translate", language, text), None, (text, language)) for text in texts],
+        )
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        """Summarizes the requests per station.
+
+        Returns:
+            The number of requests, the number of requests answered by an
+            identical one in flight, the number of requests served, and the mean
+            time in seconds waiting for a worker and the mean and maximal latency
+            in seconds of the served requests, per station.
+        """
+        with self._condition:
+            return {station: dict(stats) for station, stats in self._stats.items()}
+
+    def close(self) -> None:
+        """Stops the workers once the waiting requests are served."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        for thread in self._threads:
+            thread.join()
+
+    def _submit(
+        self,
+        station: str,
+        requests: list[
+            tuple[Hashable | None, Callable[[], Any] | None, tuple[str, str] | None]
+        ],
+    ) -> list[Future]:
+        futures = []
+        now = time.monotonic()
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("The backend is closed.")
+            stats = self._stats.setdefault(
+                station,
+                {
+                    "requests": 0,
+                    "shared": 0,
+                    "served": 0,
+                    "mean_wait": 0.0,
+                    "mean_latency": 0.0,
+                    "max_latency": 0.0,
+                },
+            )
+            for key, call, translation in requests:
+                stats["requests"] += 1
+                if key is not None and key in self._in_flight:
+                    stats["shared"] += 1
+                    futures.append(self._in_flight[key])
+                    continue
+                future: Future = Future()
+                if key is not None:
+                    self._in_flight[key] = future
+                if not self._queues.get(station):
+                    self._queues[station] = deque()
+                    self._turns.append(station)
+                self._queues[station].append(
+                    _Request(station, key, call, future, now, translation)
+                )
+                futures.append(future)
+            self._condition.notify_all()
+        return futures
+
+    def _next(self) -> list[_Request] | None:
+        """Takes the next requests to send, or None once closed and idle."""
+        with self._condition:
+            while not self._turns:
+                if self._closed:
+                    return None
+                self._condition.wait()
+            # Round robin over the stations with waiting requests
+            station = self._turns.popleft()
+            request = self._queues[station].popleft()
+            if self._queues[station]:
+                self._turns.append(station)
+            batch = [request]
+            if request.translation is not None:
+                # The waiting translations to the same language go with it
+                language = request.translation[1]
+                for name in list(self._turns):
+                    waiting = self._queues[name]
+                    same = [
+                        r
+                        for r in waiting
+                        if r.translation is not None and r.translation[1] == language
+                    ]
+                    for other in same:
+                        waiting.remove(other)
+                        batch.append(other)
+                    if not waiting:
+                        self._turns.remove(name)
+            return batch
+
+    def _run(self) -> None:
+        while (batch := self._next()) is not None:
+            start = time.monotonic()
+            try:
+                if batch[0].translation is not None:
+                    texts = [request.translation[0] for request in batch]
+                    results = self.language.translate_many(
+                        texts, batch[0].translation[1]
+                    )
+                else:
+                    results = [batch[0].call()]
+                for request, result in zip(batch, results):
+                    request.future.set_result(result)
+            except Exception as e:
+                for request in batch:
+                    if not request.future.done():
+                        request.future.set_exception(e)
+            self._done(batch, start)
+
+    def _done(self, batch: list[_Request], start: float) -> None:
+        end = time.monotonic()
+        with self._condition:
+            for request in batch:
+                if request.key is not None:
+                    self._in_flight.pop(request.key, None)
+                stats = self._stats[request.station]
+                stats["served"] += 1
+                served = stats["served"]
+                wait = start - request.submitted
+                stats["mean_wait"] += (wait - stats["mean_wait"]) / served
+                latency = end - request.submitted
+                stats["mean_latency"] += (latency - stats["mean_latency"]) / served
+                stats["max_latency"] = max(stats["max_latency"], latency)
+
+
+class StationVision:
+    """The vision model of a station, sending its requests through the backend."""
+
+    def __init__(
+        self, backend: Backend, station: str, cache: VisionCache | None = None
+    ) -> None:
+        self.backend = backend
+        self.station = station
+        self.cache = cache
+
+    def detect(self, frame: Snapshot, french_flag: bool | None = None) -> Detection:
+        """Detects the objects and the action cards; see ``Vision.detect``."""
+        # A low resolution is enough for the fingerprint
+        fingerprint = dhash(frame.to_array(reduction=4))
+        if self.cache is not None:
+            hit, detection = self.cache.lookup(fingerprint, french_flag)
+            if hit:
+                logger.info(f"Station {self.station}: scene unchanged: {detection}")
+                return detection
+
+        # Frames of the same scene in flight are analyzed once
+        key = ("detect", fingerprint, french_flag)
+        detection = self.backend.submit(
+            self.station, key, lambda: self.backend.vision.detect(frame, french_flag)
+        ).result()
+        if self.cache is not None:
+            self.cache.store(fingerprint, detection, french_flag)
+        return detection
+
+
+class StationLanguage:
+    """The language model of a station, sending its requests through the backend."""
+
+    def __init__(self, backend: Backend, station: str) -> None:
+        self.backend = backend
+        self.station = station
+
+    @property
+    def model(self) -> str:
+        return self.backend.language.model
+
+    def chat(self, query: str) -> str:
+        """Generates a description of the objects; see ``Language.chat``."""
+        return self.backend.submit(
+            self.station, ("chat", query), lambda: self.backend.language.chat(query)
+        ).result()
+
+    def chat_stream(self, query: str) -> Iterator[str]:
+        """Generates a description sentence by sentence; see ``Language.chat_stream``.
+
+        Each sentence is read from the stream by its own backend request, so
+        the worker serves the requests of the other stations in between.
+        """
+        sentences = self.backend.language.chat_stream(query)
+
+        def read() -> str | None:
+            return next(sentences, None)
+
+        try:
+            while (
+                sentence := self.backend.submit(self.station, None, read).result()
+            ) is not None:
+                yield sentence
+        finally:
+            sentences.close()
+
+    def translate(self, text: str, language: str) -> str:
+        """Translates a text; see ``Language.translate``."""
+        return self.translate_many([text], language)[0]
+
+    def translate_many(self, texts: list[str], language: str) -> list[str]:
+        """Translates texts; see ``Language.translate_many``."""
+        futures = self.backend.translate(self.station, texts, language)
+        return [future.result() for future in futures]
+
+
+class StationRuntime:
+    """Runs the sessions of several stations sharing the models."""
+
+    def __init__(
+        self,
+        stations: list[StationConfig],
+        vision: Vision,
+        language: Language,
+        piper_url: str,
+        capture_dir: str | Path,
+        audio_cache_dir: str = "audio_cache",
+        audio_cache_max_bytes: int = 256 * 1024 * 1024,
+        client: HttpClient | None = None,
+        backend_workers: int = 1,
+        camera_options: dict[str, Any] | None = None,
+        stream_synthesis: bool = False,
+        vision_cache_size: int = 0,
+        vision_cache_threshold: int = 12,
+        vision_cache_ttl: float | None = None,
+        station_options: Callable[[Camera, Path], dict[str, Any]] | None = None,
+        **session_options: Any,
+    ) -> None:
+        """Initializes the stations.
+
+        Args:
+            stations: The stations.
+            vision: The shared vision model.
+            language: The shared language model.
+            piper_url: The URL of the Piper TTS API.
+            capture_dir: The directory storing the captures of each station in
+                a subdirectory named after it.
+            audio_cache_dir: The directory of the audio cache shared by the
+                stations.
+            audio_cache_max_bytes: The size budget in bytes of the audio cache.
+            client: The HTTP client calling Piper.
+            backend_workers: The number of requests sent concurrently to the
+                models.
+            camera_options: The options of the cameras, e.g. ``width``.
+            stream_synthesis: Whether to play the audio missing from the cache
+                while Piper synthesizes it.
+            vision_cache_size: The number of vision results cached per station;
+                0 disables the cache.
+            vision_cache_threshold: The maximal number of differing fingerprint
+                bits for two snapshots to be considered the same scene.
+            vision_cache_ttl: The time in seconds after which a cached vision
+                result expires; None to keep the results until they are evicted.
+            station_options: The function creating the options of a session from
+                its camera and capture directory, e.g. ``archive`` or ``scheduler``;
+                by default the captures are archived as is.
+            **session_options: The options of the sessions, e.g. ``wait_time``.
+        """
+        self.backend = Backend(vision, language, backend_workers)
+        self.audio_cache = AudioCache(audio_cache_dir, audio_cache_max_bytes)
+        self.cameras: dict[str, Camera] = {}
+        self.audios: dict[str, Audio] = {}
+        self.sessions: dict[str, Session] = {}
+        for station in stations:
+            station_language = StationLanguage(self.backend, station.name)
+            camera = Camera(camera_id=station.camera_id, **(camera_options or {}))
+            audio = Audio(
+                piper_url=piper_url,
+                language_model=station_language,
+                language=station.language,
+                cache=self.audio_cache,
+                aplay_device=station.audio_device,
+                stream_synthesis=stream_synthesis,
+                client=client,
+            )
+            vision_cache = (
+                VisionCache(
+                    vision_cache_size, vision_cache_threshold, vision_cache_ttl
+                )
+                if vision_cache_size > 0
+                else None
+            )
+            station_dir = Path(capture_dir) / station.name
+            options = (
+                station_options(camera, station_dir)
+                if station_options is not None
+                else {"archive": Archive(station_dir)}
+            )
+            self.cameras[station.name] = camera
+            self.audios[station.name] = audio
+            self.sessions[station.name] = Session(
+                camera,
+                StationVision(self.backend, station.name, vision_cache),
+                station_language,
+                audio,
+                station_dir,
+                **options,
+                **session_options,
+            )
+
+    def run(self) -> None:
+        """Runs the sessions until they all stop or are interrupted."""
+        threads = []
+        for name, session in self.sessions.items():
+            thread = threading.Thread(
+                target=self._run_station, args=(name, session), name=f"station-{name}"
+            )
+            thread.start()
+            threads.append(thread)
+        try:
+            for thread in threads:
+                thread.join()
+        except KeyboardInterrupt:
+            for session in self.sessions.values():
+                session.pipeline.stop()
+            for thread in threads:
+                thread.join()
+        finally:
+            self.backend.close()
+            self.audio_cache.close()
+            for name, stats in self.backend.summary().items():
+                logger.info(
+                    f"Station {name}: {stats['requests']:.0f} requests "
+                    f"({stats['shared']:.0f} shared), "
+                    f"mean wait {stats['mean_wait']:.2f}s, "
+                    f"mean latency {stats['mean_latency']:.2f}s, "
+                    f"max latency {stats['max_latency']:.2f}s"
+                )
+
+    def _run_station(self, name: str, session: Session) -> None:
+        camera = self.cameras[name]
+        audio = self.audios[name]
+        try:
+            if not camera.start():
+                logger.error(f"The camera of the station {name} is not available.")
+                return
+            audio.speak(phrase("greeting", audio.language), skip_translation=True)
+            session.run()
+        except Exception as e:
+            logger.exception(f"The station {name} failed.", exc_info=e)
+        finally:
+            camera.stop()
+            audio.close()
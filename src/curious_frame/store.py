@@ -0,0 +1,254 @@
+# SPDX-FileCopyrightText: 2025-present Frédéric Collonval <frederic.collonval@webscit.com>
+#
+# SPDX-License-Identifier: MIT
+"""Persistent store module for the Curious Frame project.
+
+Language model outputs, descriptions and translations, are stored in SQLite
+databases so they survive restarts; kids show the same toys over and over.
+"""
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Iterable
+
+logger = logging.getLogger(__name__)
+
+
+def canonical_objects(objects: Iterable[str]) -> str:
+    """Builds a key independent of the order and case of the object names.
+
+    Args:
+        objects: The object names.
+
+    Returns:
+        The sorted, lower-cased and de-duplicated names joined by commas.
+    """
+    return ",".join(sorted({obj.strip().lower() for obj in objects if obj.strip()}))
+
+
+class _SqliteStore:
+    """A SQLite database shared by the pipeline stages."""
+
+    _SCHEMA: tuple[str, ...] = ()
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # The connection is shared by the threads, under the lock
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        with self._db:
+            for statement in self._SCHEMA:
+                self._db.execute(statement)
+
+    @property
+    def hit_rate(self) -> float:
+        """The ratio of lookups served from the store."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def close(self) -> None:
+        """Closes the database."""
+        with self._lock:
+            self._db.close()
+
+
+class DescriptionCache(_SqliteStore):
+    """A SQLite cache of the descriptions of object sets.
+
+    Descriptions are keyed on the canonical object set, the language and the
+    model name. Up to ``variants`` descriptions are kept per key and served in
+    turn so repeated answers don't sound identical; entries expire after
+    ``ttl`` seconds and the least recently used are evicted beyond
+    ``max_entries``.
+    """
+
+    _SCHEMA = (
+        """CREATE TABLE IF NOT EXISTS descriptions (
+            objects TEXT NOT NULL,
+            language TEXT NOT NULL,
+            model TEXT NOT NULL,
+            description TEXT NOT NULL,
+            created REAL NOT NULL,
+            used REAL NOT NULL
+        )""",
+        "CREATE INDEX IF NOT EXISTS descriptions_key"
+        " ON descriptions (objects, language, model)",
+    )
+
+    def __init__(
+        self,
+        path: str | Path,
+        ttl: float = 30 * 24 * 3600,
+        max_entries: int = 1000,
+        variants: int = 1,
+    ) -> None:
+        """Initializes the cache.
+
+        Args:
+            path: The path to the SQLite database.
+            ttl: The time in seconds after which a description expires.
+            max_entries: The maximal number of stored descriptions.
+            variants: The number of descriptions generated and rotated per key.
+        """
+        super().__init__(path)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.variants = max(1, variants)
+
+    def lookup(self, objects: Iterable[str], language: str, model: str) -> str | None:
+        """Gets a description of an object set.
+
+        It misses while fewer than ``variants`` descriptions are stored for
+        the key, so a new variant gets generated.
+
+        Args:
+            objects: The object names.
+            language: The language of the description.
+            model: The name of the language model.
+
+        Returns:
+            The least recently served description, or None on a miss.
+        """
+        key = (canonical_objects(objects), language, model)
+        now = time.time()
+        with self._lock, self._db:
+            self._db.execute(
+                "DELETE FROM descriptions"
+                " WHERE objects = ? AND language = ? AND model = ? AND created < ?",
+                (*key, now - self.ttl),
+            )
+            rows = self._db.execute(
+                "SELECT rowid, description FROM descriptions"
+                " WHERE objects = ? AND language = ? AND model = ? ORDER BY used",
+                key,
+            ).fetchall()
+            if len(rows) < self.variants:
+                self.misses += 1
+                description = None
+            else:
+                self.hits += 1
+                rowid, description = rows[0]
+                self._db.execute(
+                    "UPDATE descriptions SET used = ? WHERE rowid = ?", (now, rowid)
+                )
+
+        logger.info(
+            f"Description cache {'hit' if description else 'miss'} for {key[0]!r};"
+            f" hit rate {self.hit_rate:.0%} ({self.hits}/{self.hits + self.misses})"
+        )
+        return description
+
+    def store(
+        self, objects: Iterable[str], language: str, model: str, description: str
+    ) -> None:
+        """Stores a description of an object set.
+
+        Args:
+            objects: The object names.
+            language: The language of the description.
+            model: The name of the language model.
+            description: The description.
+        """
+        now = time.time()
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT INTO descriptions VALUES (?, ?, ?, ?, ?, ?)",
+                (canonical_objects(objects), language, model, description, now, now),
+            )
+            self._db.execute(
+                "DELETE FROM descriptions WHERE created < ?", (now - self.ttl,)
+            )
+            self._db.execute(
+                "DELETE FROM descriptions WHERE rowid NOT IN"
+                " (SELECT rowid FROM descriptions ORDER BY used DESC LIMIT ?)",
+                (self.max_entries,),
+            )
+
+
+class TranslationCache(_SqliteStore):
+    """A SQLite store of translations keyed on the source text, the target
+    language and the model name.
+
+    The least recently used translations are evicted beyond ``max_entries``.
+    """
+
+    _SCHEMA = (
+        """CREATE TABLE IF NOT EXISTS translations (
+            source TEXT NOT NULL,
+            language TEXT NOT NULL,
+            model TEXT NOT NULL,
+            translation TEXT NOT NULL,
+            used REAL NOT NULL,
+            PRIMARY KEY (source, language, model)
+        )""",
+    )
+
+    def __init__(self, path: str | Path = ":memory:", max_entries: int = 10000) -> None:
+        """Initializes the store.
+
+        Args:
+            path: The path to the SQLite database; by default it is kept in memory.
+            max_entries: The maximal number of stored translations.
+        """
+        super().__init__(path)
+        self.max_entries = max_entries
+
+    def lookup(
+        self, sources: Iterable[str], language: str, model: str
+    ) -> dict[str, str]:
+        """Gets the known translations of texts.
+
+        Args:
+            sources: The texts to translate.
+            language: The target language.
+            model: The name of the language model.
+
+        Returns:
+            The translation per source text found in the store.
+        """
+        sources = list(dict.fromkeys(sources))
+        found = {}
+        with self._lock, self._db:
+            for source in sources:
+                row = self._db.execute(
+                    "SELECT translation FROM translations"
+                    " WHERE source = ? AND language = ? AND model = ?",
+                    (source, language, model),
+                ).fetchone()
+                if row is not None:
+                    found[source] = row[0]
+            self._db.executemany(
+                "UPDATE translations SET used = ?"
+                " WHERE source = ? AND language = ? AND model = ?",
+                [(time.time(), source, language, model) for source in found],
+            )
+            self.hits += len(found)
+            self.misses += len(sources) - len(found)
+        return found
+
+    def store(self, translations: dict[str, str], language: str, model: str) -> None:
+        """Stores translations.
+
+        Args:
+            translations: The translation per source text.
+            language: The target language.
+            model: The name of the language model.
+        """
+        now = time.time()
+        with self._lock, self._db:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO translations VALUES (?, ?, ?, ?, ?)",
+                [
+                    (source, language, model, translation, now)
+                    for source, translation in translations.items()
+                ],
+            )
+            self._db.execute(
+                "DELETE FROM translations WHERE rowid NOT IN"
+                " (SELECT rowid FROM translations ORDER BY used DESC LIMIT ?)",
+                (self.max_entries,),
+            )
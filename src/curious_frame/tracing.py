@@ -0,0 +1,334 @@
+# SPDX-FileCopyrightText: 2025-present Frédéric Collonval <frederic.collonval@webscit.com>
+#
+# SPDX-License-Identifier: MIT
+"""Tracing module for the Curious Frame project.
+
+Each interaction gets a trace made of spans timing its stages: capture,
+vision calls, language model, synthesis and playback. The pipeline stages
+activate the trace of the item they process, so the models open spans with
+the module-level :func:`span` without knowing about the session.
+
+A trace is written as one JSON line once the interaction is complete, i.e.
+once its description and all its utterances are played. The span durations
+are also aggregated in histograms exported in the Prometheus text format.
+
+When tracing is disabled no trace is ever activated and :func:`span` returns
+a shared no-op context manager.
+"""
+import json
+import logging
+import threading
+import time
+import uuid
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds in seconds of the latency histogram buckets
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_NULL_CONTEXT = nullcontext()
+_local = threading.local()
+
+
+class Span:
+    """A timed operation of a trace."""
+
+    __slots__ = ("name", "start", "duration", "attributes")
+
+    def __init__(self, name: str, start: float, attributes: dict[str, Any]) -> None:
+        self.name = name
+        self.start = start
+        self.duration = 0.0
+        self.attributes = attributes
+
+    def set(self, **attributes: Any) -> None:
+        """Adds attributes to the span."""
+        self.attributes.update(attributes)
+
+
+class Trace:
+    """The spans of an interaction.
+
+    The trace is complete once every holder released it; the session holds
+    it for the interaction and for each of its utterances.
+    """
+
+    def __init__(self, tracer: "Tracer", **attributes: Any) -> None:
+        self.id = uuid.uuid4().hex[:12]
+        self.timestamp = datetime.now().isoformat(timespec="milliseconds")
+        self.start = time.monotonic()
+        self.attributes = attributes
+        self.spans: list[Span] = []
+        self._tracer = tracer
+        self._holders = 1
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Span]:
+        """Times an operation.
+
+        Args:
+            name: The name of the operation, e.g. ``vision.objects``.
+            **attributes: The attributes of the span.
+
+        Yields:
+            The span.
+        """
+        span = Span(name, time.monotonic(), attributes)
+        try:
+            yield span
+        finally:
+            span.duration = time.monotonic() - span.start
+            with self._lock:
+                self.spans.append(span)
+            self._tracer.observe(name, span.duration)
+
+    def set(self, **attributes: Any) -> None:
+        """Adds attributes to the trace."""
+        self.attributes.update(attributes)
+
+    def hold(self) -> "Trace":
+        """Delays the completion of the trace until ``release`` is called."""
+        with self._lock:
+            self._holders += 1
+        return self
+
+    def release(self) -> None:
+        """Releases the trace; the last release writes it."""
+        with self._lock:
+            self._holders -= 1
+            complete = self._holders == 0
+        if complete:
+            self._tracer.finish(self)
+
+    def to_dict(self) -> dict[str, Any]:
+        """Converts the trace into a JSON serializable record."""
+        with self._lock:
+            spans = sorted(self.spans, key=lambda span: span.start)
+        return {
+            "id": self.id,
+            "timestamp": self.timestamp,
+            "duration": round(time.monotonic() - self.start, 4),
+            **self.attributes,
+            "spans": [
+                {
+                    "name": span.name,
+                    "start": round(span.start - self.start, 4),
+                    "duration": round(span.duration, 4),
+                    **span.attributes,
+                }
+                for span in spans
+            ],
+        }
+
+
+class Tracer:
+    """Creates the traces, writes them and aggregates the span durations."""
+
+    enabled = True
+
+    def __init__(self, path: str | Path | None = None) -> None:
+        """Initializes the tracer.
+
+        Args:
+            path: The JSON Lines file the traces are appended to; if None the
+                traces only feed the metrics.
+        """
+        self.path = Path(path) if path else None
+        self.gauges: dict[str, Callable[[], float]] = {}
+        """Functions giving the current value of gauges, e.g. cache hit rates."""
+        self._histograms: dict[str, list[float]] = {}
+        self._completed = 0
+        self._lock = threading.Lock()
+        self._server: ThreadingHTTPServer | None = None
+
+    def start(self, **attributes: Any) -> Trace:
+        """Starts the trace of an interaction.
+
+        Args:
+            **attributes: The attributes of the trace.
+
+        Returns:
+            The trace, held once.
+        """
+        return Trace(self, **attributes)
+
+    def observe(self, name: str, duration: float) -> None:
+        """Adds a duration to the histogram of a span name.
+
+        Args:
+            name: The span name.
+            duration: The duration in seconds.
+        """
+        with self._lock:
+            # Counts per bucket, then the sum and the count
+            histogram = self._histograms.setdefault(name, [0.0] * (len(BUCKETS) + 2))
+            for index, bound in enumerate(BUCKETS):
+                if duration <= bound:
+                    histogram[index] += 1
+            histogram[-2] += duration
+            histogram[-1] += 1
+
+    def finish(self, trace: Trace) -> None:
+        """Writes a complete trace.
+
+        Args:
+            trace: The trace.
+        """
+        record = trace.to_dict()
+        self.observe("interaction", record["duration"])
+        with self._lock:
+            self._completed += 1
+            if self.path is not None:
+                try:
+                    with open(self.path, "a", encoding="utf-8") as f:
+                        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                except OSError as e:
+                    logger.warning(f"Unable to write the trace {trace.id}: {e}")
+
+    def prometheus(self) -> str:
+        """Formats the metrics in the Prometheus text format.
+
+        Returns:
+            The metrics.
+        """
+        lines = [
+            "# TYPE curious_frame_interactions_total counter",
+            f"curious_frame_interactions_total {self._completed}",
+            "# TYPE curious_frame_span_duration_seconds histogram",
+        ]
+        with self._lock:
+            histograms = {
+                name: list(values) for name, values in self._histograms.items()
+            }
+        metric = "curious_frame_span_duration_seconds"
+        for name, values in sorted(histograms.items()):
+            for bound, count in zip(BUCKETS, values):
+                lines.append(f'{metric}_bucket{{span="{name}",le="{bound}"}} {count:g}')
+            lines.append(f'{metric}_bucket{{span="{name}",le="+Inf"}} {values[-1]:g}')
+            lines.append(f'{metric}_sum{{span="{name}"}} {values[-2]:.6f}')
+            lines.append(f'{metric}_count{{span="{name}"}} {values[-1]:g}')
+        for name, value in sorted(self.gauges.items()):
+            try:
+                lines.append(f"# TYPE curious_frame_{name} gauge")
+                lines.append(f"curious_frame_{name} {float(value()):.6f}")
+            except Exception as e:
+                logger.debug(f"Unable to read the gauge {name}: {e}")
+        return "\n".join(lines) + "\n"
+
+    def serve_metrics(self, port: int, host: str = "0.0.0.0") -> None:
+        """Serves the metrics at ``/metrics`` in a background thread.
+
+        Args:
+            port: The HTTP port.
+            host: The address to listen on.
+        """
+        tracer = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                if self.path != "/metrics":
+                    self.send_error(404)
+                    return
+                body = tracer.prometheus().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(
+            target=self._server.serve_forever, name="metrics", daemon=True
+        ).start()
+        logger.info(f"Serving metrics on http://{host}:{port}/metrics")
+
+    def close(self) -> None:
+        """Stops serving the metrics."""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server = None
+
+
+class NullTracer(Tracer):
+    """A tracer doing nothing, used when tracing is disabled."""
+
+    enabled = False
+
+    def start(self, **attributes: Any) -> None:
+        return None
+
+    def observe(self, name: str, duration: float) -> None:
+        pass
+
+
+@contextmanager
+def activate(trace: Trace | None) -> Iterator[None]:
+    """Makes a trace the current one of the thread.
+
+    Args:
+        trace: The trace; None leaves tracing inactive.
+    """
+    previous = getattr(_local, "trace", None)
+    _local.trace = trace
+    try:
+        yield
+    finally:
+        _local.trace = previous
+
+
+def current() -> Trace | None:
+    """Gets the trace active in the thread.
+
+    Returns:
+        The trace, or None if tracing is inactive.
+    """
+    return getattr(_local, "trace", None)
+
+
+def span(name: str, **attributes: Any):
+    """Times an operation of the active trace.
+
+    Args:
+        name: The name of the operation.
+        **attributes: The attributes of the span.
+
+    Returns:
+        A context manager yielding the span, or None if no trace is active.
+    """
+    trace = getattr(_local, "trace", None)
+    if trace is None:
+        return _NULL_CONTEXT
+    return trace.span(name, **attributes)
+
+
+def record_ollama(span: Span | None, response: dict[str, Any]) -> None:
+    """Adds the statistics returned by Ollama to a span.
+
+    Args:
+        span: The span; nothing is done if None.
+        response: The JSON response of Ollama.
+    """
+    if span is None:
+        return
+    span.set(
+        **{
+            key: response[key]
+            for key in (
+                "eval_count",
+                "eval_duration",
+                "prompt_eval_count",
+                "prompt_eval_duration",
+                "load_duration",
+            )
+            if key in response
+        }
+    )
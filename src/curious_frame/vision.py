@@ -6,15 +6,171 @@
 import base64
 import json
 import logging
-from io import BytesIO
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Hashable
+from dataclasses import dataclass, field
 
 import cv2
 import numpy as np
 import PIL.Image
-import requests
+
+from curious_frame import tracing
+from curious_frame.camera import Snapshot
+from curious_frame.client import HttpClient, default_client
+from curious_frame.fingerprint import dhash, hamming_distance
 
 logger = logging.getLogger(__name__)
 
+# Object names that are not objects shown by the child
+IGNORED_OBJECTS = {"cardboard frame", "unknown"}
+
+# Question asked to detect the French flag action card
+FLAG_QUESTION = "Is there a French flag in the image? Answer with Yes or No."
+
+# JSON schema of the structured vision response
+DETECTION_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "objects": {"type": "array", "items": {"type": "string"}},
+        "french_flag": {"type": "boolean"},
+        "frame_present": {"type": "boolean"},
+    },
+    "required": ["objects", "french_flag", "frame_present"],
+}
+
+
+@dataclass
+class Detection:
+    """The result of the analysis of a snapshot."""
+
+    objects: list[str] = field(default_factory=list)
+    """The objects displayed in the cardboard frame."""
+    french_flag: bool = False
+    """Whether the French flag action card is displayed."""
+    frame_present: bool = True
+    """Whether the cardboard frame is visible."""
+
+    def __post_init__(self) -> None:
+        objects = []
+        for obj in self.objects:
+            obj = obj.strip()
+            if not obj:
+                continue
+            if "french flag" in obj.lower():
+                self.french_flag = True
+            elif obj.lower() not in IGNORED_OBJECTS and obj not in objects:
+                objects.append(obj)
+        self.objects = objects
+        if not self.frame_present:
+            self.objects = []
+            self.french_flag = False
+
+    def __str__(self) -> str:
+        if not self.frame_present:
+            return "no cardboard frame"
+        return ", ".join(self.objects + (["French flag"] if self.french_flag else []))
+
+    @classmethod
+    def from_text(cls, objects_list: str | None) -> "Detection":
+        """Parses a free-text comma-separated list of objects.
+
+        Args:
+            objects_list: The list of objects; None if no cardboard frame was found.
+
+        Returns:
+            The detection.
+        """
+        if objects_list is None:
+            return cls(frame_present=False)
+        return cls(objects=objects_list.split(","))
+
+
+class VisionCache:
+    """A LRU cache of vision results keyed on perceptual frame fingerprints.
+
+    A frame whose fingerprint is within ``max_distance`` bits of a cached
+    fingerprint is considered as the same scene and gets the cached result,
+    provided it was computed with the same context and is not expired.
+    """
+
+    def __init__(
+        self, max_size: int = 32, max_distance: int = 12, ttl: float | None = None
+    ) -> None:
+        """Initializes the cache.
+
+        Args:
+            max_size: The maximal number of cached results.
+            max_distance: The maximal number of differing fingerprint bits
+                for two frames to be considered identical.
+            ttl: The time in seconds after which a result expires; None to
+                keep the results until they are evicted.
+        """
+        self.max_size = max_size
+        self.max_distance = max_distance
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[tuple, tuple[float, Detection]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def lookup(
+        self, fingerprint: int, context: Hashable = None
+    ) -> tuple[bool, Detection | None]:
+        """Looks for the result of a similar frame.
+
+        Args:
+            fingerprint: The fingerprint of the frame.
+            context: The other inputs the result depends on, e.g. the French
+                flag detected locally.
+
+        Returns:
+            Whether a similar frame was found and its cached result.
+        """
+        with self._lock:
+            if self.ttl is not None:
+                expired = time.monotonic() - self.ttl
+                for key in [k for k, (t, _) in self._entries.items() if t < expired]:
+                    del self._entries[key]
+
+            best = None
+            best_distance = self.max_distance + 1
+            for key in self._entries:
+                if key[0] != context:
+                    continue
+                distance = hamming_distance(key[1], fingerprint)
+                if distance < best_distance:
+                    best, best_distance = key, distance
+
+            if best is None:
+                self.misses += 1
+                return False, None
+
+            self.hits += 1
+            self._entries.move_to_end(best)
+            return True, self._entries[best][1]
+
+    def store(
+        self, fingerprint: int, detection: Detection, context: Hashable = None
+    ) -> None:
+        """Stores the result for a frame.
+
+        Args:
+            fingerprint: The fingerprint of the frame.
+            detection: The vision result for the frame.
+            context: The other inputs the result depends on.
+        """
+        with self._lock:
+            key = (context, fingerprint)
+            self._entries[key] = (time.monotonic(), detection)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
 
 class Vision:
     """A class to handle vision-related tasks."""
@@ -23,11 +179,36 @@ class Vision:
         self,
         model_name: str = "vikhyatk/moondream2",
         revision: str = "2025-06-21",
-        url: str = ""
+        url: str = "",
+        cache: VisionCache | None = None,
+        structured: bool = False,
+        client: HttpClient | None = None,
+        embedding_cache_size: int = 4,
+        warm_up: bool = False,
     ):
-        """Initializes the Vision module."""
+        """Initializes the Vision module.
+
+        Args:
+            model_name: The name of the vision model to use.
+            revision: The revision of the local vision model.
+            url: The URL of the Ollama API; if empty the model is run locally.
+            cache: The cache of vision results to skip redundant inferences.
+            structured: Whether to detect the French flag and list the objects
+                in a single Ollama call returning JSON.
+            client: The HTTP client calling Ollama; the shared one by default.
+            embedding_cache_size: The number of image embeddings of the local
+                model cached by frame fingerprint.
+            warm_up: Whether to run the local model once on a dummy image so the
+                first snapshot does not pay its lazy initialization.
+        """
         self.url = url
+        self.client = client or default_client()
+        self.cache = cache
+        self.structured = structured
         self._model_name = model_name
+        self.embedding_cache_size = embedding_cache_size
+        self._embeddings: OrderedDict[int, object] = OrderedDict()
+        self._embeddings_lock = threading.Lock()
         if url:
             self.model = model_name
         else:
@@ -46,28 +227,244 @@ class Vision:
         self.query = """List object within the cardboard frame.
 Format the response as a comma-separated list of object names, without any additional text or formatting.
 If there is no cardboard frame, return _no cardboard frame_."""
+        self.structured_query = """\
+List the objects within the cardboard frame, tell whether
+a French flag is displayed and whether the cardboard frame is visible.
+The French flag is not an object. If there is a French flag, name the objects in French.
+Respond with JSON only."""
+
+        if warm_up:
+            self.warm_up()
+
+    def warm_up(self) -> None:
+        """Loads the model into Ollama and keeps it loaded, or runs the local
+        model on a dummy image."""
+        if self.url:
+            response = self.client.post(
+                "ollama.warmup",
+                self.url,
+                json={"model": self.model, "messages": [], "keep_alive": -1},
+            )
+            response.raise_for_status()
+        else:
+            dummy = Snapshot(frame=np.zeros((64, 64, 3), dtype=np.uint8))
+            self._ask(self._encode(dummy, cache=False), FLAG_QUESTION)
+
+    def detect(
+        self, frame: np.ndarray | Snapshot, french_flag: bool | None = None
+    ) -> Detection:
+        """Detects the objects and the action cards displayed in the cardboard frame.
+
+        Args:
+            frame: The image to analyze; snapshots are sent to the VLM
+                without re-encoding their JPEG image.
+            french_flag: Whether the French flag was already detected locally;
+                if None the VLM is asked.
 
-    def find_objects(self, frame: np.ndarray) -> str | None:
+        Returns:
+            The detection.
+        """
+        frame = _as_snapshot(frame)
+        fingerprint = None
+        if self.cache is not None:
+            # A low resolution is enough for the fingerprint
+            fingerprint = dhash(frame.to_array(reduction=4))
+            hit, detection = self.cache.lookup(fingerprint, french_flag)
+            trace = tracing.current()
+            if trace is not None:
+                trace.set(vision_cache="hit" if hit else "miss")
+            if hit:
+                logger.info(
+                    f"Scene unchanged, reusing objects ({self.cache.hits} hits, "
+                    f"{self.cache.misses} misses): {detection}"
+                )
+                return detection
+
+        if not self.url:
+            detection = self._detect_local(frame, french_flag)
+        elif self.structured:
+            detection = self._detect_structured(frame)
+            if detection is None:
+                # Asked again with the free-text questions
+                detection = Detection.from_text(self.find_objects(frame, french_flag))
+            elif french_flag is not None:
+                detection.french_flag = french_flag and detection.frame_present
+        else:
+            detection = Detection.from_text(self.find_objects(frame, french_flag))
+
+        if fingerprint is not None:
+            self.cache.store(fingerprint, detection, french_flag)
+        return detection
+
+    def _detect_local(
+        self, frame: Snapshot, french_flag: bool | None = None
+    ) -> Detection:
+        """Detects the objects and the French flag with the local model.
+
+        The image is encoded once and its embedding is reused for each question.
+
+        Args:
+            frame: The image to analyze.
+            french_flag: Whether the French flag was already detected locally;
+                if None the model is asked.
+
+        Returns:
+            The detection.
+        """
+        with tracing.span("vision.encode"):
+            encoded = self._encode(frame)
+        with tracing.span("vision.objects"):
+            objects = self._ask(encoded, self.query)
+        if not objects or "no cardboard frame" in objects.lower():
+            detection = Detection(frame_present=False)
+        else:
+            detection = Detection.from_text(objects)
+            if french_flag is None:
+                with tracing.span("vision.flag"):
+                    answer = self._ask(encoded, FLAG_QUESTION)
+                    french_flag = answer.lower().startswith("yes")
+            detection.french_flag = detection.french_flag or french_flag
+
+        logger.info(f"Found objects using {self._model_name}: {detection}")
+        return detection
+
+    def _encode(self, frame: Snapshot, cache: bool = True) -> object:
+        """Encodes an image with the local model; the same frame is encoded once.
+
+        Args:
+            frame: The image to encode.
+            cache: Whether to look for and store the embedding in the cache.
+
+        Returns:
+            The image embedding.
+        """
+        import torch
+
+        fingerprint = dhash(frame.to_array(reduction=4)) if cache else None
+        if fingerprint is not None:
+            with self._embeddings_lock:
+                encoded = self._embeddings.get(fingerprint)
+                if encoded is not None:
+                    self._embeddings.move_to_end(fingerprint)
+                    return encoded
+
+        with torch.inference_mode():
+            encoded = self.model.encode_image(_cv2_to_pil(frame.to_array()))
+
+        if fingerprint is not None and self.embedding_cache_size > 0:
+            with self._embeddings_lock:
+                self._embeddings[fingerprint] = encoded
+                while len(self._embeddings) > self.embedding_cache_size:
+                    self._embeddings.popitem(last=False)
+        return encoded
+
+    def _ask(self, encoded: object, question: str) -> str:
+        """Asks a question about an encoded image to the local model.
+
+        Args:
+            encoded: The image embedding.
+            question: The question.
+
+        Returns:
+            The answer.
+        """
+        import torch
+
+        with torch.inference_mode():
+            output = self.model.query(encoded, question)
+        return (output or {}).get("answer", "").strip()
+
+    def _detect_structured(self, frame: Snapshot) -> Detection | None:
+        """Detects the objects and the French flag in a single Ollama call.
+
+        Args:
+            frame: The image to analyze.
+
+        Returns:
+            The detection, or None if the response does not follow the schema.
+        """
+        data = {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": self.structured_query},
+                {
+                    "role": "user",
+                    "content": "List only the objects within the cardboard frame.",
+                    "images": [],
+                },
+            ],
+            "format": DETECTION_SCHEMA,
+            "stream": False,
+            "keep_alive": -1,
+            "options": {"temperature": 0},
+        }
+
+        logger.debug(f"Prompt sent: {json.dumps(data)}")
+        # Add the encoded image after printing the log info
+        data["messages"][-1]["images"] = [_encode_jpeg(frame)]
+        with tracing.span("vision.structured") as span:
+            response = self.client.post("ollama.vision", self.url, json=data)
+            response.raise_for_status()
+            body = response.json()
+            tracing.record_ollama(span, body)
+        content = body.get("message", {}).get("content", "").strip()
+        try:
+            result = json.loads(content)
+            detection = Detection(
+                objects=[str(obj) for obj in result.get("objects", [])],
+                french_flag=bool(result.get("french_flag", False)),
+                frame_present=bool(result.get("frame_present", True)),
+            )
+        except (json.JSONDecodeError, AttributeError, TypeError):
+            logger.warning(f"Malformed structured response: {content}")
+            return None
+
+        logger.info(f"Found objects using {self._model_name}: {detection}")
+        return detection
+
+    def find_objects(
+        self, frame: np.ndarray | Snapshot, french_flag: bool | None = None
+    ) -> str | None:
         """Finds the objects displayed in the cardboard frame within the image.
 
         Args:
             frame: The image to search for the frame in.
+            french_flag: Whether the French flag was already detected locally;
+                if None the VLM is asked.
 
         Returns:
             The objects found in the cardboard frame, or None if no objects are found.
         """
-        image = _cv2_to_pil(frame)
-
+        frame = _as_snapshot(frame)
         objects = None
+        found_french_flag = bool(french_flag)
         if self.url:
-            buffered = BytesIO()
-            image.save(buffered, format="JPEG")
-            image_b64 = base64.b64encode(buffered.getvalue()).decode("utf-8")
-            response = requests.post(self.url, json={"model": self.model, "messages": [{"role": "user", "content": "Is there a French flag in the image? Answer with Yes or No.", "images": [image_b64]}],"stream":False, "keep_alive": -1})
-            response.raise_for_status()
-            response_content = response.json().get("message", {}).get("content", "").strip().lower()
-            found_french_flag = "yes" == response_content
-            logger.info("Found a French flag: %s", response_content)
+            image_b64 = _encode_jpeg(frame)
+            if french_flag is None:
+                with tracing.span("vision.flag") as span:
+                    response = self.client.post(
+                        "ollama.vision",
+                        self.url,
+                        json={
+                            "model": self.model,
+                            "messages": [
+                                {
+                                    "role": "user",
+                                    "content": FLAG_QUESTION,
+                                    "images": [image_b64],
+                                }
+                            ],
+                            "stream": False,
+                            "keep_alive": -1,
+                        },
+                    )
+                    response.raise_for_status()
+                    body = response.json()
+                    tracing.record_ollama(span, body)
+                content = body.get("message", {}).get("content", "")
+                response_content = content.strip().lower()
+                found_french_flag = "yes" == response_content
+                logger.info("Found a French flag: %s", response_content)
             data = {
                 "model": self.model,
                 "messages": [
@@ -85,23 +482,36 @@ If there is no cardboard frame, return _no cardboard frame_."""
                 "keep_alive": -1,
             }
             
-            logger.info(f"Prompt sent: {json.dumps(data)}")
+            logger.debug(f"Prompt sent: {json.dumps(data)}")
             # Add the encoded image after printing the log info
             data["messages"][-1]["images"] = [image_b64]
-            response = requests.post(self.url, json=data)
-            response.raise_for_status()
-            objects = response.json().get("message", {}).get("content").strip()
-            if found_french_flag:
-                objects += f",French flag"
+            with tracing.span("vision.objects") as span:
+                response = self.client.post("ollama.vision", self.url, json=data)
+                response.raise_for_status()
+                body = response.json()
+                tracing.record_ollama(span, body)
+            objects = body.get("message", {}).get("content").strip()
 
         else:
-            output = self.model.query(image, self.query)
+            objects = self._ask(self._encode(frame), self.query) or None
 
-            if output is not None and output.get("answer", ""):
-                objects = output["answer"]
+        if objects is not None and found_french_flag:
+            objects += ",French flag"
 
         logger.info(f"Found objects using {self._model_name}: {objects}")
-        return objects if 'no cardboard frame' not in objects.lower() else None
+        if objects is not None and "no cardboard frame" in objects.lower():
+            objects = None
+        return objects
+
+
+def _as_snapshot(frame: np.ndarray | Snapshot) -> Snapshot:
+    """Wraps decoded pixels in a snapshot."""
+    return frame if isinstance(frame, Snapshot) else Snapshot(frame=frame)
+
+
+def _encode_jpeg(frame: Snapshot) -> str:
+    """Encodes a snapshot as a base64 JPEG image for Ollama."""
+    return base64.b64encode(frame.to_jpeg()).decode("utf-8")
 
 
 def _cv2_to_pil(image):
@@ -0,0 +1,95 @@
+# SPDX-FileCopyrightText: 2025-present Frédéric Collonval <frederic.collonval@webscit.com>
+#
+# SPDX-License-Identifier: MIT
+"""Tests for the archive module."""
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import cv2
+import numpy as np
+
+from curious_frame.archive import Archive
+from curious_frame.camera import Snapshot
+
+
+class TestArchive(unittest.TestCase):
+    """Tests for the Archive class."""
+
+    def test_snapshots_and_log_written_in_background(self) -> None:
+        """Test that the snapshots are downscaled and the records written in batches."""
+        with tempfile.TemporaryDirectory() as directory:
+            # Arrange
+            archive = Archive(
+                directory, image_reduction=2, thumbnail_width=8, batch_size=2
+            )
+            snapshot = Snapshot(frame=np.full((64, 128, 3), 127, dtype=np.uint8))
+
+            # Act
+            path = archive.save_snapshot(snapshot, "first")
+            for index in range(3):
+                archive.log({"image": path.name, "index": index})
+            archive.close()
+
+            # Assert
+            self.assertEqual(cv2.imread(str(path)).shape, (32, 64, 3))
+            thumbnail = cv2.imread(str(Path(directory) / "thumbnails" / "first.jpg"))
+            self.assertEqual(thumbnail.shape[1], 8)
+            lines = (Path(directory) / "captures.jsonl").read_text().splitlines()
+            self.assertEqual([json.loads(line)["index"] for line in lines], [0, 1, 2])
+
+    def test_items_dropped_when_writer_behind(self) -> None:
+        """Test that the callers never wait for a writer that is behind."""
+        with tempfile.TemporaryDirectory() as directory:
+            # Arrange
+            writing = threading.Event()
+            release = threading.Event()
+
+            def to_jpeg() -> bytes:
+                writing.set()
+                release.wait(5)
+                return b"jpeg"
+
+            snapshot = MagicMock()
+            snapshot.to_jpeg.side_effect = to_jpeg
+            archive = Archive(directory, batch_size=1, max_queue=1)
+
+            # Act
+            archive.save_snapshot(snapshot, "slow")
+            writing.wait(5)
+            archive.log({"index": 0})
+            archive.log({"index": 1})
+            release.set()
+            archive.close()
+
+            # Assert
+            self.assertEqual(archive.dropped, 1)
+            lines = (Path(directory) / "captures.jsonl").read_text().splitlines()
+            self.assertEqual([json.loads(line)["index"] for line in lines], [0])
+
+    def test_retention_by_size_and_age(self) -> None:
+        """Test that the oldest snapshots are deleted first."""
+        with tempfile.TemporaryDirectory() as directory:
+            # Arrange
+            now = time.time()
+            for index, age in enumerate((3600, 60, 0)):
+                path = Path(directory) / f"{index}.jpg"
+                path.write_bytes(b"x" * 100)
+                os.utime(path, (now - age, now - age))
+            archive = Archive(directory, max_bytes=250, max_age=1800)
+
+            # Act
+            archive.close()
+
+            # Assert
+            names = sorted(p.name for p in Path(directory).glob("*.jpg"))
+            self.assertEqual(names, ["1.jpg", "2.jpg"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+# SPDX-FileCopyrightText: 2025-present Frédéric Collonval <frederic.collonval@webscit.com>
+#
+# SPDX-License-Identifier: MIT
+"""Tests for the audio module."""
+import io
+import tempfile
+import unittest
+import wave
+from unittest.mock import MagicMock, patch
+
+from curious_frame.audio import PCM_STREAM_HEADER, PCM_STREAM_MAGIC, Audio
+from curious_frame.phrases import PHRASES, catalog
+from curious_frame.playback import PcmFormat
+
+
+class TestAudio(unittest.TestCase):
+    """Tests for the Audio class."""
+
+    @patch("curious_frame.client.requests.Session.post")
+    def test_prewarm_synthesizes_missing_phrases(self, mock_post: MagicMock) -> None:
+        """Test that the catalog is synthesized once in both languages."""
+        # Arrange
+        content = io.BytesIO()
+        with wave.open(content, "wb") as wav_file:
+            wav_file.setframerate(22050)
+            wav_file.setsampwidth(2)
+            wav_file.setnchannels(1)
+            wav_file.writeframes(b"\x01\x00" * 4)
+        response = MagicMock()
+        response.content = content.getvalue()
+        mock_post.return_value = response
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            audio = Audio(cache_dir=cache_dir)
+
+            # Act
+            first = audio.prewarm(catalog())
+            second = audio.prewarm(catalog())
+            audio.close()
+
+        # Assert
+        self.assertEqual(first, 2 * len(PHRASES))
+        self.assertEqual(second, 0)
+        voices = {call.kwargs["json"].get("voice") for call in mock_post.call_args_list}
+        self.assertEqual(voices, {None, "fr_FR-upmc-medium"})
+
+    @patch("curious_frame.client.requests.Session.post")
+    def test_synthesize_stream_plays_first_chunk(self, mock_post: MagicMock) -> None:
+        """Test that streamed chunks are played as received and then cached."""
+        # Arrange
+        stream = PCM_STREAM_HEADER.pack(PCM_STREAM_MAGIC, 22050, 2, 1) + b"\x01\x00" * 6
+        response = MagicMock()
+        response.__enter__.return_value = response
+        response.iter_content.return_value = [stream[:5], stream[5:16], stream[16:]]
+        mock_post.return_value = response
+        output = MagicMock()
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            audio = Audio(cache_dir=cache_dir, output=output, stream_synthesis=True)
+
+            # Act
+            key = audio.synthesize_stream("Hello.", "en")
+
+            # Assert
+            pcm, fmt = audio.cache.get(key)
+            self.assertEqual(
+                (bytes(pcm), fmt), (b"\x01\x00" * 6, PcmFormat(22050, 2, 1))
+            )
+            self.assertTrue(audio.is_cached("Hello.", "en"))
+            audio.close()
+
+        self.assertTrue(mock_post.call_args.args[0].endswith("/stream"))
+        written = [call.args for call in output.write.call_args_list]
+        self.assertEqual(written[0], (b"\x01\x00\x01\x00", PcmFormat(22050, 2, 1)))
+        self.assertEqual(b"".join(data for data, _ in written), b"\x01\x00" * 6)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+# SPDX-FileCopyrightText: 2025-present Frédéric Collonval <frederic.collonval@webscit.com>
+#
+# SPDX-License-Identifier: MIT
+"""Tests for the audio cache module."""
+import tempfile
+import unittest
+from pathlib import Path
+
+from curious_frame.audio_cache import DATA_FILE, INDEX_FILE, AudioCache
+from curious_frame.playback import PcmFormat
+
+FORMAT = PcmFormat(22050, 2, 1)
+
+
+class TestAudioCache(unittest.TestCase):
+    """Tests for the AudioCache class."""
+
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.directory = Path(self.tmp.name)
+
+    def test_reload_across_restarts(self) -> None:
+        """Test that the audio is found after a restart, a truncated one ignored."""
+        # Arrange
+        cache = AudioCache(self.directory)
+        cache.put("hello", b"\x01\x00" * 8, FORMAT)
+        cache.put("bonjour", b"\x02\x00" * 4, PcmFormat(16000, 2, 1))
+        cache.put("cut", b"\x03\x00" * 4, FORMAT)
+        cache.close()
+        # A crash while the last audio was written
+        with open(self.directory / DATA_FILE, "r+b") as f:
+            f.truncate(28)
+
+        # Act
+        cache = AudioCache(self.directory)
+        hello = cache.get("hello")
+        bonjour = cache.get("bonjour")
+        cut = cache.get("cut")
+
+        # Assert
+        self.assertEqual((bytes(hello[0]), hello[1]), (b"\x01\x00" * 8, FORMAT))
+        self.assertEqual(
+            (bytes(bonjour[0]), bonjour[1]), (b"\x02\x00" * 4, PcmFormat(16000, 2, 1))
+        )
+        self.assertIsNone(cut)
+        self.assertEqual((cache.hits, cache.misses), (2, 1))
+        cache.close()
+
+    def test_least_recently_used_evicted(self) -> None:
+        """Test that the least recently played audio is evicted beyond the budget."""
+        # Arrange
+        cache = AudioCache(self.directory, max_bytes=20)
+        cache.put("a", b"a" * 8, FORMAT)
+        cache.put("b", b"b" * 8, FORMAT)
+        cache.get("a")
+
+        # Act
+        cache.put("c", b"c" * 8, FORMAT)
+        cache.close()
+        reloaded = AudioCache(self.directory, max_bytes=20)
+
+        # Assert
+        self.assertEqual(
+            ("a" in reloaded, "b" in reloaded, "c" in reloaded), (True, False, True)
+        )
+        self.assertEqual(reloaded.size, 16)
+        reloaded.close()
+
+    def test_recency_survives_restarts(self) -> None:
+        """Test that the audio played before a restart is evicted last."""
+        for crash in (False, True):
+            with self.subTest(crash=crash):
+                # Arrange
+                directory = self.directory / str(crash)
+                cache = AudioCache(directory)
+                for key in ("greeting", "first", "second"):
+                    cache.put(key, key[0].encode() * 10, FORMAT)
+                cache.get("greeting")
+                if crash:
+                    # The play is logged with the next utterance; no close
+                    cache.put("third", b"t" * 10, FORMAT)
+                else:
+                    cache.close()
+
+                # Act
+                cache = AudioCache(directory, max_bytes=30)
+                cache.put("fourth", b"f" * 10, FORMAT)
+
+                # Assert
+                self.assertIn("greeting", cache)
+                self.assertNotIn("first", cache)
+                cache.close()
+
+    def test_compaction(self) -> None:
+        """Test that the data file is rewritten without the evicted audio."""
+        # Arrange
+        cache = AudioCache(self.directory, max_bytes=16)
+        for key in "abcd":
+            cache.put(key, key.encode() * 8, FORMAT)
+
+        # Act
+        cache.compact()
+        c = cache.get("c")
+        cache.close()
+        reloaded = AudioCache(self.directory)
+
+        # Assert
+        self.assertEqual(bytes(c[0]), b"c" * 8)
+        self.assertEqual((self.directory / DATA_FILE).stat().st_size, 16)
+        self.assertEqual(len((self.directory / INDEX_FILE).read_text().splitlines()), 2)
+        self.assertEqual(bytes(reloaded.get("d")[0]), b"d" * 8)
+        reloaded.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,10 +2,42 @@
 #
 # SPDX-License-Identifier: MIT
 """Tests for the camera module."""
+import threading
 import unittest
 from unittest.mock import MagicMock, patch
 
-from curious_frame.camera import Camera
+import cv2
+import numpy as np
+
+from curious_frame.camera import Camera, Snapshot
+
+
+class TestSnapshot(unittest.TestCase):
+    """Tests for the Snapshot class."""
+
+    def test_encoded_once_across_threads(self) -> None:
+        """Test that concurrent readers of the JPEG image share one encoding."""
+        # Arrange
+        snapshot = Snapshot(frame=np.zeros((8, 8, 3), dtype=np.uint8))
+        encode = cv2.imencode
+        started = threading.Event()
+
+        def slow_encode(*args):
+            started.set()
+            threading.Event().wait(0.1)
+            return encode(*args)
+
+        with patch("cv2.imencode", side_effect=slow_encode) as mock_encode:
+            # Act
+            reader = threading.Thread(target=snapshot.to_jpeg)
+            reader.start()
+            started.wait(5)
+            jpeg = snapshot.to_jpeg()
+            reader.join()
+
+        # Assert
+        mock_encode.assert_called_once()
+        self.assertEqual(jpeg[:2], b"\xff\xd8")
 
 
 class TestCamera(unittest.TestCase):
@@ -25,6 +57,73 @@ class TestCamera(unittest.TestCase):
         self.assertIsNotNone(camera)
         mock_video_capture.assert_called_once()
 
+    @patch("cv2.VideoCapture")
+    def test_persistent_capture(self, mock_video_capture: MagicMock) -> None:
+        """Test that a started camera keeps the pipeline open between frames."""
+        # Arrange
+        mock_capture_instance = MagicMock()
+        mock_capture_instance.isOpened.return_value = True
+
+        def read(image=None):
+            image[:] = 42
+            return True, image
+
+        mock_capture_instance.read.side_effect = read
+        mock_video_capture.return_value = mock_capture_instance
+
+        # Act
+        camera = Camera(width=4, height=2)
+        started = camera.start()
+        first = camera.get_frame()
+        second = camera.get_frame()
+        camera.stop()
+
+        # Assert
+        self.assertTrue(started)
+        self.assertEqual(first.shape, (2, 4, 3))
+        self.assertTrue(np.all(second == 42))
+        self.assertIsNot(first, second)
+        mock_video_capture.assert_called_once()
+        mock_capture_instance.release.assert_called_once()
+        self.assertFalse(camera.is_running)
+
+    @patch("cv2.VideoCapture")
+    def test_start_without_frame(self, mock_video_capture: MagicMock) -> None:
+        """Test that a camera without frame is released when it fails to start."""
+        # Arrange
+        mock_capture_instance = MagicMock()
+        mock_capture_instance.isOpened.return_value = True
+        mock_capture_instance.read.return_value = (False, None)
+        mock_video_capture.return_value = mock_capture_instance
+
+        # Act
+        camera = Camera(width=4, height=2)
+        started = camera.start(timeout=0.1)
+
+        # Assert
+        self.assertFalse(started)
+        self.assertFalse(camera.is_running)
+        mock_capture_instance.release.assert_called_once()
+
+    @patch("cv2.VideoCapture")
+    def test_jpeg_passthrough(self, mock_video_capture: MagicMock) -> None:
+        """Test that the JPEG image of the camera is kept as is."""
+        # Arrange
+        _, jpeg = cv2.imencode(".jpg", np.full((64, 96, 3), 128, dtype=np.uint8))
+        mock_capture_instance = MagicMock()
+        mock_capture_instance.isOpened.return_value = True
+        mock_capture_instance.read.return_value = (True, jpeg.reshape(1, -1))
+        mock_video_capture.return_value = mock_capture_instance
+
+        # Act
+        camera = Camera(passthrough=True)
+        snapshot = camera.get_snapshot()
+
+        # Assert
+        self.assertNotIn("nvjpegdec", mock_video_capture.call_args.args[0])
+        self.assertEqual(snapshot.to_jpeg(), jpeg.tobytes())
+        self.assertEqual(snapshot.to_array(reduction=2).shape, (32, 48, 3))
+
 
 if __name__ == "__main__":
     unittest.main()
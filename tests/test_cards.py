@@ -0,0 +1,78 @@
+# SPDX-FileCopyrightText: 2025-present Frédéric Collonval <frederic.collonval@webscit.com>
+#
+# SPDX-License-Identifier: MIT
+"""Tests for the cards module."""
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from curious_frame.cards import ActionCardDetector
+
+
+def _background() -> np.ndarray:
+    return np.full((720, 1280, 3), (90, 120, 140), dtype=np.uint8)
+
+
+class TestActionCardDetector(unittest.TestCase):
+    """Tests for the ActionCardDetector class."""
+
+    def test_french_flag(self) -> None:
+        """Test that the bundled registry recognizes the French flag."""
+        # Arrange
+        detector = ActionCardDetector()
+        frame = _background()
+        frame[200:380, 400:480] = (164, 85, 0)
+        frame[200:380, 480:560] = (235, 235, 235)
+        frame[200:380, 560:640] = (53, 65, 239)
+
+        # Act
+        cards = detector.detect(frame)
+
+        # Assert
+        self.assertEqual([card.name for card in cards], ["french_flag"])
+        self.assertEqual(cards[0].action, {"language": "fr"})
+        self.assertEqual(detector.detect(_background()), [])
+
+    def test_aruco_card_from_registry(self) -> None:
+        """Test that a card can be added through the registry only."""
+        # Arrange
+        dictionary = cv2.aruco.getPredefinedDictionary(cv2.aruco.DICT_4X4_50)
+        marker = cv2.aruco.generateImageMarker(dictionary, 7, 200)
+        frame = _background()
+        frame[150:450, 150:450] = 255
+        frame[200:400, 200:400] = marker[..., None]
+
+        with tempfile.TemporaryDirectory() as tmp:
+            registry = Path(tmp) / "cards.json"
+            registry.write_text(
+                json.dumps(
+                    {
+                        "cards": [
+                            {
+                                "name": "story",
+                                "detector": "aruco",
+                                "marker_id": 7,
+                                "action": {"language": "en", "mode": "story"},
+                            }
+                        ]
+                    }
+                )
+            )
+
+            # Act
+            with self.assertLogs("curious_frame.cards", "WARNING") as logs:
+                cards = ActionCardDetector(registry).detect(frame)
+
+        # Assert
+        self.assertEqual([card.label for card in cards], ["story"])
+        # Unknown actions are reported when the registry is loaded
+        self.assertEqual(cards[0].action, {"language": "en"})
+        self.assertIn("unknown action mode", logs.output[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
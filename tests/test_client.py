@@ -0,0 +1,63 @@
+# SPDX-FileCopyrightText: 2025-present Frédéric Collonval <frederic.collonval@webscit.com>
+#
+# SPDX-License-Identifier: MIT
+"""Tests for the client module."""
+import asyncio
+import unittest
+from unittest.mock import MagicMock, patch
+
+import requests
+
+from curious_frame.client import HttpClient
+
+
+def _response(status: int, content: bytes = b"{}") -> MagicMock:
+    response = MagicMock()
+    response.status_code = status
+    response.headers = {}
+    response.content = content
+    return response
+
+
+class TestHttpClient(unittest.TestCase):
+    """Tests for the HttpClient class."""
+
+    @patch("curious_frame.client.requests.Session.post")
+    def test_retries_unavailable_server(self, mock_post: MagicMock) -> None:
+        """Test that connection errors and gateway errors are retried with timeouts."""
+        # Arrange
+        mock_post.side_effect = [
+            requests.ConnectionError("refused"),
+            _response(503),
+            _response(200, b"audio"),
+        ]
+        client = HttpClient(timeouts={"piper.synthesize": (1.0, 5.0)}, backoff=0)
+
+        # Act
+        response = client.post("piper.synthesize", "http://piper", json={"text": "Hi"})
+
+        # Assert
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(mock_post.call_count, 3)
+        self.assertEqual(mock_post.call_args.kwargs["timeout"], (1.0, 5.0))
+        summary = client.summary()["piper.synthesize"]
+        self.assertEqual(
+            (summary["calls"], summary["failures"], summary["bytes"]), (2, 1, 7)
+        )
+
+    @patch("curious_frame.client.requests.Session.post")
+    def test_read_timeout_not_retried(self, mock_post: MagicMock) -> None:
+        """Test that a model too slow to answer fails at once."""
+        # Arrange
+        mock_post.side_effect = requests.ReadTimeout("stalled")
+        client = HttpClient(backoff=0)
+
+        # Act / Assert
+        with self.assertRaises(requests.ReadTimeout):
+            asyncio.run(client.apost("ollama.chat", "http://ollama", json={}))
+        self.assertEqual(mock_post.call_count, 1)
+        self.assertIsNone(client.records[-1].status)
+
+
+if __name__ == "__main__":
+    unittest.main()
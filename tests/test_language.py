@@ -0,0 +1,65 @@
+# SPDX-FileCopyrightText: 2025-present Frédéric Collonval <frederic.collonval@webscit.com>
+#
+# SPDX-License-Identifier: MIT
+"""Tests for the language module."""
+import json
+import unittest
+from unittest.mock import MagicMock, patch
+
+from curious_frame.language import Language, split_sentences
+
+
+class TestLanguage(unittest.TestCase):
+    """Tests for the Language class."""
+
+    def test_split_sentences(self) -> None:
+        """Test that only complete sentences are split."""
+        sentences, pending = split_sentences("A cat purrs. Le chat ronronne ! It is so")
+
+        self.assertEqual(sentences, ["A cat purrs.", "Le chat ronronne !"])
+        self.assertEqual(pending, "It is so")
+
+    @patch("curious_frame.client.requests.Session.post")
+    def test_chat_stream(self, mock_post: MagicMock) -> None:
+        """Test that streamed chunks are yielded sentence by sentence."""
+        # Arrange
+        chunks = ["A ball", " rolls. It", " is round", "!", ""]
+        response = MagicMock()
+        response.__enter__.return_value = response
+        response.iter_lines.return_value = [
+            json.dumps(
+                {"message": {"content": c}, "done": i == len(chunks) - 1}
+            ).encode()
+            for i, c in enumerate(chunks)
+        ]
+        mock_post.return_value = response
+
+        # Act
+        sentences = list(Language(model="llm", url="http://ollama").chat_stream("ball"))
+
+        # Assert
+        self.assertEqual(sentences, ["A ball rolls.", "It is round!"])
+        self.assertTrue(mock_post.call_args.kwargs["json"]["stream"])
+
+    @patch("curious_frame.client.requests.Session.post")
+    def test_translate_many(self, mock_post: MagicMock) -> None:
+        """Test that missing translations are requested together and stored."""
+        # Arrange
+        language = Language(model="llm", url="http://ollama")
+        language.translations.store({"Hello!": "Bonjour !"}, "french", "llm")
+        content = json.dumps({"translations": ["Un chat.", "Un chien."]})
+        mock_post.return_value.json.return_value = {"message": {"content": content}}
+
+        # Act
+        first = language.translate_many(["A cat.", "Hello!", "A dog."], "french")
+        second = language.translate("A dog.", "french")
+
+        # Assert
+        self.assertEqual(first, ["Un chat.", "Bonjour !", "Un chien."])
+        self.assertEqual(second, "Un chien.")
+        mock_post.assert_called_once()
+        self.assertIn("format", mock_post.call_args.kwargs["json"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,185 @@
+# SPDX-FileCopyrightText: 2025-present Frédéric Collonval <frederic.collonval@webscit.com>
+#
+# SPDX-License-Identifier: MIT
+"""Tests for the Piper HTTP server."""
+import argparse
+import io
+import json
+import sys
+import tempfile
+import threading
+import time
+import unittest
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
+
+sys.path.insert(0, str(Path(__file__).parents[1] / "piper_server"))
+
+import http_server  # noqa: E402
+
+
+class FakeVoice:
+    """A voice writing one frame per character; it fails if used concurrently."""
+
+    def __init__(self) -> None:
+        self.config = SimpleNamespace(
+            num_speakers=1,
+            speaker_id_map={},
+            sample_rate=16000,
+            length_scale=1.0,
+            noise_scale=0.667,
+            noise_w=0.8,
+        )
+        self.busy = threading.Lock()
+
+    def synthesize(self, text, wav_file, **kwargs) -> None:
+        if not self.busy.acquire(blocking=False):
+            raise RuntimeError("Session used by two requests")
+        try:
+            time.sleep(0.05)
+            wav_file.setframerate(self.config.sample_rate)
+            wav_file.setsampwidth(2)
+            wav_file.setnchannels(1)
+            frames = round(len(text) * kwargs.get("length_scale", 1.0))
+            wav_file.writeframes(b"\x01\x00" * frames)
+        finally:
+            self.busy.release()
+
+
+def _args() -> argparse.Namespace:
+    return argparse.Namespace(
+        speaker=None,
+        length_scale=None,
+        noise_scale=None,
+        noise_w=None,
+        sentence_silence=0.0,
+    )
+
+
+class TestPiperServer(unittest.TestCase):
+    """Tests for the voice pools and the POST / route."""
+
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        for model_id in ("en_voice", "fr_voice", "de_voice"):
+            (Path(self.tmp.name) / f"{model_id}.onnx").touch()
+        self.loads = []
+        patcher = patch.object(http_server, "load_voice", side_effect=self._load_voice)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.tmp.cleanup)
+
+    def _load_voice(self, model_path, config_path=None, **kwargs) -> FakeVoice:
+        self.loads.append(Path(model_path).stem)
+        time.sleep(0.05)
+        return FakeVoice()
+
+    def _registry(self, **kwargs) -> http_server.VoiceRegistry:
+        registry = http_server.VoiceRegistry([self.tmp.name], **kwargs)
+        registry.default_id = "en_voice"
+        registry.load("en_voice", Path(self.tmp.name) / "en_voice.onnx")
+        return registry
+
+    def test_concurrent_requests(self) -> None:
+        """Test that simultaneous requests share the pools without racing."""
+        # Arrange
+        registry = self._registry(sessions=2)
+        client = http_server.create_app(registry, _args()).test_client()
+
+        def post(index: int):
+            voice = "fr_voice" if index % 2 else "en_voice"
+            text = "x" * (index + 1)
+            response = client.post("/", data=json.dumps({"text": text, "voice": voice}))
+            return text, response
+
+        # Act
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(post, range(16)))
+
+        # Assert
+        for text, response in results:
+            self.assertEqual(response.status_code, 200)
+            with wave.open(io.BytesIO(response.data), "rb") as wav_file:
+                self.assertEqual(wav_file.getnframes(), len(text))
+        # The French voice is loaded once despite the concurrent first requests
+        self.assertEqual(self.loads.count("fr_voice"), 2)
+        self.assertEqual(self.loads.count("en_voice"), 2)
+
+    def test_synthesis_cache(self) -> None:
+        """Test that identical requests are synthesized once and revalidated by ETag."""
+        # Arrange
+        registry = self._registry()
+        cache = http_server.SynthesisCache(self.tmp.name + "/cache")
+        client = http_server.create_app(registry, _args(), cache).test_client()
+        data = json.dumps({"text": "Bonjour", "voice": "fr_voice"})
+
+        # Act
+        first = client.post("/", data=data)
+        second = client.post("/", data=data)
+        etag = first.headers["ETag"]
+        revalidated = client.post("/", data=data, headers={"If-None-Match": etag})
+        slower = json.dumps(
+            {"text": "Bonjour", "voice": "fr_voice", "length_scale": 1.5}
+        )
+        other = client.post("/", data=slower)
+        # A new server reads the disk tier
+        restarted = http_server.SynthesisCache(self.tmp.name + "/cache")
+        client = http_server.create_app(registry, _args(), restarted).test_client()
+        third = client.post("/", data=data)
+        args = _args()
+        args.sentence_silence = 0.5
+        silent = http_server.create_app(registry, args, restarted).test_client()
+        spaced = silent.post("/", data=data)
+
+        # Assert
+        self.assertEqual(first.headers["X-Cache"], "MISS")
+        self.assertEqual(second.headers["X-Cache"], "HIT")
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(revalidated.status_code, 304)
+        self.assertEqual(other.headers["X-Cache"], "MISS")
+        # The request parameters are applied to the synthesis
+        self.assertNotEqual(other.data, first.data)
+        self.assertEqual(third.headers["X-Cache"], "HIT")
+        # The server parameters are part of the key
+        self.assertEqual(spaced.headers["X-Cache"], "MISS")
+        self.assertNotEqual(spaced.headers["ETag"], etag)
+        self.assertEqual(cache.stats["memory_hits"], 1)
+        self.assertEqual(restarted.stats["disk_hits"], 1)
+        self.assertEqual(client.get("/stats").json["cache"]["disk_hits"], 1)
+
+    def test_disk_cache_evicts_least_recently_used(self) -> None:
+        """Test that the disk tier is bounded in size."""
+        # Arrange
+        cache = http_server.SynthesisCache(
+            self.tmp.name + "/cache", max_memory_bytes=0, max_disk_bytes=250
+        )
+
+        # Act
+        for key in ("a", "b", "c"):
+            cache.put(key, b"x" * 100)
+            time.sleep(0.01)
+
+        # Assert
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.get("c"), b"x" * 100)
+        self.assertEqual(cache.stats["evictions"], 1)
+
+    def test_least_recently_used_voice_unloaded(self) -> None:
+        """Test that the number of voices in memory is bounded."""
+        # Arrange
+        registry = self._registry(max_voices=2)
+
+        # Act
+        registry.get("fr_voice")
+        registry.get("de_voice")
+
+        # Assert
+        self.assertEqual(registry.loaded, ["en_voice", "de_voice"])
+        self.assertIsNone(registry.get("it_voice"))
+
+
+if __name__ == "__main__":
+    unittest.main()
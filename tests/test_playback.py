@@ -0,0 +1,81 @@
+# SPDX-FileCopyrightText: 2025-present Frédéric Collonval <frederic.collonval@webscit.com>
+#
+# SPDX-License-Identifier: MIT
+"""Tests for the playback module."""
+import os
+import tempfile
+import time
+import unittest
+import wave
+from unittest.mock import MagicMock, patch
+
+from curious_frame.playback import AudioOutput, PcmFormat
+
+
+def _write_wav(path: str, rate: int, frames: int) -> None:
+    with wave.open(path, "wb") as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(rate)
+        wav_file.writeframes(b"\x01\x00" * frames)
+
+
+class TestAudioOutput(unittest.TestCase):
+    """Tests for the AudioOutput class."""
+
+    @patch("curious_frame.playback._open_sink")
+    def test_device_kept_open_between_utterances(
+        self, mock_open_sink: MagicMock
+    ) -> None:
+        """Test that the device is only reopened when the format changes."""
+        # Arrange
+        sinks = []
+        mock_open_sink.side_effect = (
+            lambda device, fmt: sinks.append(MagicMock()) or sinks[-1]
+        )
+
+        with tempfile.TemporaryDirectory() as tmp:
+            first, second, third = (os.path.join(tmp, f"{i}.wav") for i in range(3))
+            _write_wav(first, 22050, 5000)
+            _write_wav(second, 22050, 100)
+            _write_wav(third, 16000, 100)
+            output = AudioOutput("speaker")
+
+            # Act
+            output.play_wav(first)
+            output.play_wav(second)
+            output.play_wav(third)
+            output.close()
+
+        # Assert
+        self.assertEqual(
+            [call.args for call in mock_open_sink.call_args_list],
+            [("speaker", PcmFormat(22050, 2, 1)), ("speaker", PcmFormat(16000, 2, 1))],
+        )
+        written = b"".join(call.args[0] for call in sinks[0].write.call_args_list)
+        self.assertEqual(len(written), 2 * 5100)
+        sinks[0].close.assert_called_once()
+        sinks[1].close.assert_called_once()
+
+    @patch("curious_frame.playback._open_sink")
+    def test_drain_waits_for_the_audio_to_play(self, mock_open_sink: MagicMock) -> None:
+        """Test that draining waits for the duration of the audio sent at once."""
+        # Arrange
+        output = AudioOutput("speaker")
+        fmt = PcmFormat(16000, 2, 1)
+
+        # Act
+        start = time.monotonic()
+        output.play_pcm(bytes(2 * 3200), fmt)
+        sent = time.monotonic() - start
+        output.drain()
+        played = time.monotonic() - start
+        output.close()
+
+        # Assert
+        self.assertLess(sent, 0.1)
+        self.assertGreaterEqual(played, 0.19)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+# SPDX-FileCopyrightText: 2025-present Frédéric Collonval <frederic.collonval@webscit.com>
+#
+# SPDX-License-Identifier: MIT
+"""Tests for the replay module."""
+import csv
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import cv2
+import numpy as np
+
+from curious_frame.replay import Replay, read_captures
+from curious_frame.vision import Detection
+
+
+class TestReplay(unittest.TestCase):
+    """Tests for the Replay class."""
+
+    def test_read_captures_of_both_logs(self) -> None:
+        """Test that the snapshots of the JSON Lines and legacy CSV logs are listed."""
+        with tempfile.TemporaryDirectory() as directory:
+            # Arrange
+            directory = Path(directory)
+            for name in ("a", "b", "c"):
+                cv2.imwrite(
+                    str(directory / f"{name}.jpg"), np.zeros((8, 8, 3), dtype=np.uint8)
+                )
+            record = {"image": "b.jpg", "objects": "cat, ball"}
+            (directory / "captures.jsonl").write_text(json.dumps(record) + "\n")
+            with open(directory / "captures.csv", "w", newline="") as f:
+                csv.writer(f).writerow(["/elsewhere/a.jpg", "N/A", "N/A"])
+
+            # Act
+            captures = list(read_captures(directory))
+
+        # Assert
+        self.assertEqual(
+            [capture.image.name for capture in captures], ["b.jpg", "a.jpg", "c.jpg"]
+        )
+        self.assertEqual(
+            [capture.objects for capture in captures], ["cat, ball", None, None]
+        )
+
+    def test_resume_and_diff(self) -> None:
+        """Test that the analyzed snapshots are skipped and the objects compared."""
+        with tempfile.TemporaryDirectory() as directory:
+            # Arrange
+            directory = Path(directory)
+            for name in ("a", "b"):
+                cv2.imwrite(
+                    str(directory / f"{name}.jpg"), np.zeros((8, 8, 3), dtype=np.uint8)
+                )
+            records = [
+                {"image": "a.jpg", "objects": "cat, ball"},
+                {"image": "b.jpg", "objects": "cup"},
+            ]
+            (directory / "captures.jsonl").write_text(
+                "".join(json.dumps(r) + "\n" for r in records)
+            )
+            vision = MagicMock()
+            vision.detect.return_value = Detection(["Cat", "duck"])
+            replay = Replay(vision, directory / "results.csv", workers=2)
+
+            # Act
+            first = replay.run(read_captures(directory), limit=1)
+            second = replay.run(read_captures(directory))
+            with open(directory / "results.csv", newline="") as f:
+                rows = list(csv.DictReader(f))
+
+        # Assert
+        self.assertEqual((first["analyzed"], second["analyzed"]), (1, 1))
+        self.assertEqual(vision.detect.call_count, 2)
+        self.assertEqual([row["image"] for row in rows], ["a.jpg", "b.jpg"])
+        self.assertEqual((rows[0]["added"], rows[0]["removed"]), ("duck", "ball"))
+        self.assertEqual((rows[1]["added"], rows[1]["removed"]), ("cat, duck", "cup"))
+
+    def test_unknown_objects_not_compared(self) -> None:
+        """Test that a snapshot without recorded objects is not a mismatch."""
+        with tempfile.TemporaryDirectory() as directory:
+            # Arrange
+            directory = Path(directory)
+            cv2.imwrite(str(directory / "a.jpg"), np.zeros((8, 8, 3), dtype=np.uint8))
+            vision = MagicMock()
+            vision.detect.return_value = Detection(["cat"])
+            replay = Replay(vision, directory / "results.csv")
+
+            # Act
+            summary = replay.run(read_captures(directory))
+            with open(directory / "results.csv", newline="") as f:
+                rows = list(csv.DictReader(f))
+
+        # Assert
+        self.assertEqual((summary["analyzed"], summary["compared"]), (1, 0))
+        self.assertEqual(summary["matches"], 0)
+        self.assertEqual((rows[0]["objects"], rows[0]["added"]), ("cat", ""))
+
+
+if __name__ == "__main__":
+    unittest.main()
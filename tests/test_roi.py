@@ -0,0 +1,62 @@
+# SPDX-FileCopyrightText: 2025-present Frédéric Collonval <frederic.collonval@webscit.com>
+#
+# SPDX-License-Identifier: MIT
+"""Tests for the roi module."""
+import unittest
+
+import cv2
+import numpy as np
+
+from curious_frame.roi import FrameLocator
+
+
+def _snapshot(with_frame: bool = True) -> np.ndarray:
+    """Builds a snapshot of a cardboard frame seen slightly in perspective."""
+    snapshot = np.full((720, 1280, 3), 200, dtype=np.uint8)
+    if with_frame:
+        outer = np.array([[300, 120], [1000, 150], [980, 620], [320, 600]], np.int32)
+        inner = np.array([[380, 200], [920, 220], [900, 540], [400, 530]], np.int32)
+        cv2.fillConvexPoly(snapshot, outer, (40, 90, 140))
+        cv2.fillConvexPoly(snapshot, inner, (250, 250, 250))
+        cv2.circle(snapshot, (650, 370), 60, (0, 0, 255), -1)
+    return snapshot
+
+
+class TestFrameLocator(unittest.TestCase):
+    """Tests for the FrameLocator class."""
+
+    def test_crop_to_frame(self) -> None:
+        """Test that the snapshot is cropped to the cardboard frame."""
+        # Arrange
+        locator = FrameLocator(output_size=512)
+
+        # Act
+        crop = locator.crop(_snapshot())
+
+        # Assert
+        np.testing.assert_allclose(
+            locator.corners, [[300, 120], [1000, 150], [980, 620], [320, 600]], atol=6
+        )
+        self.assertEqual(max(crop.shape[:2]), 512)
+        # The red ball is in the middle of the crop
+        center = crop[crop.shape[0] // 2, crop.shape[1] // 2]
+        self.assertEqual(tuple(center), (0, 0, 255))
+
+    def test_cached_frame_is_revalidated(self) -> None:
+        """Test that the frame is forgotten when it disappears."""
+        # Arrange
+        locator = FrameLocator(output_size=512)
+        corners = locator.locate(_snapshot())
+
+        # Act
+        cached = locator.locate(_snapshot())
+        lost = locator.locate(_snapshot(with_frame=False))
+
+        # Assert
+        self.assertIs(cached, corners)
+        self.assertIsNone(lost)
+        self.assertEqual(locator.crop(_snapshot(with_frame=False)).shape, (288, 512, 3))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+# SPDX-FileCopyrightText: 2025-present Frédéric Collonval <frederic.collonval@webscit.com>
+#
+# SPDX-License-Identifier: MIT
+"""Tests for the scheduler module."""
+import threading
+import unittest
+from unittest.mock import MagicMock
+
+import numpy as np
+
+from curious_frame.camera import Snapshot
+from curious_frame.scheduler import MotionScheduler
+
+
+def _camera(frames: list[np.ndarray]) -> MagicMock:
+    """Builds a camera returning the frames in turn, then the last one."""
+    frames = iter(frames)
+    last = []
+
+    def get_snapshot(timeout: float = 5.0) -> Snapshot:
+        last[:] = [next(frames, last[0] if last else None)]
+        return Snapshot(frame=last[0])
+
+    camera = MagicMock()
+    camera.get_snapshot.side_effect = get_snapshot
+    return camera
+
+
+def _scene(value: int) -> np.ndarray:
+    frame = np.full((160, 160, 3), 50, dtype=np.uint8)
+    frame[40:120, 40:120] = value
+    return frame
+
+
+class TestMotionScheduler(unittest.TestCase):
+    """Tests for the MotionScheduler class."""
+
+    def test_changed_scene_triggers_once_stable(self) -> None:
+        """Test that the analysis is triggered once the motion settles on a scene."""
+        # Arrange
+        hand = np.random.default_rng(0).integers(0, 255, (160, 160, 3), dtype=np.uint8)
+        camera = _camera([_scene(200), _scene(200), hand, _scene(100)])
+        scheduler = MotionScheduler(camera, sample_interval=0.01, stable_time=0.05)
+        scheduler.mark_analyzed()
+
+        # Act
+        changed = scheduler.wait_for_change(threading.Event(), timeout=5)
+
+        # Assert
+        self.assertTrue(changed)
+        self.assertLess(scheduler.idle_time, 1)
+
+    def test_same_scene_put_back_is_ignored(self) -> None:
+        """Test that a motion ending on the analyzed scene does not trigger it."""
+        # Arrange
+        hand = np.random.default_rng(0).integers(0, 255, (160, 160, 3), dtype=np.uint8)
+        camera = _camera([_scene(200), _scene(200), hand, _scene(200)])
+        scheduler = MotionScheduler(camera, sample_interval=0.01, stable_time=0.05)
+        scheduler.mark_analyzed()
+
+        # Act
+        changed = scheduler.wait_for_change(threading.Event(), timeout=0.3)
+
+        # Assert
+        self.assertFalse(changed)
+        self.assertLess(scheduler.idle_time, 0.3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,335 @@
+# SPDX-FileCopyrightText: 2025-present Frédéric Collonval <frederic.collonval@webscit.com>
+#
+# SPDX-License-Identifier: MIT
+"""Tests for the session module."""
+import json
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+
+from curious_frame.camera import Snapshot
+from curious_frame.cards import ActionCard
+from curious_frame.pipeline import Pipeline
+from curious_frame.session import Session
+from curious_frame.store import DescriptionCache
+from curious_frame.tracing import Tracer
+from curious_frame.vision import Detection
+
+
+class TestPipeline(unittest.TestCase):
+    """Tests for the Pipeline class."""
+
+    def test_backpressure_and_cancellation(self) -> None:
+        """Test that a full queue blocks until the pipeline is stopped."""
+        # Arrange
+        release = threading.Event()
+        pipeline = Pipeline()
+        stage = pipeline.add_stage("slow", lambda item: release.wait(), maxsize=1)
+        pipeline.start()
+
+        # Act
+        first = stage.put(1)  # Being processed
+        second = stage.put(2)  # Waiting in the queue
+        depths = pipeline.queue_depths()
+        threading.Timer(0.2, pipeline.stop).start()
+        third = stage.put(3)  # Blocks until the pipeline is stopped
+        release.set()
+        pipeline.join()
+
+        # Assert
+        self.assertTrue(first)
+        self.assertTrue(second)
+        self.assertFalse(third)
+        self.assertEqual(depths, {"slow": 1})
+
+
+class TestSession(unittest.TestCase):
+    """Tests for the Session class."""
+
+    @patch("curious_frame.session.FOLLOW_UP_PAUSE", 0)
+    def test_announcement_overlaps_description(self) -> None:
+        """Test that the announcement is spoken while the description is generated."""
+        # Arrange
+        camera = MagicMock()
+        camera.get_snapshot.return_value = Snapshot(
+            frame=np.zeros((4, 4, 3), dtype=np.uint8)
+        )
+        vision = MagicMock()
+        vision.detect.return_value = Detection(["cat"])
+        played = []
+        announced = threading.Event()
+        audio = MagicMock()
+        audio.language = "en"
+        audio.stream_synthesis = False
+        audio.synthesize.side_effect = lambda text, *args: text
+        audio.play.side_effect = lambda text: (played.append(text), announced.set())
+        language = MagicMock()
+        # The description is only returned once the announcement was played
+        language.chat.side_effect = lambda query: announced.wait(5) and "A cat meows."
+
+        with tempfile.TemporaryDirectory() as capture_dir:
+            session = Session(
+                camera, vision, language, audio, capture_dir, shutdown_timeout=0
+            )
+
+            # Act
+            session.run()
+
+        # Assert
+        self.assertEqual(
+            played,
+            [
+                "I found cat. Let me find information about them.",
+                "A cat meows.",
+                "Do you want to show me something else?",
+                "I am shutting down now. Goodbye!",
+            ],
+        )
+
+    @patch("curious_frame.session.FOLLOW_UP_PAUSE", 0)
+    def test_speech_ordered_across_interactions(self) -> None:
+        """Test that the next announcement is spoken after the current description."""
+        # Arrange
+        camera = MagicMock()
+        camera.get_snapshot.return_value = Snapshot(
+            frame=np.zeros((4, 4, 3), dtype=np.uint8)
+        )
+        detections = iter([Detection(["cat"]), Detection(["dog"])])
+        vision = MagicMock()
+        vision.detect.side_effect = lambda *args: next(detections, Detection(["dog"]))
+        played = []
+        audio = MagicMock()
+        audio.language = "en"
+        audio.stream_synthesis = False
+        audio.synthesize.side_effect = lambda text, *args: text
+        audio.play.side_effect = played.append
+        language = MagicMock()
+        # The next snapshot is analyzed before the description is generated
+        language.chat.side_effect = lambda query: (
+            threading.Event().wait(0.2) or "A cat meows."
+            if "cat" in query
+            else "A dog barks."
+        )
+
+        with tempfile.TemporaryDirectory() as capture_dir:
+            session = Session(
+                camera, vision, language, audio, capture_dir, shutdown_timeout=0
+            )
+
+            # Act
+            session.run()
+
+        # Assert
+        self.assertEqual(
+            played,
+            [
+                "I found cat. Let me find information about them.",
+                "A cat meows.",
+                "Do you want to show me something else?",
+                "I found dog. Let me find information about them.",
+                "A dog barks.",
+                "Do you want to show me something else?",
+                "I am shutting down now. Goodbye!",
+            ],
+        )
+
+    @patch("curious_frame.session.FOLLOW_UP_PAUSE", 0)
+    def test_card_action_sets_language(self) -> None:
+        """Test that the language of a card found locally is applied."""
+        # Arrange
+        camera = MagicMock()
+        camera.get_snapshot.return_value = Snapshot(
+            frame=np.zeros((4, 4, 3), dtype=np.uint8)
+        )
+        vision = MagicMock()
+        vision.detect.return_value = Detection(["cat"])
+        cards = MagicMock()
+        cards.detect.return_value = [
+            ActionCard("french_flag", "stripes", action={"language": "fr"})
+        ]
+        played = []
+        audio = MagicMock()
+        audio.language = "en"
+        audio.set_language.side_effect = lambda lang: setattr(audio, "language", lang)
+        audio.stream_synthesis = False
+        audio.synthesize.side_effect = lambda text, *args: text
+        audio.play.side_effect = played.append
+        language = MagicMock()
+        language.chat.return_value = "A cat meows."
+
+        with tempfile.TemporaryDirectory() as capture_dir:
+            session = Session(
+                camera,
+                vision,
+                language,
+                audio,
+                capture_dir,
+                shutdown_timeout=0,
+                cards=cards,
+            )
+
+            # Act
+            session.run()
+
+        # Assert
+        audio.set_language.assert_called_once_with("fr")
+        self.assertEqual(vision.detect.call_args.args[1], True)
+        self.assertIn("Je vais maintenant parler en français.", played)
+
+    @patch("curious_frame.session.FOLLOW_UP_PAUSE", 0)
+    def test_cached_description_skips_language_model(self) -> None:
+        """Test that a known object set is described without the language model."""
+        # Arrange
+        camera = MagicMock()
+        camera.get_snapshot.return_value = Snapshot(
+            frame=np.zeros((4, 4, 3), dtype=np.uint8)
+        )
+        vision = MagicMock()
+        vision.detect.return_value = Detection(["cat"])
+        played = []
+        audio = MagicMock()
+        audio.language = "en"
+        audio.stream_synthesis = False
+        audio.synthesize.side_effect = lambda text, *args: text
+        audio.play.side_effect = played.append
+        language = MagicMock()
+        language.model = "gemma"
+
+        with tempfile.TemporaryDirectory() as capture_dir:
+            descriptions = DescriptionCache(Path(capture_dir) / "descriptions.sqlite")
+            descriptions.store(["cat"], "en", "gemma", "A cat meows.")
+            session = Session(
+                camera,
+                vision,
+                language,
+                audio,
+                capture_dir,
+                shutdown_timeout=0,
+                descriptions=descriptions,
+            )
+
+            # Act
+            session.run()
+            descriptions.close()
+
+        # Assert
+        language.chat.assert_not_called()
+        self.assertIn("A cat meows.", played)
+
+    @patch("curious_frame.session.FOLLOW_UP_PAUSE", 0)
+    def test_cached_description_streamed_with_unfinished_sentence(self) -> None:
+        """Test that a cached description is spoken in full, unfinished end included."""
+        # Arrange
+        camera = MagicMock()
+        camera.get_snapshot.return_value = Snapshot(
+            frame=np.zeros((4, 4, 3), dtype=np.uint8)
+        )
+        vision = MagicMock()
+        vision.detect.return_value = Detection(["cat"])
+        played = []
+        audio = MagicMock()
+        audio.language = "en"
+        audio.stream_synthesis = False
+        audio.synthesize.side_effect = lambda text, *args: text
+        audio.play.side_effect = played.append
+        language = MagicMock()
+        language.model = "gemma"
+
+        with tempfile.TemporaryDirectory() as capture_dir:
+            descriptions = DescriptionCache(Path(capture_dir) / "descriptions.sqlite")
+            descriptions.store(["cat"], "en", "gemma", "A cat meows. It likes milk")
+            session = Session(
+                camera,
+                vision,
+                language,
+                audio,
+                capture_dir,
+                shutdown_timeout=0,
+                stream=True,
+                descriptions=descriptions,
+            )
+
+            # Act
+            session.run()
+            descriptions.close()
+
+        # Assert
+        language.chat_stream.assert_not_called()
+        self.assertEqual(played[1:3], ["A cat meows.", "It likes milk"])
+
+    @patch("curious_frame.session.FOLLOW_UP_PAUSE", 0)
+    def test_interactions_traced(self) -> None:
+        """Test that a trace is written per interaction once its speech is played."""
+        # Arrange
+        camera = MagicMock()
+        camera.get_snapshot.return_value = Snapshot(
+            frame=np.zeros((4, 4, 3), dtype=np.uint8)
+        )
+        vision = MagicMock()
+        vision.detect.return_value = Detection(["cat"])
+        audio = MagicMock()
+        audio.language = "en"
+        audio.stream_synthesis = False
+        language = MagicMock()
+        language.chat.return_value = "A cat meows."
+
+        with tempfile.TemporaryDirectory() as capture_dir:
+            trace_path = Path(capture_dir) / "traces.jsonl"
+            session = Session(
+                camera,
+                vision,
+                language,
+                audio,
+                capture_dir,
+                shutdown_timeout=0,
+                tracer=Tracer(trace_path),
+            )
+
+            # Act
+            session.run()
+            records = [json.loads(line) for line in trace_path.read_text().splitlines()]
+
+        # Assert
+        # The next snapshots show the same cat until the shutdown
+        described = [record for record in records if not record.get("identical")]
+        self.assertEqual(len(described), 1)
+        self.assertEqual(described[0]["objects"], ["cat"])
+        self.assertEqual(
+            [span["name"] for span in described[0]["spans"]], ["capture", "vision"]
+        )
+        self.assertGreater(len(records), 1)
+
+    def test_trace_written_without_snapshot(self) -> None:
+        """Test that the trace of a failed capture is written."""
+        # Arrange
+        camera = MagicMock()
+        camera.get_snapshot.return_value = None
+        audio = MagicMock()
+        audio.language = "en"
+
+        with tempfile.TemporaryDirectory() as capture_dir:
+            trace_path = Path(capture_dir) / "traces.jsonl"
+            session = Session(
+                camera,
+                MagicMock(),
+                MagicMock(),
+                audio,
+                capture_dir,
+                tracer=Tracer(trace_path),
+            )
+
+            # Act
+            session.run()
+            records = [json.loads(line) for line in trace_path.read_text().splitlines()]
+
+        # Assert
+        self.assertEqual(len(records), 1)
+        self.assertEqual([span["name"] for span in records[0]["spans"]], ["capture"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+# SPDX-FileCopyrightText: 2025-present Frédéric Collonval <frederic.collonval@webscit.com>
+#
+# SPDX-License-Identifier: MIT
+"""Tests for the startup module."""
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+from curious_frame.startup import Startup
+
+
+class TestStartup(unittest.TestCase):
+    """Tests for the Startup class."""
+
+    @patch("curious_frame.startup._RETRY_INTERVAL", 0.01)
+    def test_components_prepared_in_parallel(self) -> None:
+        """Test that the components are prepared concurrently and retried."""
+        # Arrange
+        piper = MagicMock(side_effect=[ConnectionError("refused"), "greeting.wav"])
+        startup = Startup(timeout=5)
+        startup.add("llm", lambda: time.sleep(0.2))
+        startup.add("vlm", lambda: time.sleep(0.2))
+        startup.add("piper", piper, retry=True)
+
+        # Act
+        start = time.monotonic()
+        ready = startup.run()
+        elapsed = time.monotonic() - start
+
+        # Assert
+        self.assertTrue(ready)
+        self.assertLess(elapsed, 0.35)
+        self.assertEqual(startup.result("piper"), "greeting.wav")
+        self.assertEqual(startup.timeline[0].name, "piper")
+        self.assertEqual(startup.timeline[0].attempts, 2)
+
+    def test_failed_component(self) -> None:
+        """Test that a failed component is reported without blocking the others."""
+        # Arrange
+        startup = Startup(timeout=1)
+        startup.add("camera", lambda: False)
+        startup.add("vlm", MagicMock(side_effect=RuntimeError("no model")), retry=True)
+        startup.add("audio", lambda: True)
+
+        # Act
+        ready = startup.run()
+
+        # Assert
+        self.assertFalse(ready)
+        self.assertEqual(
+            {r.name: r.ready for r in startup.timeline},
+            {"camera": False, "vlm": False, "audio": True},
+        )
+        with self.assertRaises(RuntimeError):
+            startup.result("vlm")
+
+    def test_blocked_component_timed_out(self) -> None:
+        """Test that a component blocked in a call does not delay the start."""
+        # Arrange
+        release = threading.Event()
+        startup = Startup(timeout=0.2)
+        startup.add("llm", release.wait)
+        startup.add("audio", lambda: True)
+
+        # Act
+        start = time.monotonic()
+        ready = startup.run()
+        elapsed = time.monotonic() - start
+        release.set()
+
+        # Assert
+        self.assertFalse(ready)
+        self.assertLess(elapsed, 1)
+        self.assertEqual([r.name for r in startup.timeline], ["audio", "llm"])
+        self.assertIn("timed out", startup.timeline[1].error)
+
+
+if __name__ == "__main__":
+    unittest.main()
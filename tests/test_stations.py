@@ -0,0 +1,180 @@
+# SPDX-FileCopyrightText: 2025-present Frédéric Collonval <frederic.collonval@webscit.com>
+#
+# SPDX-License-Identifier: MIT
+"""Tests for the stations module."""
+import threading
+import unittest
+from unittest.mock import MagicMock
+
+import numpy as np
+
+from curious_frame.camera import Snapshot
+from curious_frame.stations import Backend, StationLanguage, StationVision
+from curious_frame.vision import Detection, VisionCache
+
+
+class TestBackend(unittest.TestCase):
+    """Tests for the Backend class."""
+
+    def setUp(self) -> None:
+        # The worker is kept busy until released so the requests queue up
+        self.release = threading.Event()
+        self.language = MagicMock()
+        self.backend = Backend(MagicMock(), self.language, workers=1)
+        self.blocker = self.backend.submit("setup", None, self.release.wait)
+
+    def tearDown(self) -> None:
+        self.release.set()
+        self.backend.close()
+
+    def test_stations_served_in_turn(self) -> None:
+        """Test that a station with many requests does not delay the others."""
+        # Arrange
+        order = []
+        futures = [
+            self.backend.submit("a", None, lambda i=i: order.append(f"a{i}"))
+            for i in range(3)
+        ]
+        futures.append(self.backend.submit("b", None, lambda: order.append("b0")))
+
+        # Act
+        self.release.set()
+        for future in futures:
+            future.result(timeout=5)
+
+        # Assert
+        self.assertEqual(order, ["a0", "b0", "a1", "a2"])
+
+    def test_identical_requests_shared(self) -> None:
+        """Test that identical requests in flight are sent once."""
+        # Arrange
+        self.language.chat.return_value = "A cat meows."
+        kitchen = StationLanguage(self.backend, "kitchen")
+        garden = StationLanguage(self.backend, "garden")
+        answers = []
+        threads = [
+            threading.Thread(
+                target=lambda station=station: answers.append(station.chat("cat"))
+            )
+            for station in (kitchen, garden)
+        ]
+
+        # Act
+        for thread in threads:
+            thread.start()
+        while sum(stats["requests"] for stats in self.backend.summary().values()) < 3:
+            threading.Event().wait(0.01)
+        self.release.set()
+        for thread in threads:
+            thread.join(timeout=5)
+
+        # Assert
+        self.language.chat.assert_called_once_with("cat")
+        self.assertEqual(answers, ["A cat meows.", "A cat meows."])
+        summary = self.backend.summary()
+        self.assertEqual(sum(stats["shared"] for stats in summary.values()), 1)
+
+    def test_stream_gives_up_worker_between_sentences(self) -> None:
+        """Test that the other stations are served while a description is streamed."""
+        # Arrange
+        order = []
+
+        def stream(query):
+            for sentence in ("A cat.", "It meows.", "It sleeps."):
+                order.append(sentence)
+                yield sentence
+
+        self.language.chat_stream.side_effect = stream
+        kitchen = StationLanguage(self.backend, "kitchen")
+        sentences = []
+        reader = threading.Thread(
+            target=lambda: sentences.extend(kitchen.chat_stream("cat"))
+        )
+
+        # Act
+        reader.start()
+        while sum(stats["requests"] for stats in self.backend.summary().values()) < 2:
+            threading.Event().wait(0.01)
+        other = self.backend.submit("garden", None, lambda: order.append("garden"))
+        self.release.set()
+        other.result(timeout=5)
+        reader.join(timeout=5)
+
+        # Assert
+        self.assertEqual(sentences, ["A cat.", "It meows.", "It sleeps."])
+        self.assertEqual(order[:2], ["A cat.", "garden"])
+
+    def test_translations_batched(self) -> None:
+        """Test that the waiting translations of all stations are sent together."""
+        # Arrange
+        self.language.translate_many.side_effect = lambda texts, language: [
+            f"fr {text}" for text in texts
+        ]
+        first = self.backend.translate("kitchen", ["Hello", "Bye"], "french")
+        second = self.backend.translate("garden", ["Yes"], "french")
+
+        # Act
+        self.release.set()
+        results = [future.result(timeout=5) for future in first + second]
+
+        # Assert
+        self.language.translate_many.assert_called_once()
+        texts, language = self.language.translate_many.call_args.args
+        self.assertEqual((sorted(texts), language), (["Bye", "Hello", "Yes"], "french"))
+        self.assertEqual(results, ["fr Hello", "fr Bye", "fr Yes"])
+
+    def test_vision_cached_per_station(self) -> None:
+        """Test that a station reuses its own vision results only."""
+        # Arrange
+        self.release.set()
+        self.backend.vision.detect.side_effect = lambda frame, flag: Detection(["cat"])
+        frame = Snapshot(frame=np.zeros((64, 64, 3), dtype=np.uint8))
+        kitchen = StationVision(self.backend, "kitchen", VisionCache())
+        garden = StationVision(self.backend, "garden", VisionCache())
+
+        # Act
+        first = kitchen.detect(frame)
+        again = kitchen.detect(frame)
+        other = garden.detect(frame)
+
+        # Assert
+        self.assertEqual([first.objects, again.objects, other.objects], [["cat"]] * 3)
+        self.assertEqual(self.backend.vision.detect.call_count, 2)
+
+    def test_same_scene_detected_once(self) -> None:
+        """Test that snapshots of the same scene in flight are analyzed once."""
+        # Arrange
+        self.backend.vision.detect.side_effect = lambda frame, flag: Detection(["cat"])
+        scene = np.tile(np.arange(0, 256, 4, dtype=np.uint8), (64, 1))
+        # A brighter snapshot has other JPEG bytes but the same fingerprint
+        frames = [
+            Snapshot(frame=np.dstack([scene] * 3)),
+            Snapshot(frame=np.dstack([scene + 2] * 3)),
+        ]
+        detections = []
+        threads = [
+            threading.Thread(
+                target=lambda name=name, frame=frame: detections.append(
+                    StationVision(self.backend, name).detect(frame)
+                )
+            )
+            for name, frame in zip(("kitchen", "garden"), frames)
+        ]
+
+        # Act
+        for thread in threads:
+            thread.start()
+        while sum(stats["requests"] for stats in self.backend.summary().values()) < 3:
+            threading.Event().wait(0.01)
+        self.release.set()
+        for thread in threads:
+            thread.join(timeout=5)
+
+        # Assert
+        self.assertNotEqual(frames[0].to_jpeg(), frames[1].to_jpeg())
+        self.backend.vision.detect.assert_called_once()
+        self.assertEqual([detection.objects for detection in detections], [["cat"]] * 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
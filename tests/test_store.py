@@ -0,0 +1,77 @@
+# SPDX-FileCopyrightText: 2025-present Frédéric Collonval <frederic.collonval@webscit.com>
+#
+# SPDX-License-Identifier: MIT
+"""Tests for the store module."""
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+from curious_frame.store import DescriptionCache
+
+
+class TestDescriptionCache(unittest.TestCase):
+    """Tests for the DescriptionCache class."""
+
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = Path(self.tmp.name) / "descriptions.sqlite"
+
+    def test_hit_across_restarts(self) -> None:
+        """Test that a description is found whatever the object order and case."""
+        # Arrange
+        cache = DescriptionCache(self.path)
+        cache.store(["Cat", "ball"], "en", "gemma", "A cat plays with a ball.")
+        cache.close()
+
+        # Act
+        cache = DescriptionCache(self.path)
+        hit = cache.lookup(["ball", "cat"], "en", "gemma")
+        other_language = cache.lookup(["ball", "cat"], "fr", "gemma")
+        other_model = cache.lookup(["ball", "cat"], "en", "llama")
+
+        # Assert
+        self.assertEqual(hit, "A cat plays with a ball.")
+        self.assertIsNone(other_language)
+        self.assertIsNone(other_model)
+        self.assertEqual((cache.hits, cache.misses), (1, 2))
+
+    def test_variants_rotated(self) -> None:
+        """Test that several variants are generated then served in turn."""
+        # Arrange
+        cache = DescriptionCache(self.path, variants=2)
+
+        # Act
+        first = cache.lookup(["cat"], "en", "gemma")
+        cache.store(["cat"], "en", "gemma", "A cat meows.")
+        second = cache.lookup(["cat"], "en", "gemma")
+        cache.store(["cat"], "en", "gemma", "A cat purrs.")
+        served = [cache.lookup(["cat"], "en", "gemma") for _ in range(3)]
+
+        # Assert
+        self.assertIsNone(first)
+        self.assertIsNone(second)
+        self.assertEqual(served, ["A cat meows.", "A cat purrs.", "A cat meows."])
+
+    def test_expiration_and_eviction(self) -> None:
+        """Test that old and least recently used descriptions are dropped."""
+        # Arrange
+        cache = DescriptionCache(self.path, ttl=0.05, max_entries=2)
+
+        # Act
+        cache.store(["cat"], "en", "gemma", "A cat meows.")
+        time.sleep(0.1)
+        expired = cache.lookup(["cat"], "en", "gemma")
+        cache.ttl = 3600
+        for obj in ("dog", "cow", "hen"):
+            cache.store([obj], "en", "gemma", f"A {obj}.")
+
+        # Assert
+        self.assertIsNone(expired)
+        self.assertIsNone(cache.lookup(["dog"], "en", "gemma"))
+        self.assertEqual(cache.lookup(["hen"], "en", "gemma"), "A hen.")
+
+
+if __name__ == "__main__":
+    unittest.main()
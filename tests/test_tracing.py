@@ -0,0 +1,81 @@
+# SPDX-FileCopyrightText: 2025-present Frédéric Collonval <frederic.collonval@webscit.com>
+#
+# SPDX-License-Identifier: MIT
+"""Tests for the tracing module."""
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from curious_frame import tracing
+from curious_frame.tracing import NullTracer, Tracer
+
+
+class TestTracer(unittest.TestCase):
+    """Tests for the Tracer class."""
+
+    def test_trace_written_once_released(self) -> None:
+        """Test that a trace is written with its spans once every holder released it."""
+        with tempfile.TemporaryDirectory() as directory:
+            # Arrange
+            path = Path(directory) / "traces.jsonl"
+            tracer = Tracer(path)
+            trace = tracer.start()
+
+            # Act
+            with tracing.activate(trace):
+                with tracing.span("llm") as span:
+                    tracing.record_ollama(
+                        span,
+                        {"eval_count": 42, "prompt_eval_duration": 1000, "message": {}},
+                    )
+                utterance_trace = tracing.current().hold()
+            trace.release()
+            written_before_playback = path.exists()
+            with tracing.activate(utterance_trace), tracing.span("play"):
+                pass
+            utterance_trace.release()
+
+            # Assert
+            self.assertFalse(written_before_playback)
+            record = json.loads(path.read_text())
+            names = [span["name"] for span in record["spans"]]
+            self.assertEqual(names, ["llm", "play"])
+            self.assertEqual(record["spans"][0]["eval_count"], 42)
+            self.assertEqual(record["spans"][0]["prompt_eval_duration"], 1000)
+            self.assertNotIn("message", record["spans"][0])
+
+    def test_prometheus_metrics(self) -> None:
+        """Test that the span durations and the gauges are exported."""
+        # Arrange
+        tracer = Tracer()
+        tracer.gauges["vision_cache_hit_rate"] = lambda: 0.5
+
+        # Act
+        tracer.observe("vision", 0.2)
+        tracer.observe("vision", 3.0)
+        metrics = tracer.prometheus()
+
+        # Assert
+        metric = "curious_frame_span_duration_seconds"
+        self.assertIn(f'{metric}_bucket{{span="vision",le="0.25"}} 1', metrics)
+        self.assertIn(f'{metric}_bucket{{span="vision",le="+Inf"}} 2', metrics)
+        self.assertIn(f'{metric}_count{{span="vision"}} 2', metrics)
+        self.assertIn("curious_frame_vision_cache_hit_rate 0.500000", metrics)
+
+    def test_spans_inactive_without_trace(self) -> None:
+        """Test that no span is recorded when tracing is disabled."""
+        # Arrange
+        tracer = NullTracer()
+
+        # Act
+        with tracing.activate(tracer.start()), tracing.span("capture") as span:
+            pass
+
+        # Assert
+        self.assertIsNone(span)
+        self.assertNotIn("capture", tracer.prometheus())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,166 @@
+# SPDX-FileCopyrightText: 2025-present Frédéric Collonval <frederic.collonval@webscit.com>
+#
+# SPDX-License-Identifier: MIT
+"""Tests for the vision module."""
+import importlib.util
+import json
+import unittest
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+
+from curious_frame.fingerprint import dhash, hamming_distance
+from curious_frame.vision import DETECTION_SCHEMA, Detection, Vision, VisionCache
+
+
+def _scene(seed: int) -> np.ndarray:
+    """Builds a synthetic scene with a few blocks of colors."""
+    rng = np.random.default_rng(seed)
+    frame = np.zeros((72, 128, 3), dtype=np.uint8)
+    for _ in range(6):
+        x, y = rng.integers(0, 100), rng.integers(0, 50)
+        frame[y : y + 20, x : x + 25] = rng.integers(0, 255, 3)
+    return frame
+
+
+class TestVisionCache(unittest.TestCase):
+    """Tests for the VisionCache class."""
+
+    def test_noisy_frame_has_close_fingerprint(self) -> None:
+        """Test that sensor noise barely changes the fingerprint."""
+        frame = _scene(0)
+        noise = np.random.default_rng(1).integers(-3, 4, frame.shape)
+        noisy = np.clip(frame.astype(int) + noise, 0, 255).astype(np.uint8)
+
+        self.assertLessEqual(hamming_distance(dhash(frame), dhash(noisy)), 12)
+        self.assertGreater(hamming_distance(dhash(frame), dhash(_scene(2))), 12)
+
+    def test_lru_eviction(self) -> None:
+        """Test that the least recently used result is evicted."""
+        cache = VisionCache(max_size=2, max_distance=0)
+        cache.store(0b01, "cat")
+        cache.store(0b10, "dog")
+        self.assertEqual(cache.lookup(0b01), (True, "cat"))
+
+        cache.store(0b11, "bird")
+
+        self.assertEqual(cache.lookup(0b10), (False, None))
+        self.assertEqual(cache.lookup(0b01), (True, "cat"))
+        self.assertEqual(len(cache), 2)
+
+    def test_context_and_expiry(self) -> None:
+        """Test that a result is only reused with the same context until it expires."""
+        cache = VisionCache(max_distance=0, ttl=60)
+        cache.store(0b01, "cat", context=True)
+
+        self.assertEqual(cache.lookup(0b01, context=None), (False, None))
+        self.assertEqual(cache.lookup(0b01, context=True), (True, "cat"))
+        with patch("curious_frame.vision.time.monotonic", return_value=1e12):
+            self.assertEqual(cache.lookup(0b01, context=True), (False, None))
+        self.assertEqual(len(cache), 0)
+
+    @patch("curious_frame.client.requests.Session.post")
+    def test_detect_skips_model_for_same_scene(self, mock_post: MagicMock) -> None:
+        """Test that an unchanged scene does not call Ollama again."""
+        # Arrange
+        flag = MagicMock()
+        flag.json.return_value = {"message": {"content": "No"}}
+        objects = MagicMock()
+        objects.json.return_value = {"message": {"content": "cat, ball"}}
+        mock_post.side_effect = [flag, objects]
+        vision = Vision(model_name="vlm", url="http://ollama", cache=VisionCache())
+
+        # Act
+        first = vision.detect(_scene(0))
+        second = vision.detect(_scene(0))
+
+        # Assert
+        self.assertEqual(first.objects, ["cat", "ball"])
+        self.assertIs(second, first)
+        self.assertEqual(mock_post.call_count, 2)
+
+
+class TestVision(unittest.TestCase):
+    """Tests for the Vision class."""
+
+    def test_detection_from_text(self) -> None:
+        """Test that the free-text object list is parsed."""
+        detection = Detection.from_text("cat, cardboard frame,French flag, ,cat")
+
+        self.assertEqual(detection.objects, ["cat"])
+        self.assertTrue(detection.french_flag)
+        self.assertFalse(Detection.from_text(None).frame_present)
+
+    @patch("curious_frame.client.requests.Session.post")
+    def test_structured_detection_in_single_call(self, mock_post: MagicMock) -> None:
+        """Test that the structured mode makes a single Ollama call."""
+        # Arrange
+        response = MagicMock()
+        response.json.return_value = {
+            "message": {
+                "content": json.dumps(
+                    {
+                        "objects": ["chat", "balle"],
+                        "french_flag": True,
+                        "frame_present": True,
+                    }
+                )
+            }
+        }
+        mock_post.return_value = response
+        vision = Vision(model_name="vlm", url="http://ollama", structured=True)
+
+        # Act
+        detection = vision.detect(_scene(0))
+
+        # Assert
+        self.assertEqual(detection, Detection(["chat", "balle"], True, True))
+        mock_post.assert_called_once()
+        self.assertEqual(mock_post.call_args.kwargs["json"]["format"], DETECTION_SCHEMA)
+
+    @patch("curious_frame.client.requests.Session.post")
+    def test_malformed_structured_response(self, mock_post: MagicMock) -> None:
+        """Test that a truncated JSON response falls back to the free-text questions."""
+        # Arrange
+        truncated = MagicMock()
+        truncated.json.return_value = {"message": {"content": '{"objects": ["cat"'}}
+        flag = MagicMock()
+        flag.json.return_value = {"message": {"content": "No"}}
+        objects = MagicMock()
+        objects.json.return_value = {"message": {"content": "cat, ball"}}
+        mock_post.side_effect = [truncated, flag, objects]
+        vision = Vision(model_name="vlm", url="http://ollama", structured=True)
+
+        # Act
+        detection = vision.detect(_scene(0))
+
+        # Assert
+        self.assertEqual(detection, Detection(["cat", "ball"]))
+        self.assertEqual(mock_post.call_count, 3)
+
+    @unittest.skipUnless(importlib.util.find_spec("torch"), "torch is not installed")
+    def test_local_model_encodes_image_once(self) -> None:
+        """Test that the local model reuses the image embedding for each question."""
+        # Arrange
+        vision = Vision(model_name="vlm", url="http://ollama")
+        vision.url = ""
+        vision.model = MagicMock()
+        vision.model.query.side_effect = [
+            {"answer": "cat, ball"},
+            {"answer": "Yes"},
+            {"answer": "cat"},
+        ]
+
+        # Act
+        first = vision.detect(_scene(0))
+        second = vision.detect(_scene(0), french_flag=False)
+
+        # Assert
+        self.assertEqual(first, Detection(["cat", "ball"], french_flag=True))
+        self.assertEqual(second, Detection(["cat"]))
+        vision.model.encode_image.assert_called_once()
+        self.assertEqual(vision.model.query.call_count, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()